@@ -1,10 +1,29 @@
 from django.contrib import admin
+from django.utils import timezone
 
 from booking_app.models.booking_model import Booking
 from booking_app.models.hotel_model import Hotel
+from booking_app.models.job_model import Job
+from booking_app.models.occupancy_model import HotelDailyOccupancy
 from booking_app.models.review_model import Review
+from booking_app.models.room_hold_model import RoomHold
+from booking_app.models.room_lock_model import RoomLock
 from booking_app.models.room_model import Room
+from booking_app.models.room_night_model import RoomNight
 from booking_app.models.user_model import User
+from booking_app.search import matching_hotel_ids
+
+
+# Администратор видит и мягко удаленные строки: их можно отфильтровать по полю deleted и восстановить, сняв отметку.
+class SoftDeleteAdmin(admin.ModelAdmin):
+
+    def get_queryset(self, request):
+        queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
 
 # Класс HotelAdmin определяет пользовательские настройки отображения и взаимодействия с объектами модели Hotel
 # в административной панели. list_display указывает, какие поля будут отображаться в списке объектов, list_filter
@@ -12,16 +31,25 @@ from booking_app.models.user_model import User
 
 
 @admin.register(Hotel)
-class HotelAdmin(admin.ModelAdmin):
-    list_display = ('name', 'location', 'rating',)
-    list_filter = ('location', 'rating',)
+class HotelAdmin(SoftDeleteAdmin):
+    list_display = ('name', 'location', 'rating', 'rating_avg', 'review_count',)
+    list_filter = ('location', 'rating', 'deleted',)
     search_fields = ('name', 'description',)
 
+    # Поиск идет по индексу полнотекстового поиска (booking_app/search.py), а не LIKE по названию и описанию.
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        hotel_ids = matching_hotel_ids(search_term)
+        if hotel_ids is None:
+            return queryset.none(), False
+        return queryset.filter(pk__in=hotel_ids), False
+
 
 @admin.register(Room)
-class RoomAdmin(admin.ModelAdmin):
-    list_display = ('room_type', 'photos', 'price_per_night', 'available',)
-    list_filter = ('room_type', 'price_per_night', 'available',)
+class RoomAdmin(SoftDeleteAdmin):
+    list_display = ('room_type', 'photos', 'price_per_night', 'capacity', 'available',)
+    list_filter = ('room_type', 'price_per_night', 'available', 'deleted',)
     search_fields = ('room_type', 'price_per_night',)
     # Аналогичные поля и характеристики как в предыдущем классе.
 
@@ -35,16 +63,61 @@ class UserAdmin(admin.ModelAdmin):
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(SoftDeleteAdmin):
     list_display = ('booking_id', 'user_id', 'room_id', 'check_in_date', 'check_out_date', 'created_at',)
-    list_filter = ('user_id', 'room_id', 'check_in_date', 'check_out_date', 'created_at',)
+    list_filter = ('user_id', 'room_id', 'check_in_date', 'check_out_date', 'created_at', 'deleted',)
     search_fields = ('user_id', 'room_id', 'check_in_date', 'check_out_date', 'created_at',)
     # Аналогичные поля и характеристики как в предыдущем классе.
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(SoftDeleteAdmin):
     list_display = ('review_id', 'user_id', 'hotel_id', 'comment',)
-    list_filter = ('review_id', 'user_id', 'hotel_id',)
+    list_filter = ('review_id', 'user_id', 'hotel_id', 'deleted',)
     search_fields = ('created_at', 'review_id', 'user_id', 'hotel_id', 'comment',)
     # Аналогичные поля и характеристики как в предыдущем классе.
+
+
+@admin.register(RoomNight)
+class RoomNightAdmin(admin.ModelAdmin):
+    list_display = ('room_id', 'night', 'booking_id',)
+    list_filter = ('night',)
+    search_fields = ('room_id__room_id', 'booking_id__booking_id',)
+    # Индекс занятых ночей заполняется автоматически при сохранении бронирований.
+
+
+@admin.register(HotelDailyOccupancy)
+class HotelDailyOccupancyAdmin(admin.ModelAdmin):
+    list_display = ('hotel_id', 'date', 'rooms_booked', 'revenue',)
+    list_filter = ('date',)
+    search_fields = ('hotel_id__name',)
+    # Сводная таблица занятости обновляется вместе с индексом занятых ночей и пересчитывается командой
+    # rebuild_occupancy.
+
+
+@admin.register(RoomLock)
+class RoomLockAdmin(admin.ModelAdmin):
+    list_display = ('room_id', 'locked_at',)
+    # Таблица рекомендательных блокировок номеров (используется только на SQLite).
+
+
+@admin.register(RoomHold)
+class RoomHoldAdmin(admin.ModelAdmin):
+    list_display = ('hold_id', 'room_id', 'check_in_date', 'check_out_date', 'expires_at',)
+    list_filter = ('expires_at',)
+    search_fields = ('room_id__room_id', 'token',)
+    # Временные удержания номеров; просроченные удаляет команда sweep_holds.
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'task', 'status', 'priority', 'attempts', 'run_at', 'locked_by',)
+    list_filter = ('status', 'task',)
+    search_fields = ('task', 'last_error',)
+    actions = ('retry_jobs',)
+    # Очередь фоновых задач; выполненные задачи удаляются, неудачные остаются со статусом failed.
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry_jobs(self, request, queryset):
+        queryset.filter(status=Job.FAILED).update(status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+                                                  finished_at=None)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BookingAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking_app'
+
+    # Подключаем обработчики сигналов приложения после загрузки всех моделей.
+    def ready(self):
+        import booking_app.signals  # noqa: F401
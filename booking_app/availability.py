@@ -0,0 +1,76 @@
+import base64
+
+from booking_app.models.booking_model import Booking
+from booking_app.models.room_hold_model import RoomHold
+
+# Способы кодирования календаря занятости номера.
+ENCODINGS = ['base64', 'rle']
+
+
+# Календарь занятости номеров для виджета бронирования. Календарь номера на полуинтервал [date_from, date_to) - это
+# набор бит, по одному на ночь: бит i соответствует ночи date_from + i дней и равен 1, если ночь занята
+# бронированием или действующим удержанием (RoomHold). Ночи выезда не заняты, как и в индексе занятых ночей.
+# Календарь отдается в одном из двух видов: base64 - биты, упакованные в байты от младшего бита к старшему (ночь i -
+# бит i % 8 байта i // 8), в base64; rle - длины чередующихся серий свободных и занятых ночей, начиная со свободных
+# (первая серия может быть нулевой).
+
+# Занятые интервалы номеров room_ids внутри [date_from, date_to) в виде {room_id: [(первая ночь, ночь после
+# последней)]}, где ночи - смещения в днях от date_from. Один запрос (UNION ALL) по частичному индексу бронирований
+# (room_id, check_out_date, check_in_date) и индексу удержаний на всю пачку номеров, без чтения отдельных ночей.
+def busy_intervals(room_ids, date_from, date_to):
+    days = (date_to - date_from).days
+    intervals = {}
+    fields = ['room_id', 'check_in_date', 'check_out_date']
+    bookings = Booking.objects.filter(room_id__in=room_ids, check_out_date__gt=date_from, check_in_date__lt=date_to)
+    holds = RoomHold.objects.live().filter(room_id__in=room_ids, check_out_date__gt=date_from,
+                                           check_in_date__lt=date_to)
+    rows = bookings.values_list(*fields).union(holds.values_list(*fields), all=True)
+    for room_id, check_in_date, check_out_date in rows:
+        start = max((check_in_date - date_from).days, 0)
+        end = min((check_out_date - date_from).days, days)
+        intervals.setdefault(room_id, []).append((start, end))
+    return intervals
+
+
+# Набор бит занятых ночей в виде целого числа.
+def busy_bits(intervals):
+    bits = 0
+    for start, end in intervals:
+        bits |= ((1 << (end - start)) - 1) << start
+    return bits
+
+
+def encode_base64(intervals, days):
+    data = busy_bits(intervals).to_bytes((days + 7) // 8, 'little')
+    return base64.b64encode(data).decode('ascii')
+
+
+# Серии строятся по отсортированным интервалам: пересекающиеся и соседние интервалы сливаются в одну серию.
+def encode_rle(intervals, days):
+    runs = []
+    position = 0
+    for start, end in sorted(intervals):
+        if runs and start <= position:
+            if end > position:
+                runs[-1] += end - position
+                position = end
+            continue
+        runs.extend([start - position, end - start])
+        position = end
+    if position < days:
+        runs.append(days - position)
+    return runs
+
+
+def encode_calendar(intervals, days, encoding):
+    if encoding == 'rle':
+        return encode_rle(intervals, days)
+    return encode_base64(intervals, days)
+
+
+# Календари номеров room_ids: {room_id: закодированный календарь}. У номеров без бронирований в интервале все ночи
+# свободны.
+def room_calendars(room_ids, date_from, date_to, encoding):
+    days = (date_to - date_from).days
+    intervals = busy_intervals(room_ids, date_from, date_to)
+    return {room_id: encode_calendar(intervals.get(room_id, []), days, encoding) for room_id in room_ids}
@@ -0,0 +1,90 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+GENERATION_KEY = 'booking_app:generation:{scope}'
+RESPONSE_KEY = 'booking_app:response:{digest}'
+STATS_KEY = 'booking_app:cache:{name}'
+
+
+# Кэширование ответов GET-запросов для отелей и номеров. Ключ ответа строится из пути, параметров запроса и текущих
+# "поколений" областей данных, от которых зависит ответ (например, 'hotels' для списка отелей или 'hotel:5' для
+# одного отеля). При изменении отеля или номера сигналы увеличивают поколение соответствующих областей, после чего
+# старые ключи больше не используются и устаревшие записи просто вытесняются из кэша по таймауту.
+
+# Возвращает текущие поколения областей. Если счетчик области отсутствует (еще не создан или вытеснен из кэша), он
+# создается со значением текущего времени в наносекундах, чтобы не совпасть ни с одним из прежних значений.
+def get_generations(scopes):
+    keys = [GENERATION_KEY.format(scope=scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+# Увеличивает поколение областей, делая недействительными все закэшированные ответы, которые от них зависят.
+def bump_generations(*scopes):
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope=scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+# Строит ключ ответа по хосту и пути (от них зависят ссылки пагинации), отсортированным параметрам запроса и
+# поколениям областей.
+def response_key(request, scopes):
+    params = sorted((name, values) for name, values in request.query_params.lists())
+    source = repr((request.get_host(), request.path, params, scopes, get_generations(scopes)))
+    return RESPONSE_KEY.format(digest=hashlib.md5(source.encode()).hexdigest())
+
+
+# Увеличивает счетчик попаданий или промахов кэша.
+def record(name):
+    key = STATS_KEY.format(name=name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+# Возвращает статистику кэша ответов: количество попаданий, промахов и долю попаданий.
+def cache_stats():
+    hits = cache.get(STATS_KEY.format(name='hits'), 0)
+    misses = cache.get(STATS_KEY.format(name='misses'), 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+# Декоратор для метода get представления. Области, от которых зависит ответ, представление возвращает методом
+# get_cache_scopes(). Кэшируются только успешные ответы (200 и 204); заголовок X-Cache показывает, был ли ответ взят
+# из кэша (HIT) или построен заново (MISS).
+def cache_response(get):
+    @wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return get(view, request, *args, **kwargs)
+
+        key = response_key(request, view.get_cache_scopes())
+        cached = cache.get(key)
+        if cached is not None:
+            record('hits')
+            status_code, data = cached
+            response = Response(status=status_code, data=data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('misses')
+        response = get(view, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code in (200, 204):
+            cache.set(key, (response.status_code, response.data), timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
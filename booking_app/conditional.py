@@ -0,0 +1,69 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from booking_app.cache import response_key
+
+VALIDATORS_KEY = 'booking_app:validators:{key}'
+
+
+# Условные GET-запросы (ETag / Last-Modified). Валидаторы ответа вычисляются по тем же строкам, которые попадут
+# в ответ: максимальное значение updated_at и количество строк. Количество нужно, чтобы удаление строки тоже меняло
+# ETag. Если клиент прислал If-None-Match или If-Modified-Since и данные не изменились, возвращается 304 Not Modified
+# без выборки и сериализации объектов.
+
+# Возвращает ETag и время последнего изменения (в секундах) для набора строк. extra - дополнительные значения,
+# от которых зависит ответ (например, путь с параметрами страницы). Максимум updated_at берется одной строкой из
+# конца индекса (deleted, updated_at) живых строк (у моделей без мягкого удаления - индекса updated_at). Количество
+# строк нужно только для физических удалений: мягкое удаление меняет updated_at. COUNT(*) не бесплатен - база
+# данных читает все подходящие строки самого узкого индекса, и время растет вместе с таблицей (около 40 мс на
+# миллион отзывов на SQLite), но это чтение индекса без строк таблицы и без сортировки. У представлений с кэшем
+# ответов валидаторы считаются один раз на поколение данных (см. view_validators).
+def queryset_validators(queryset, *extra):
+    queryset = queryset.order_by()
+    last_modified = queryset.order_by('-updated_at').values_list('updated_at', flat=True).first()
+    count = queryset.aggregate(count=Count('*'))['count']
+    source = repr((count, last_modified, extra))
+    etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+# Возвращает валидаторы ответа представления. Если представление кэширует ответы (см. booking_app/cache.py),
+# валидаторы хранятся в кэше под ключом, зависящим от тех же поколений областей, что и сам ответ: пока данные не
+# изменились, повторные запросы не обращаются к базе данных.
+def view_validators(view, request):
+    queryset = getattr(view, 'get_conditional_queryset', view.get_queryset)()
+    if not settings.RESPONSE_CACHE_ENABLED or not hasattr(view, 'get_cache_scopes'):
+        return queryset_validators(queryset, request.get_full_path())
+
+    key = VALIDATORS_KEY.format(key=response_key(request, view.get_cache_scopes()))
+    validators = cache.get(key)
+    if validators is None:
+        validators = queryset_validators(queryset, request.get_full_path())
+        cache.set(key, validators, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    return validators
+
+
+# Декоратор для метода get представления. Набор строк, от которых зависит ответ, представление возвращает методом
+# get_conditional_queryset(), а если его нет - методом get_queryset().
+def conditional_get(get):
+    @wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        etag, last_modified = view_validators(view, request)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = get(view, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
@@ -3,6 +3,9 @@ NON_UNIQUE_HOTEL_NAME_ERROR = "This hotel name is already exists. Please write c
 
 ROOM_TYPE_REQUIRED_ERROR = "The type for room is required."
 ROOM_TYPE_LENGTH_ERROR = "The type should contain no more than 8 characters"
+ROOM_PRICE_RANGE_ERROR = "The minimum price must not be greater than the maximum price."
+ROOM_CALENDAR_RANGE_ERROR = "The 'to' date must be later than 'from', and the range must not exceed {max_days} days."
+ROOM_CALENDAR_ROOMS_ERROR = "Expected a hotel_id or at most {max_rooms} room_id values."
 
 USERNAME_NON_UNIQUE_ERROR = "This username already exists. Try something else."
 USER_EMAIL_NON_UNIQUE_ERROR = "User with this email already exists."
@@ -12,5 +15,15 @@ USERNAME_REQUIRED_ERROR = "The username is required."
 USER_EMAIL_REQUIRED_ERROR = "The user email is required."
 
 BOOKING_OCCUPIED_ERROR = "This room is occupied on this date"
+BOOKING_DATES_ERROR = "The check-out date must be later than the check-in date."
+BOOKING_BULK_FORMAT_ERROR = "Expected a non-empty list of bookings of at most {max_items} items."
+BOOKING_BULK_CONFLICT_ERROR = "The rooms were booked by another request at the same time. Please retry."
+ROOM_HOLD_OCCUPIED_ERROR = "This room is already booked or held on these dates."
+ROOM_HOLD_NOT_FOUND_ERROR = "No live hold with this token was found for the room."
+ROOM_HOLD_NIGHTS_ERROR = "A room can be held for at most {max_nights} nights."
 
 REVIEW_COMM_LEN_ERROR = 'Your comment must be no longer than 1000 characters'
+
+ANALYTICS_RANGE_ERROR = "The date_to must be later than date_from, and the range must not exceed {max_days} days."
+
+SEARCH_QUERY_ERROR = "The search query must contain at least one word."
@@ -0,0 +1,214 @@
+import decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import fields, relations
+from rest_framework.serializers import BaseSerializer
+from rest_framework.settings import api_settings
+
+from booking_app.images import derivative_urls
+from booking_app.serializers.photo_field import PhotoDerivativesField
+from booking_app.storage import photo_storage
+
+# Поля, значение которых из values() уже совпадает с представлением DRF и не требует преобразования.
+PLAIN_FIELDS = (fields.BooleanField, fields.CharField, fields.IntegerField, relations.PrimaryKeyRelatedField)
+# Сколько ссылок на файлы запоминается за одну сериализацию (см. file_url_converter).
+FILE_URL_CACHE_SIZE = 1024
+# Поля, значение которых нельзя получить из одного столбца values().
+UNSUPPORTED_FIELDS = (BaseSerializer, fields.HiddenField, fields.ModelField, fields.SerializerMethodField)
+
+
+# Быстрая сериализация списков только для чтения. Сериализатор DRF для каждой строки создает объект модели и для
+# каждого поля вызывает get_attribute и to_representation, поэтому на больших страницах основное время уходит не на
+# базу данных, а на Python. ValuesSerializer один раз разбирает поля сериализатора DRF и для каждого заранее выбирает
+# столбец values() и функцию преобразования значения, повторяющую to_representation этого поля. Строки читаются через
+# values() без создания объектов моделей и преобразуются только там, где это нужно (Decimal, даты, файлы), поэтому
+# результат совпадает с выводом сериализатора DRF байт в байт.
+class ValuesSerializer:
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        self.serializer_class = serializer_class
+        self.names = []
+        self.columns = []
+        self.converters = []
+        self.file_fields = set()
+        self.derivative_fields = set()
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            model_field = self.model_field(model, field)
+            self.names.append(name)
+            self.columns.append('__'.join(field.source_attrs))
+            converter = self.converter(field, model_field)
+            if converter is not None:
+                self.converters.append((name, converter))
+            if isinstance(field, fields.FileField) and converter is not None:
+                self.file_fields.add(name)
+            if isinstance(field, PhotoDerivativesField):
+                self.derivative_fields.add(name)
+        # Если имена полей совпадают со столбцами, строку values() можно отдавать как есть, без копирования.
+        self.same_names = self.names == self.columns
+
+    # Поле модели, из которого сериализатор берет значение. Поля со сложным источником (source='*', методы и
+    # свойства модели, вложенные сериализаторы) через values() не читаются.
+    def model_field(self, model, field):
+        related = isinstance(field, (relations.RelatedField, relations.ManyRelatedField))
+        if not field.source_attrs or isinstance(field, UNSUPPORTED_FIELDS) or \
+                related and not isinstance(field, relations.PrimaryKeyRelatedField):
+            raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{field.field_name}: '
+                                       f'{type(field).__name__} is not supported by ValuesSerializer.')
+        model_field = None
+        for attr in field.source_attrs:
+            if model_field is not None:
+                model = model_field.related_model
+            try:
+                model_field = model._meta.get_field(attr)
+            except (FieldDoesNotExist, AttributeError):
+                raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{field.field_name}: '
+                                           f'source "{field.source}" is not a model field.')
+        return model_field
+
+    # Функция преобразования значения поля или None, если значение из values() уже подходит.
+    @staticmethod
+    def converter(field, model_field):
+        if isinstance(field, PLAIN_FIELDS) and getattr(field, 'pk_field', None) is None:
+            return None
+        if isinstance(field, fields.DecimalField):
+            return decimal_converter(field)
+        if isinstance(field, fields.DateTimeField):
+            return datetime_converter(field)
+        if isinstance(field, fields.DateField) and \
+                getattr(field, 'format', api_settings.DATE_FORMAT).lower() == fields.ISO_8601:
+            return date_converter
+        if isinstance(field, PhotoDerivativesField):
+            return photo_storage().url
+        if isinstance(field, fields.FileField):
+            if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+                return None
+            storage = model_field.storage
+            return lambda name: storage.url(name) if name else None
+        return field.to_representation
+
+    # Добавляет к queryset выборку нужных столбцов. Поле сортировки пагинации должно быть среди полей
+    # сериализатора, иначе курсор следующей страницы не построить.
+    def project(self, queryset):
+        return queryset.values(*self.columns)
+
+    # Преобразует строки values() в представление сериализатора. request нужен только для абсолютных ссылок на
+    # файлы, как в сериализаторе DRF с request в контексте.
+    def serialize(self, rows, request=None):
+        return list(self.iterate(rows, request))
+
+    # Функция преобразования поля для одной сериализации: ссылки на файлы и производные изображения строятся с
+    # учетом запроса и запоминаются.
+    def bind_converter(self, name, converter, request):
+        if name in self.file_fields:
+            return file_url_converter(converter, request)
+        if name in self.derivative_fields:
+            url = file_url_converter(converter, request)
+            return lambda derivatives: derivative_urls(derivatives, url)
+        return converter
+
+    # Ленивый вариант serialize для потоковой выгрузки: строки преобразуются по мере чтения.
+    def iterate(self, rows, request=None):
+        converters = [(name, self.bind_converter(name, converter, request)) for name, converter in self.converters]
+        names = self.names
+        columns = self.columns
+        for row in rows:
+            if not self.same_names:
+                row = {name: row[column] for name, column in zip(names, columns)}
+            for name, converter in converters:
+                value = row[name]
+                if value is not None:
+                    row[name] = converter(value)
+            yield row
+
+
+# Повторяет DecimalField.to_representation: округление до decimal_places в контексте точности max_digits и вывод
+# строкой без экспоненты.
+def decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.decimal_places is None or field.normalize_output or field.localize or not coerce_to_string:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+    return convert
+
+
+# Повторяет DateTimeField.to_representation для формата ISO 8601: перевод в часовой пояс поля и суффикс Z вместо
+# +00:00. Наивные значения и другие форматы обрабатывает само поле.
+def datetime_converter(field):
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() != fields.ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def date_converter(value):
+    return value.isoformat()
+
+
+# Ссылки на файлы запоминаются на время одной сериализации: у многих строк одни и те же фотографии, а построение
+# ссылки хранилищем (urljoin) - самое дорогое преобразование в строке. Размер словаря ограничен, чтобы память при
+# потоковой выгрузке не росла вместе с таблицей.
+def file_url_converter(converter, request):
+    urls = {}
+
+    def convert(name):
+        url = urls.get(name)
+        if url is None:
+            url = converter(name)
+            if url is not None and request is not None:
+                url = request.build_absolute_uri(url)
+            if len(urls) >= FILE_URL_CACHE_SIZE:
+                urls.clear()
+            urls[name] = url
+        return url
+    return convert
+
+
+# Разобранные сериализаторы кэшируются: разбор полей выполняется один раз на класс сериализатора.
+@lru_cache(maxsize=None)
+def values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
+
+
+# Примесь для списковых представлений с курсорной пагинацией. serialize_page выбирает страницу queryset и
+# сериализует ее через ValuesSerializer, а при FAST_SERIALIZATION_ENABLED=False - обычным сериализатором DRF.
+# Вывод в обоих случаях одинаковый.
+class ValuesListMixin:
+
+    def serialize_page(self, queryset, request=None):
+        if not settings.FAST_SERIALIZATION_ENABLED:
+            page = self.paginate_queryset(queryset)
+            context = {'request': request} if request is not None else {}
+            return self.serializer_class(page, many=True, context=context).data
+        serializer = values_serializer(self.serializer_class)
+        return serializer.serialize(self.paginate_queryset(serializer.project(queryset)), request)
+
+    # Замена ListModelMixin.list: ссылки на файлы строятся абсолютными, как в get_serializer.
+    def list(self, request, *args, **kwargs):
+        return self.get_paginated_response(
+            self.serialize_page(self.filter_queryset(self.get_queryset()), request)
+        )
@@ -0,0 +1,172 @@
+import io
+import json
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from booking_app.cache import bump_generations
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.job_model import Job
+from booking_app.models.photo_blob_model import PhotoBlob
+from booking_app.storage import photo_storage
+
+logger = logging.getLogger('booking_app.images')
+
+# Форматы производных изображений: расширение файла, формат Pillow и параметры сохранения.
+FORMATS = {
+    'webp': ('webp', 'WEBP', {'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'optimize': True, 'progressive': True}),
+}
+# Каталог хранилища, в который сохраняются производные изображения.
+DERIVATIVES_DIR = 'derivatives'
+
+
+# Производные изображения фотографий отелей и номеров. Для каждой загруженной фотографии строятся уменьшенные копии
+# размеров PHOTO_DERIVATIVE_SIZES в форматах PHOTO_DERIVATIVE_FORMATS, и их имена сохраняются в поле
+# photo_derivatives модели в виде {размер: {формат: имя файла}}. Копии строятся не в потоке запроса, а пулом
+# фоновых потоков после фиксации транзакции (Pillow отпускает GIL при масштабировании и сжатии). Уже загруженные
+# фотографии обрабатывает команда generate_photo_derivatives.
+
+# Имя файла производного изображения в хранилище.
+def derivative_name(name, size, fmt):
+    stem, _ = os.path.splitext(name)
+    return f'{DERIVATIVES_DIR}/{stem}_{size}.{FORMATS[fmt][0]}'
+
+
+# Строит производные изображения фотографии name и возвращает их имена. Размеры обрабатываются от большего к
+# меньшему, и каждый следующий уменьшается из предыдущего, а не из оригинала. Изображение только уменьшается:
+# фотография меньше размера сохраняется в нем как есть, с пересжатием в нужный формат. В хранилище по содержимому
+# производные получают имена по своему хэшу, как и сами фотографии.
+def build_derivatives(name, storage=None):
+    storage = storage or photo_storage()
+    with storage.open(name, 'rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGB')
+
+    derivatives = {}
+    sizes = sorted(settings.PHOTO_DERIVATIVE_SIZES.items(), key=lambda item: item[1], reverse=True)
+    for size, width in sizes:
+        if image.width > width:
+            image = image.resize((width, max(round(image.height * width / image.width), 1)),
+                                 Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for fmt in settings.PHOTO_DERIVATIVE_FORMATS:
+            _, pillow_format, params = FORMATS[fmt]
+            content = io.BytesIO()
+            image.save(content, pillow_format, quality=settings.PHOTO_DERIVATIVE_QUALITY, **params)
+            target = derivative_name(name, size, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            derivatives.setdefault(size, {})[fmt] = storage.save(target, ContentFile(content.getvalue()))
+    return derivatives
+
+
+# Представление поля photo_derivatives: те же размеры и форматы, но со ссылками вместо имен файлов. url -
+# функция, которая строит ссылку по имени файла.
+def derivative_urls(derivatives, url):
+    return {size: {fmt: url(name) for fmt, name in formats.items()} for size, formats in derivatives.items()}
+
+
+# Строит производные фотографии объекта и сохраняет их имена. Если у другого объекта та же фотография (тот же
+# файл) и производные уже построены, они используются повторно. Запись выполняется, только если за время построения
+# фотография объекта не изменилась. Объект сохраняется через save(), поэтому updated_at, ETag, кэш ответов и
+# счетчики ссылок на файлы обновляются так же, как при любом изменении объекта.
+def process_photo(model, pk, name):
+    derivatives = (model.all_objects.filter(photos=name).exclude(photo_derivatives={})
+                   .values_list('photo_derivatives', flat=True).first())
+    if not derivatives:
+        derivatives = build_derivatives(name)
+    with transaction.atomic():
+        instance = model.all_objects.select_for_update().filter(pk=pk, photos=name).first()
+        if instance is None:
+            return
+        # Файлы производных удерживаются до сохранения объекта (см. PhotoBlobManager.hold). Если их успели удалить
+        # после построения (например, вместе с прежним объектом, у которого они были), они строятся заново
+        files = {file for formats in derivatives.values() for file in formats.values()}
+        with PhotoBlob.objects.hold(files):
+            storage = photo_storage()
+            if not all(storage.exists(file) for file in files):
+                derivatives = build_derivatives(name, storage)
+            instance.photo_derivatives = derivatives
+            instance.save(update_fields=['photo_derivatives', 'updated_at'])
+
+
+# Построение производных с записью ошибок (например, поврежденного или отсутствующего файла) в лог: ошибка
+# фотографии не должна влиять на запрос, который ее загрузил.
+def run_photo_task(model, pk, name):
+    try:
+        process_photo(model, pk, name)
+    except Exception:
+        logger.exception('Failed to build derivatives of %s %s photo %s', model.__name__, pk, name)
+
+
+# Задача фонового потока. После нее соединения с базой данных закрываются, как в конце HTTP-запроса.
+def run_background_photo_task(model, pk, name):
+    try:
+        run_photo_task(model, pk, name)
+    finally:
+        close_old_connections()
+
+
+@lru_cache(maxsize=None)
+def photo_executor():
+    return ThreadPoolExecutor(max_workers=settings.PHOTO_DERIVATIVE_WORKERS, thread_name_prefix='photo-derivatives')
+
+
+# Ставит построение производных фотографии объекта в очередь после фиксации текущей транзакции. При
+# PHOTO_DERIVATIVE_WORKERS = 0 производные строятся сразу, в том же потоке. При PHOTO_DERIVATIVE_JOBS задача
+# записывается в очередь фоновых задач (booking_app/jobs.py) в той же транзакции и выполняется командой runworker.
+def schedule_derivatives(instance):
+    model, pk, name = type(instance), instance.pk, instance.photos.name
+    if settings.PHOTO_DERIVATIVE_JOBS:
+        Job.objects.enqueue('photo_derivatives', model._meta.label, pk, name)
+        return
+
+    def submit():
+        if settings.PHOTO_DERIVATIVE_WORKERS:
+            photo_executor().submit(run_background_photo_task, model, pk, name)
+        else:
+            run_photo_task(model, pk, name)
+    transaction.on_commit(submit)
+
+
+# Области кэша ответов, которые зависят от объектов отелей или номеров (см. booking_app/signals.py).
+def cache_scopes(model, rows):
+    if model is Hotel:
+        return {'hotels', *(f'hotel:{pk}' for pk, _ in rows)}
+    return {'rooms', *(f'room:{pk}' for pk, _ in rows), *(f'hotel:{hotel_id}:rooms' for _, hotel_id in rows)}
+
+
+# Массово изменяет фотографию или производные изображения объектов queryset одним запросом UPDATE, мимо save() и
+# сигналов. Поэтому updated_at, счетчики ссылок на файлы и поколения кэша ответов обновляются здесь. Возвращает
+# количество измененных объектов.
+def update_photo_rows(model, queryset, **values):
+    hotel_field = 'pk' if model is Hotel else 'hotel_id'
+    rows = list(queryset.values_list('pk', hotel_field, 'photos', 'photo_derivatives'))
+    if not rows:
+        return 0
+    # У многих объектов одни и те же файлы, поэтому изменения ссылок считаются один раз на каждый набор файлов
+    files = Counter((photo, json.dumps(derivatives, sort_keys=True)) for _, _, photo, derivatives in rows)
+    acquired, released = Counter(), Counter()
+    for (photo, derivatives), count in files.items():
+        instance = model(photos=photo, photo_derivatives=json.loads(derivatives))
+        instance.remember_photo()
+        for field, value in values.items():
+            setattr(instance, field, value)
+        names_acquired, names_released = instance.photo_file_changes()
+        acquired.update(dict.fromkeys(names_acquired, count))
+        released.update(dict.fromkeys(names_released, count))
+
+    with transaction.atomic():
+        updated = queryset.update(updated_at=timezone.now(), **values)
+        PhotoBlob.objects.acquire(acquired)
+        PhotoBlob.objects.release(released)
+    bump_generations(*cache_scopes(model, [(pk, hotel_id) for pk, hotel_id, _, _ in rows]))
+    return updated
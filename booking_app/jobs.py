@@ -0,0 +1,130 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+
+from django.apps import apps
+from django.db import close_old_connections, connections
+
+from booking_app.cache import bump_generations
+from booking_app.images import process_photo
+from booking_app.locations import refresh_locations
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.job_model import Job
+from booking_app.models.occupancy_model import HotelDailyOccupancy
+from booking_app.models.room_hold_model import RoomHold
+from booking_app.models.room_night_model import RoomNight
+
+logger = logging.getLogger('booking_app.jobs')
+
+# Фоновые задачи по имени.
+TASKS = {}
+
+
+# Очередь фоновых задач в таблице базы данных (Job), без отдельного брокера. Задача - функция, зарегистрированная
+# декоратором task под именем; в очередь она ставится вызовом Job.objects.enqueue(имя, *args, **kwargs) с
+# аргументами, которые сохраняются в JSON. Задачи выполняет команда runworker: процессы с пулами потоков, каждый
+# поток забирает готовые задачи (Job.objects.claim), выполняет их и удаляет выполненные. Задача с ошибкой
+# повторяется с задержкой, поэтому задачи должны быть идемпотентными: повтор после частичного выполнения не должен
+# ничего портить.
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+# Производные изображения фотографии (см. booking_app/images.py). model - метка модели, например booking_app.Hotel.
+@task('photo_derivatives')
+def photo_derivatives(model, pk, name):
+    process_photo(apps.get_model(model), pk, name)
+
+
+@task('recompute_hotel_ratings')
+def recompute_hotel_ratings(hotel_ids=None):
+    changed = Hotel.objects.recompute_ratings(hotel_ids)
+    if changed:
+        bump_generations('hotels', *(f'hotel:{hotel_id}' for hotel_id in changed))
+
+
+@task('rebuild_occupancy')
+def rebuild_occupancy(hotel_ids=None):
+    HotelDailyOccupancy.objects.rebuild(RoomNight.objects.occupancy_totals(hotel_ids), hotel_ids)
+
+
+@task('refresh_locations')
+def refresh_location_suggestions():
+    refresh_locations()
+
+
+@task('sweep_holds')
+def sweep_holds(batch_size=1000):
+    RoomHold.objects.sweep(batch_size)
+
+
+# Выполняет задачи, забранные одним обработчиком. Ошибка задачи записывается в лог и в строку задачи, а задача
+# возвращается в очередь для повтора; задача с неизвестным именем сразу получает статус failed. Выполненные задачи
+# удаляются вместе, одним запросом после всей пачки. После каждой задачи соединения с базой данных закрываются, если
+# они устарели или сломаны, как в конце HTTP-запроса. Возвращает количество выполненных и неудачных задач.
+def run_jobs(jobs):
+    done = []
+    try:
+        for job in jobs:
+            func = TASKS.get(job.task)
+            try:
+                if func is None:
+                    Job.objects.fail(job, f'Unknown task: {job.task}', retry=False)
+                    continue
+                try:
+                    func(*job.args, **job.kwargs)
+                except Exception:
+                    logger.exception('Job %s (%s) failed, attempt %s of %s', job.pk, job.task, job.attempts,
+                                     job.max_attempts)
+                    Job.objects.fail(job, traceback.format_exc())
+                    continue
+                done.append(job)
+            finally:
+                close_old_connections()
+    finally:
+        Job.objects.complete(done)
+    return len(done), len(jobs) - len(done)
+
+
+# Цикл одного потока обработчика: забирает пачками по batch_size и выполняет задачи, пока не установлено событие
+# stop. Если готовых задач нет, поток возвращает в очередь задачи с истекшим сроком и ждет poll_interval секунд, а
+# при burst завершается. Возвращает количество выполненных и неудачных задач.
+def work(worker, stop, poll_interval, burst=False, batch_size=1):
+    done = failed = 0
+    try:
+        while not stop.is_set():
+            jobs = Job.objects.claim(worker, batch_size)
+            if not jobs:
+                Job.objects.requeue_stale()
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            jobs_done, jobs_failed = run_jobs(jobs)
+            done += jobs_done
+            failed += jobs_failed
+    finally:
+        connections.close_all()
+    return done, failed
+
+
+# Запускает threads потоков обработчика в текущем процессе и ждет их завершения. Возвращает общее количество
+# выполненных и неудачных задач.
+def run_workers(threads, stop, poll_interval, burst=False, batch_size=1):
+    results = [(0, 0)] * threads
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+
+    def run(index):
+        results[index] = work(f'{prefix}:{index}', stop, poll_interval, burst, batch_size)
+
+    pool = [threading.Thread(target=run, args=(index,), name=f'job-worker-{index}') for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(done for done, _ in results), sum(failed for _, failed in results)
@@ -0,0 +1,97 @@
+import heapq
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from booking_app.models.hotel_model import Hotel
+
+LOCATIONS_KEY = 'booking_app:locations'
+VERSION_KEY = 'booking_app:locations:version'
+
+
+# Подсказки расположения отелей для строки поиска. Запрос приходит на каждое нажатие клавиши, поэтому подсказки
+# отдаются из индекса в памяти процесса, а не из базы данных. Индекс - отсортированный список нормализованных
+# расположений (без учета регистра и пробелов по краям) с количеством живых отелей в каждом; расположения с
+# префиксом находятся двоичным поиском. Размер индекса ограничен LOCATION_SUGGEST_MAX_LOCATIONS самыми частыми
+# расположениями.
+#
+# Список расположений строится одним группирующим запросом и хранится в кэше Django вместе с номером версии, общим
+# для всех процессов при общем кэше. При изменении отелей список строится заново после фиксации транзакции (см.
+# booking_app/signals.py), а процессы пересобирают свой индекс, увидев в кэше новую версию. Запрос подсказки читает
+# из кэша только номер версии; в базу данных он идет, если списка в кэше нет (первый запрос после запуска,
+# вытеснение или истечение срока). Список хранится в кэше LOCATION_SUGGEST_TIMEOUT секунд: с кэшем в памяти
+# процесса (LocMemCache по умолчанию) новую версию видит только процесс, в котором изменили отель, а остальные
+# процессы строят список заново по истечении срока.
+
+# Список расположений: пары (расположение, количество отелей) от самых частых. Варианты написания одного
+# расположения объединяются и показываются в самом частом написании.
+def location_counts():
+    rows = (Hotel.objects.order_by().values_list('location').annotate(hotel_count=Count('pk'))
+            .order_by('-hotel_count', 'location'))
+    counts = {}
+    spellings = {}
+    for location, hotel_count in rows:
+        key = location.strip().casefold()
+        if not key:
+            continue
+        counts[key] = counts.get(key, 0) + hotel_count
+        spellings.setdefault(key, location.strip())
+    locations = sorted(counts, key=lambda key: (-counts[key], key))[:settings.LOCATION_SUGGEST_MAX_LOCATIONS]
+    return [(spellings[key], counts[key]) for key in locations]
+
+
+# Строит список расположений и сохраняет его в кэше под новой версией.
+def refresh_locations():
+    data = (time.time_ns(), location_counts())
+    cache.set(LOCATIONS_KEY, data, timeout=settings.LOCATION_SUGGEST_TIMEOUT)
+    cache.set(VERSION_KEY, data[0], timeout=settings.LOCATION_SUGGEST_TIMEOUT)
+    return data
+
+
+class LocationIndex:
+
+    def __init__(self, version, locations):
+        self.version = version
+        # Список уже отсортирован от самых частых расположений: подсказки без префикса берутся из его начала
+        self.top = [{'location': location, 'hotel_count': hotel_count}
+                    for location, hotel_count in locations[:settings.LOCATION_SUGGEST_MAX_LIMIT]]
+        entries = sorted((location.casefold(), location, hotel_count) for location, hotel_count in locations)
+        self.keys = [key for key, _, _ in entries]
+        self.locations = [location for _, location, _ in entries]
+        self.counts = [hotel_count for _, _, hotel_count in entries]
+
+    # Расположения, которые начинаются с prefix, от большего количества отелей к меньшему.
+    def suggest(self, prefix, limit):
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return self.top[:limit]
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + '\U0010ffff', low)
+        best = heapq.nsmallest(limit, range(low, high), key=lambda index: (-self.counts[index], self.keys[index]))
+        return [{'location': self.locations[index], 'hotel_count': self.counts[index]} for index in best]
+
+
+# Индекс этого процесса.
+_index = None
+
+
+def location_index():
+    global _index
+    version = cache.get(VERSION_KEY)
+    if _index is not None and _index.version == version:
+        return _index
+    data = cache.get(LOCATIONS_KEY)
+    if data is None or data[0] != version:
+        # Список или номер версии истек или вытеснен из кэша. Номер версии не восстанавливается по списку: иначе
+        # его срок начался бы заново, и устаревший список жил бы дольше LOCATION_SUGGEST_TIMEOUT
+        data = refresh_locations()
+    if _index is None or _index.version != data[0]:
+        _index = LocationIndex(*data)
+    return _index
+
+
+def suggest_locations(prefix, limit):
+    return location_index().suggest(prefix, limit)
@@ -0,0 +1,216 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+
+from booking_app.management.commands.benchmark_endpoints import percentile
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.room_model import Room
+
+
+# Задержка каждого SQL-запроса, имитирующая медленную базу данных. Подключается к каждому новому соединению (в
+# каждом потоке) через сигнал connection_created и заодно считает выполненные запросы.
+class QueryDelay:
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        if self.seconds:
+            time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def connect(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+# Наибольшее количество потоков процесса за время замера (опрос каждые 5 мс).
+class ThreadSampler:
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(0.005):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+# Сравнение развертывания под WSGI и под ASGI при большом числе одновременных запросов. Оба обработчика Django
+# вызываются в процессе команды без HTTP-сервера, так же, как их вызывает сервер приложений:
+#   wsgi - WSGIHandler и синхронные представления DRF, запросы обслуживает пул из --threads потоков (как у gunicorn
+#          с воркером gthread), одновременно обрабатывается не больше --threads запросов;
+#   asgi - ASGIHandler и асинхронные представления /async/..., одновременно выполняется --concurrency запросов в
+#          одном цикле событий (как у uvicorn).
+# --db-latency добавляет задержку к каждому SQL-запросу и имитирует медленную базу данных. Для каждого режима
+# выводится пропускная способность, задержка (p50/p99), количество SQL-запросов на запрос, наибольшее количество
+# потоков и пиковый объем памяти, выделенной за прогон (tracemalloc, отдельным прогоном). Кэш ответов отключен.
+#
+# Пример: python manage.py benchmark_asgi --endpoint hotel_detail --requests 2000 --concurrency 500 --db-latency 20
+class Command(BaseCommand):
+    help = 'Compares WSGI (sync DRF views) and ASGI (async views) throughput and memory under high concurrency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=['hotels', 'hotel_detail', 'rooms', 'room_detail', 'free_rooms'],
+                            default='hotel_detail')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per mode.')
+        parser.add_argument('--concurrency', type=int, default=500, help='In-flight requests for ASGI.')
+        parser.add_argument('--threads', type=int, default=32, help='WSGI worker threads.')
+        parser.add_argument('--db-latency', type=float, default=0.0, help='Added latency per SQL query, ms.')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User as AuthUser
+
+        url = self.endpoints().get(options['endpoint'])
+        if url is None:
+            raise CommandError('Nothing to benchmark: run generate_data first.')
+
+        user, _ = AuthUser.objects.get_or_create(username='benchmark_endpoints')
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+        delay = QueryDelay(options['db_latency'] / 1000)
+        connection_created.connect(delay.connect)
+        modes = {
+            'wsgi': lambda: self.run_wsgi(url, cookie, options['requests'], options['threads']),
+            'asgi': lambda: asyncio.run(self.run_asgi(f'/async{url}', cookie, options['requests'],
+                                                      options['concurrency'])),
+        }
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'], 'QUERY_STATS_SAMPLE_RATE': 0.0,
+                     'RESPONSE_CACHE_ENABLED': False}
+        try:
+            with override_settings(**overrides):
+                for mode, run in modes.items():
+                    delay.count = 0
+                    with ThreadSampler() as threads:
+                        started = time.perf_counter()
+                        durations, statuses = run()
+                        elapsed = time.perf_counter() - started
+                    queries = delay.count / options['requests']
+
+                    tracemalloc.start()
+                    run()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+
+                    if set(statuses) != {200}:
+                        raise CommandError(f'{mode}: unexpected status codes {sorted(set(statuses))} for {url}.')
+                    durations.sort()
+                    self.stdout.write(
+                        f'{mode}  {options["requests"] / elapsed:8.1f} req/s  '
+                        f'p50 {percentile(durations, 0.50):8.1f} ms  p99 {percentile(durations, 0.99):8.1f} ms  '
+                        f'queries {queries:4.1f}  threads {threads.peak:5d}  peak {peak / 1024 / 1024:8.1f} MB'
+                    )
+        finally:
+            connection_created.disconnect(delay.connect)
+
+    # Адрес синхронного представления для каждой конечной точки. Асинхронное представление доступно по тому же
+    # адресу с префиксом /async.
+    @staticmethod
+    def endpoints():
+        hotel = Hotel.objects.order_by('pk').first()
+        room = Room.objects.order_by('pk').first()
+        if hotel is None or room is None:
+            return {}
+        check_in = date.today() + timedelta(days=30)
+        return {
+            'hotels': '/hotels/',
+            'hotel_detail': f'/hotels/{hotel.pk}/',
+            'rooms': f'/rooms/?hotel_id={hotel.pk}',
+            'room_detail': f'/rooms/{room.pk}/',
+            'free_rooms': f'/hotels/free_rooms/?check_in={check_in}&check_out={check_in + timedelta(days=3)}'
+                          f'&location={hotel.location}',
+        }
+
+    # Прогон под WSGI: пул потоков вызывает WSGIHandler так же, как многопоточный WSGI-сервер.
+    @staticmethod
+    def run_wsgi(url, cookie, requests, threads):
+        application = WSGIHandler()
+        path = urlsplit(url)
+
+        def request(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path.path, 'QUERY_STRING': path.query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie, 'wsgi.version': (1, 0),
+                'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            statuses = []
+            started = time.perf_counter()
+            result = application(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+            try:
+                b''.join(result)
+            finally:
+                result.close()
+            return (time.perf_counter() - started) * 1000, statuses[0]
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(request, range(requests)))
+        return [duration for duration, _ in results], [status for _, status in results]
+
+    # Прогон под ASGI: до concurrency запросов одновременно передаются в ASGIHandler в одном цикле событий, как
+    # это делает ASGI-сервер.
+    @staticmethod
+    async def run_asgi(url, cookie, requests, concurrency):
+        application = ASGIHandler()
+        path = urlsplit(url)
+        semaphore = asyncio.Semaphore(concurrency)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path.path, 'raw_path': path.path.encode(), 'query_string': path.query.encode(), 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+
+        async def request():
+            received = False
+            statuses = []
+
+            # Тело запроса пустое. Дальше Django ждет отключения клиента, пока формируется ответ.
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with semaphore:
+                started = time.perf_counter()
+                await application(dict(scope), receive, send)
+                return (time.perf_counter() - started) * 1000, statuses[0]
+
+        results = await asyncio.gather(*(request() for _ in range(requests)))
+        return [duration for duration, _ in results], [status for _, status in results]
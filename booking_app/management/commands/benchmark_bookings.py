@@ -0,0 +1,181 @@
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import override_settings
+
+from booking_app.management.commands.benchmark_endpoints import percentile
+from booking_app.models.booking_model import Booking
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.room_model import Room
+from booking_app.models.room_night_model import RoomNight
+from booking_app.models.user_model import User
+
+BATCH_SIZE = 2000
+# Бронирование генерируется на STAY ночей, после каждого остается одна свободная ночь
+STAY = 3
+
+
+# Нагрузочный тест проверки доступности. Команда создает временный отель с --rooms номерами и заполняет их
+# бронированиями до каждого размера из --sizes (общее количество сгенерированных бронирований, по STAY ночей в
+# индексе занятости на каждое). На каждом размере измеряются задержки (p50/p95) проверки RoomNight.objects.is_free
+# на случайных номерах и датах, занятых и свободных, и запроса POST /bookings/ через тестовый клиент DRF на
+# свободную ночь между бронированиями. Все созданные строки откатываются в конце, база данных не меняется.
+#
+# Размеры по умолчанию ограничены 1M бронирований. 10M бронирований - это 30M строк индекса занятости в одной
+# транзакции: на SQLite их генерация занимает больше часа (1M - около 11 минут, время растет быстрее размера), а
+# файл базы данных и журнал отката вырастают на несколько гигабайт. Проверка доступности - поиск по уникальному
+# индексу (room_id, night), его глубина растет логарифмически, поэтому задержки до 1M уже показывают зависимость
+# от размера. Больший размер можно задать через --sizes на сервере с MySQL.
+#
+# Пример: python manage.py benchmark_bookings --sizes 10000,100000,1000000 --rooms 1000 --output bookings.json
+class Command(BaseCommand):
+    help = 'Benchmarks RoomNight.objects.is_free and POST /bookings/ at several generated booking table sizes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated numbers of generated bookings to measure at.')
+        parser.add_argument('--rooms', type=int, default=1000, help='Rooms the generated bookings are spread over.')
+        parser.add_argument('--checks', type=int, default=1000, help='Measured is_free calls per size.')
+        parser.add_argument('--posts', type=int, default=200, help='Measured POST /bookings/ requests per size.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--output', default=None, help='Path of the JSON file to write the results to.')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        if options['rooms'] < 1 or sizes[0] < options['rooms']:
+            raise CommandError('Every size must be at least the number of rooms.')
+
+        rng = random.Random(options['seed'])
+        results = []
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'], 'QUERY_STATS_SAMPLE_RATE': 0.0}
+        with override_settings(**overrides), transaction.atomic():
+            client, user = self.client()
+            rooms = self.create_rooms(options['rooms'])
+            self.start = date.today() + timedelta(days=365)
+            per_room = 0
+            for size in sizes:
+                started = time.perf_counter()
+                per_room = self.fill(rooms, user, per_room, size // len(rooms))
+                generated = time.perf_counter() - started
+                result = {
+                    'bookings': per_room * len(rooms),
+                    'room_nights': RoomNight.objects.count(),
+                    'is_free': self.measure_is_free(rng, rooms, per_room, options['checks']),
+                    'post': self.measure_post(rng, client, rooms, user, per_room, options['posts']),
+                }
+                results.append(result)
+                self.stdout.write(
+                    f"bookings {result['bookings']:>9}  room nights {result['room_nights']:>9}  "
+                    f"is_free p50 {result['is_free']['p50_ms']:6.3f} ms p95 {result['is_free']['p95_ms']:6.3f} ms  "
+                    f"POST p50 {result['post']['p50_ms']:7.2f} ms p95 {result['post']['p95_ms']:7.2f} ms "
+                    f"({result['post']['created']} created)  generated in {generated:.1f}s"
+                )
+            transaction.set_rollback(True)
+
+        if options['output']:
+            report = {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'rooms': options['rooms'],
+                'sizes': results,
+            }
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    @staticmethod
+    def client():
+        from django.contrib.auth.models import User as AuthUser
+        from rest_framework.test import APIClient
+
+        auth_user, _ = AuthUser.objects.get_or_create(username='benchmark_bookings')
+        client = APIClient()
+        client.force_authenticate(auth_user)
+        user = User.objects.create(username=f'benchmark-{time.time_ns()}', email='benchmark@example.com',
+                                   password='benchmark')
+        return client, user
+
+    @staticmethod
+    def create_rooms(count):
+        hotel = Hotel.objects.create(name=f'benchmark-{time.time_ns()}', location='benchmark',
+                                     description='benchmark', photos='benchmark.jpg', rating=0)
+        first = (Room._base_manager.aggregate(last=Max('pk'))['last'] or 0) + 1
+        return Room.objects.bulk_create(
+            [Room(room_id=first + index, hotel_id=hotel, room_type='economy', photos='benchmark.jpg',
+                  price_per_night=100) for index in range(count)], batch_size=BATCH_SIZE)
+
+    # Заезд бронирования number номера: бронирования идут друг за другом через одну свободную ночь.
+    def check_in(self, number):
+        return self.start + timedelta(days=number * (STAY + 1))
+
+    # Добавляет каждому номеру бронирования с номерами от start до end и возвращает end. Строки создаются с явными
+    # первичными ключами, как в generate_data.
+    def fill(self, rooms, user, start, end):
+        next_id = (Booking._base_manager.aggregate(last=Max('pk'))['last'] or 0) + 1
+        batch = []
+        for number in range(start, end):
+            for room in rooms:
+                check_in_date = self.check_in(number)
+                batch.append(Booking(booking_id=next_id, room_id=room, user_id=user, check_in_date=check_in_date,
+                                     check_out_date=check_in_date + timedelta(days=STAY)))
+                next_id += 1
+                if len(batch) >= BATCH_SIZE:
+                    self.save_bookings(batch)
+                    batch = []
+        self.save_bookings(batch)
+        return end
+
+    @staticmethod
+    def save_bookings(bookings):
+        if bookings:
+            Booking.objects.bulk_create(bookings)
+            RoomNight.objects.occupy_many(bookings)
+
+    # Проверки на случайных датах внутри заполненного окна: примерно четверть из них приходится на свободные ночи.
+    def measure_is_free(self, rng, rooms, per_room, checks):
+        durations = []
+        for _ in range(checks):
+            room = rng.choice(rooms)
+            check_in_date = self.check_in(rng.randrange(per_room)) + timedelta(days=rng.randrange(STAY + 1))
+            check_out_date = check_in_date + timedelta(days=rng.randint(1, STAY))
+            started = time.perf_counter()
+            RoomNight.objects.is_free(room.pk, check_in_date, check_out_date)
+            durations.append((time.perf_counter() - started) * 1000)
+        return self.summary(durations)
+
+    # Каждый запрос бронирует свою свободную ночь между бронированиями, поэтому все запросы проходят полный путь
+    # создания бронирования.
+    def measure_post(self, rng, client, rooms, user, per_room, posts):
+        gaps = rng.sample(range(len(rooms) * per_room), min(posts, len(rooms) * per_room))
+        durations = []
+        created = 0
+        for gap in gaps:
+            room = rooms[gap % len(rooms)]
+            check_in_date = self.check_in(gap // len(rooms)) + timedelta(days=STAY)
+            payload = {'user_id': user.pk, 'room_id': room.pk, 'check_in_date': check_in_date.isoformat(),
+                       'check_out_date': (check_in_date + timedelta(days=1)).isoformat()}
+            started = time.perf_counter()
+            response = client.post('/bookings/', payload, format='json')
+            durations.append((time.perf_counter() - started) * 1000)
+            created += response.status_code == 201
+        return {**self.summary(durations), 'created': created}
+
+    @staticmethod
+    def summary(durations):
+        durations.sort()
+        return {
+            'p50_ms': round(percentile(durations, 0.50), 3),
+            'p95_ms': round(percentile(durations, 0.95), 3),
+            'mean_ms': round(statistics.fmean(durations), 3),
+        }
@@ -0,0 +1,157 @@
+import json
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from booking_app.middleware import QueryCounter
+from booking_app.models.booking_model import Booking
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.review_model import Review
+from booking_app.models.room_model import Room
+from booking_app.models.user_model import User
+
+
+# Процентиль отсортированной выборки (метод ближайшего ранга).
+def percentile(values, fraction):
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+# Нагрузочный тест чтения. Команда вызывает каждую конечную точку booking_app через тестовый клиент DRF от имени
+# служебного пользователя и для каждой из них измеряет задержку (p50/p95/p99), количество SQL-запросов на запрос и
+# пиковый объем памяти, выделенной при обработке запроса (tracemalloc). Память измеряется отдельным проходом, чтобы
+# tracemalloc не искажал задержку. Результаты выводятся таблицей и записываются в JSON-файл (--output) вместе с
+# размером данных и параметрами запуска, чтобы прогоны можно было сравнивать между собой.
+#
+# Пример: python manage.py benchmark_endpoints --requests 200 --no-cache --output bench.json
+class Command(BaseCommand):
+    help = 'Benchmarks the read endpoints and reports latency percentiles, queries per request and peak memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint.')
+        parser.add_argument('--no-cache', action='store_true', help='Disable the response cache during the run.')
+        parser.add_argument('--endpoint', action='append', default=None,
+                            help='Benchmark only endpoints with this name (can be repeated).')
+        parser.add_argument('--output', default=None, help='Path of the JSON file to write the results to.')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User as AuthUser
+        from rest_framework.test import APIClient
+
+        endpoints = self.endpoints()
+        if options['endpoint']:
+            endpoints = {name: url for name, url in endpoints.items() if name in options['endpoint']}
+        if not endpoints:
+            raise CommandError('No endpoints to benchmark: the database is empty or --endpoint matched nothing.')
+
+        user, _ = AuthUser.objects.get_or_create(username='benchmark_endpoints')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'], 'QUERY_STATS_SAMPLE_RATE': 0.0}
+        if options['no_cache']:
+            overrides['RESPONSE_CACHE_ENABLED'] = False
+
+        results = {}
+        with override_settings(**overrides):
+            for name, url in endpoints.items():
+                results[name] = self.measure(client, url, options['requests'], options['warmup'])
+                self.stdout.write(
+                    f"{name:<22} {results[name]['status']} "
+                    f"p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+                    f"p99 {results[name]['p99_ms']:8.2f} ms  queries {results[name]['queries']:5.1f}  "
+                    f"peak {results[name]['peak_memory_kb']:9.1f} KB"
+                )
+
+        if options['output']:
+            report = {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'response_cache': not options['no_cache'],
+                'requests': options['requests'],
+                'dataset': {model.__name__.lower(): model.objects.count()
+                            for model in (Hotel, Room, Booking, Review, User)},
+                'endpoints': results,
+            }
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    # Конечные точки, которые проверяет команда. Идентификаторы берутся из первых строк данных.
+    @staticmethod
+    def endpoints():
+        endpoints = {}
+        hotel = Hotel.objects.order_by('pk').first()
+        room = Room.objects.order_by('pk').first()
+        booking = Booking.objects.order_by('pk').first()
+        review = Review.objects.order_by('pk').first()
+        user = User.objects.order_by('pk').first()
+        if hotel is not None:
+            check_in_date = date.today() + timedelta(days=30)
+            endpoints.update({
+                'hotels': '/hotels/',
+                'hotel_detail': f'/hotels/{hotel.pk}/',
+                'hotel_reviews': f'/hotels/{hotel.pk}/reviews/',
+                'hotel_rooms': f'/rooms/?hotel_id={hotel.pk}',
+                'free_rooms': f'/hotels/free_rooms/?check_in={check_in_date}'
+                              f'&check_out={check_in_date + timedelta(days=3)}&location={hotel.location}',
+            })
+        if room is not None:
+            endpoints.update({'rooms': '/rooms/', 'room_detail': f'/rooms/{room.pk}/'})
+        if booking is not None:
+            endpoints.update({'bookings': '/bookings/', 'booking_detail': f'/bookings/{booking.pk}/'})
+        if review is not None:
+            endpoints.update({'reviews': '/reviews/', 'review_detail': f'/reviews/{review.pk}/'})
+        if user is not None:
+            endpoints.update({'users': '/users/', 'user_detail': f'/users/{user.pk}/'})
+        return endpoints
+
+    @staticmethod
+    def measure(client, url, requests, warmup):
+        for _ in range(warmup):
+            client.get(url)
+
+        durations = []
+        queries = []
+        status_code = None
+        for _ in range(requests):
+            counter = QueryCounter()
+            with ExitStack() as stack:
+                for db in connections.all():
+                    stack.enter_context(db.execute_wrapper(counter))
+                started = time.perf_counter()
+                response = client.get(url)
+                durations.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count)
+            status_code = response.status_code
+
+        peaks = []
+        for _ in range(min(requests, 10)):
+            tracemalloc.start()
+            client.get(url)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        durations.sort()
+        return {
+            'url': url,
+            'status': status_code,
+            'p50_ms': round(percentile(durations, 0.50), 3),
+            'p95_ms': round(percentile(durations, 0.95), 3),
+            'p99_ms': round(percentile(durations, 0.99), 3),
+            'mean_ms': round(statistics.fmean(durations), 3),
+            'queries': statistics.fmean(queries),
+            'peak_memory_kb': round(max(peaks) / 1024, 1),
+        }
@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from booking_app.fast_serialization import values_serializer
+from booking_app.models.booking_model import Booking
+from booking_app.models.review_model import Review
+from booking_app.models.room_model import Room
+from booking_app.models.user_model import User
+from booking_app.renderers import FastJSONRenderer, orjson
+from booking_app.serializers.booking_serializer import BookingSerializer
+from booking_app.serializers.review_serializer import AllReviewsSerializer
+from booking_app.serializers.room_serializer import AllRoomsSerializer
+from booking_app.serializers.user_serializer import AllUsersSerializer
+
+SERIALIZERS = {
+    'rooms': (Room, AllRoomsSerializer),
+    'reviews': (Review, AllReviewsSerializer),
+    'bookings': (Booking, BookingSerializer),
+    'users': (User, AllUsersSerializer),
+}
+
+
+# Сравнение двух способов сериализации большого списка: сериализатор DRF по объектам моделей с JSONRenderer и
+# ValuesSerializer по строкам values() с FastJSONRenderer (orjson, если установлен). Для каждого способа отдельно
+# измеряется чтение и сериализация строк и рендеринг JSON, берется медиана из --repeat прогонов. В конце команда
+# проверяет, что оба способа дали одинаковые байты.
+#
+# Пример: python manage.py benchmark_serialization --rows 100000 --repeat 5
+class Command(BaseCommand):
+    help = 'Compares DRF serializers with the values() serialization path on a large list.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=list(SERIALIZERS), default='rooms')
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        model, serializer_class = SERIALIZERS[options['model']]
+        queryset = model.objects.order_by('pk')[:options['rows']]
+        rows = queryset.count()
+        if not rows:
+            raise CommandError(f"No {options['model']} to serialize: run generate_data first.")
+
+        def drf():
+            return serializer_class(list(queryset), many=True).data
+
+        def fast():
+            serializer = values_serializer(serializer_class)
+            return serializer.serialize(serializer.project(queryset))
+
+        paths = {
+            'drf': (drf, JSONRenderer()),
+            'values': (fast, FastJSONRenderer()),
+        }
+        content = {}
+        with override_settings(FAST_JSON_RENDERER=True):
+            for name, (serialize, renderer) in paths.items():
+                serialize_times = []
+                render_times = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    data = serialize()
+                    serialized = time.perf_counter()
+                    content[name] = renderer.render(data)
+                    serialize_times.append(serialized - started)
+                    render_times.append(time.perf_counter() - serialized)
+                serialize_ms = statistics.median(serialize_times) * 1000
+                render_ms = statistics.median(render_times) * 1000
+                self.stdout.write(
+                    f'{name:<7} serialize {serialize_ms:9.1f} ms  render {render_ms:8.1f} ms  '
+                    f'total {serialize_ms + render_ms:9.1f} ms  ({rows} rows, {len(content[name])} bytes)'
+                )
+
+        self.stdout.write(f"JSON encoder: {'orjson' if orjson is not None else 'json (orjson is not installed)'}")
+        if content['drf'] != content['values']:
+            raise CommandError('The two serialization paths produced different output.')
+        self.stdout.write('Output is byte-identical.')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from booking_app.cache import cache_stats
+
+
+# Выводит статистику кэша ответов для отелей и номеров. Со встроенным кэшем в памяти процесса (LocMemCache) каждый
+# процесс ведет свою статистику, поэтому команда покажет общие значения только для общего бэкенда кэша (например,
+# файлового).
+class Command(BaseCommand):
+    help = 'Prints hit/miss statistics of the hotel and room response cache.'
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(f"hits: {stats['hits']}, misses: {stats['misses']}, hit ratio: {stats['hit_ratio']:.2%}")
@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand
+
+from booking_app.images import update_photo_rows
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.room_model import Room
+from booking_app.storage import content_digest, file_digest, photo_storage
+
+MODELS = {
+    'hotels': Hotel,
+    'rooms': Room,
+}
+
+
+# Перенос фотографий, загруженных до ContentAddressedStorage, в хранилище по содержимому. Каждый файл со старым
+# именем (и его производные изображения) копируется один раз под именем по хэшу содержимого, после чего все отели и
+# номера с этим файлом, включая мягко удаленные, переключаются на новое имя одним запросом (update_photo_rows, он же
+# заводит счетчики ссылок). Одинаковые файлы с разными именами становятся одним файлом. Старые файлы, на которые
+# больше никто не ссылается, удаляются (с --keep-originals остаются). Файлы, которых нет в хранилище, пропускаются.
+# С --dry-run файлы только читаются и выводится, сколько места освободится.
+#
+# Пример: python manage.py deduplicate_photos --dry-run
+class Command(BaseCommand):
+    help = 'Moves legacy hotel and room photos into content-addressed storage, merging identical files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be done.')
+        parser.add_argument('--keep-originals', action='store_true', help='Do not delete legacy files.')
+
+    def handle(self, *args, **options):
+        self.storage = photo_storage()
+        self.dry_run = options['dry_run']
+        # Старое имя файла -> новое имя (None, если файл не удалось прочитать) и размеры файлов до и после переноса
+        self.moved = {}
+        self.legacy_sizes = {}
+        self.content_sizes = {}
+
+        for name, model in MODELS.items():
+            updated = 0
+            photos = (model.all_objects.exclude(photos='').values_list('photos', 'photo_derivatives')
+                      .distinct().order_by('photos'))
+            groups = {}
+            for photo, derivatives in photos:
+                if not content_digest(photo):
+                    groups.setdefault(photo, []).append(derivatives)
+            for photo, variants in groups.items():
+                new_photo = self.move(photo)
+                if new_photo is None:
+                    continue
+                # Производные строятся по фотографии, поэтому обычно одинаковы у всех объектов с ней. Если нет,
+                # они сбрасываются, и их заново построит generate_photo_derivatives.
+                derivatives = self.move_derivatives(variants[0]) if len(variants) == 1 else {}
+                if derivatives is None:
+                    derivatives = {}
+                if not self.dry_run:
+                    updated += update_photo_rows(model, model.all_objects.filter(photos=photo), photos=new_photo,
+                                                 photo_derivatives=derivatives)
+            self.stdout.write(f'{name}: {len(groups)} legacy photos, {updated} objects updated')
+
+        deleted = 0
+        if not self.dry_run and not options['keep_originals']:
+            for old, new in self.moved.items():
+                if new is not None and not self.referenced(old):
+                    self.storage.delete(old)
+                    deleted += 1
+
+        legacy_bytes = sum(self.legacy_sizes.values())
+        content_bytes = sum(self.content_sizes.values())
+        self.stdout.write(f'Legacy files: {len(self.legacy_sizes)} ({legacy_bytes} bytes), content-addressed files: '
+                          f'{len(self.content_sizes)} ({content_bytes} bytes), saved {legacy_bytes - content_bytes} '
+                          f'bytes, deleted {deleted} legacy files' + (' (dry run)' if self.dry_run else ''))
+
+    # Копирует файл со старым именем в хранилище по содержимому и возвращает новое имя
+    def move(self, name):
+        if name in self.moved:
+            return self.moved[name]
+        try:
+            with self.storage.open(name, 'rb') as file:
+                if self.dry_run:
+                    new_name = self.storage.content_name(file_digest(file), name)
+                else:
+                    new_name = self.storage.save(name, file)
+        except OSError as error:
+            self.stderr.write(f'{name}: {error}')
+            new_name = None
+        else:
+            self.legacy_sizes[name] = self.storage.size(name)
+            self.content_sizes[new_name] = self.legacy_sizes[name]
+        self.moved[name] = new_name
+        return new_name
+
+    def move_derivatives(self, derivatives):
+        moved = {}
+        for size, formats in derivatives.items():
+            for fmt, name in formats.items():
+                new_name = name if content_digest(name) else self.move(name)
+                if new_name is None:
+                    return None
+                moved.setdefault(size, {})[fmt] = new_name
+        return moved
+
+    @staticmethod
+    def referenced(name):
+        for model in MODELS.values():
+            if model.all_objects.filter(photos=name).exists():
+                return True
+        return False
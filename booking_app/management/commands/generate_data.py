@@ -0,0 +1,143 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from booking_app.cache import bump_generations
+from booking_app.models.booking_model import Booking
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.review_model import Review
+from booking_app.models.room_model import Room
+from booking_app.models.room_night_model import RoomNight
+from booking_app.models.user_model import User
+
+CITIES = ['Paris', 'Rome', 'Berlin', 'Madrid', 'Vienna', 'Prague', 'Lisbon', 'Warsaw', 'Riga', 'Tallinn',
+          'Vilnius', 'Budapest', 'Athens', 'Oslo', 'Helsinki', 'Dublin', 'Minsk', 'Kyiv', 'Sofia', 'Zagreb']
+ROOM_TYPES = {'economy': (40, 120), 'deluxe': (100, 300), 'luxury': (250, 900)}
+RATINGS = [Decimal(value) for value in ('1.0', '1.5', '2.0', '2.5', '3.0', '3.5', '4.0', '4.5', '5.0')]
+RATING_WEIGHTS = [1, 1, 2, 3, 6, 10, 16, 14, 9]
+BATCH_SIZE = 2000
+
+
+# Генератор синтетических данных для нагрузочного тестирования. Создает пользователей, отели, номера, бронирования
+# и отзывы через bulk_create пачками по BATCH_SIZE строк. Бронирования одного номера идут друг за другом без
+# пересечений: заезды распределены по окну --days дней от --start, длительность проживания чаще короткая (1-3 ночи),
+# между бронированиями случайные промежутки, поэтому занятость номеров получается разной. Индекс занятых ночей
+# (RoomNight) и статистика отзывов отелей заполняются здесь же, так как bulk_create не вызывает сигналы. Все строки
+# создаются с явными первичными ключами: так на них можно сразу ссылаться, даже на базах данных, которые не
+# возвращают ключи из bulk_create (MySQL).
+#
+# Пример: python manage.py generate_data --hotels 1000 --rooms-per-hotel 50 --bookings-per-room 20 --seed 1
+class Command(BaseCommand):
+    help = 'Generates a synthetic dataset of users, hotels, rooms, bookings and reviews with bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--hotels', type=int, default=100)
+        parser.add_argument('--rooms-per-hotel', type=int, default=20)
+        parser.add_argument('--bookings-per-room', type=int, default=10,
+                            help='Average number of bookings per room.')
+        parser.add_argument('--reviews-per-hotel', type=int, default=20,
+                            help='Average number of reviews per hotel.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Length of the date window the bookings are spread over.')
+        parser.add_argument('--start', type=date.fromisoformat, default=None,
+                            help='First day of the booking window (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        with transaction.atomic():
+            users = self.create_users(rng, options['users'])
+            hotels = self.create_hotels(rng, options['hotels'])
+            rooms = self.create_rooms(rng, hotels, options['rooms_per_hotel'])
+            bookings = self.create_bookings(rng, rooms, users, options)
+            reviews = self.create_reviews(rng, hotels, users, options['reviews_per_hotel'])
+            Hotel.objects.recompute_ratings([hotel.pk for hotel in hotels])
+        bump_generations('hotels', 'rooms')
+
+        self.stdout.write(
+            f'users: {len(users)}, hotels: {len(hotels)}, rooms: {len(rooms)}, bookings: {bookings}, '
+            f'reviews: {reviews}, elapsed: {time.perf_counter() - started:.1f}s'
+        )
+
+    # Первый свободный первичный ключ. Он же используется в уникальных полях (имена отелей и пользователей), чтобы
+    # повторный запуск команды не конфликтовал с уже сгенерированными данными. Считается по всем строкам, включая
+    # мягко удаленные, поэтому используется базовый менеджер модели.
+    @staticmethod
+    def next_number(model):
+        return (model._base_manager.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def create_users(self, rng, count):
+        first = self.next_number(User)
+        users = [User(user_id=first + index, username=f'user{first + index}',
+                      email=f'user{first + index}@example.com', password=f'{rng.getrandbits(64):016x}')
+                 for index in range(count)]
+        return User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+    def create_hotels(self, rng, count):
+        first = self.next_number(Hotel)
+        hotels = [Hotel(hotel_id=first + index, name=f'Hotel {first + index}', location=rng.choice(CITIES),
+                        description='Synthetic hotel', photos=f'hotels/{first + index}.jpg',
+                        rating=rng.choice(RATINGS))
+                  for index in range(count)]
+        return Hotel.objects.bulk_create(hotels, batch_size=BATCH_SIZE)
+
+    def create_rooms(self, rng, hotels, rooms_per_hotel):
+        next_id = self.next_number(Room)
+        rooms = []
+        for hotel in hotels:
+            for _ in range(rooms_per_hotel):
+                room_type = rng.choices(list(ROOM_TYPES), weights=[6, 3, 1])[0]
+                low, high = ROOM_TYPES[room_type]
+                rooms.append(Room(room_id=next_id, hotel_id=hotel, room_type=room_type,
+                                  photos=f'rooms/{room_type}.jpg', price_per_night=Decimal(rng.randint(low, high)),
+                                  capacity=rng.choices([1, 2, 3, 4], weights=[2, 6, 2, 1])[0],
+                                  available=rng.random() > 0.05))
+                next_id += 1
+        return Room.objects.bulk_create(rooms, batch_size=BATCH_SIZE)
+
+    def create_bookings(self, rng, rooms, users, options):
+        start = options['start'] or date.today()
+        days = options['days']
+        mean_gap = max(days / max(options['bookings_per_room'], 1) - 3, 0)
+        next_id = self.next_number(Booking)
+        created = 0
+        batch = []
+        for room in rooms:
+            check_in_date = start + timedelta(days=int(rng.expovariate(1 / (mean_gap + 1))))
+            while True:
+                nights = min(1 + int(rng.expovariate(1 / 2.5)), 21)
+                check_out_date = check_in_date + timedelta(days=nights)
+                if check_out_date > start + timedelta(days=days):
+                    break
+                batch.append(Booking(booking_id=next_id, room_id=room,
+                                     user_id=rng.choice(users) if users else None,
+                                     check_in_date=check_in_date, check_out_date=check_out_date))
+                next_id += 1
+                check_in_date = check_out_date + timedelta(days=int(rng.expovariate(1 / (mean_gap + 1))))
+            if len(batch) >= BATCH_SIZE:
+                created += self.save_bookings(batch)
+                batch = []
+        return created + self.save_bookings(batch)
+
+    @staticmethod
+    def save_bookings(bookings):
+        Booking.objects.bulk_create(bookings, batch_size=BATCH_SIZE)
+        RoomNight.objects.occupy_many(bookings)
+        return len(bookings)
+
+    def create_reviews(self, rng, hotels, users, reviews_per_hotel):
+        reviews = []
+        for hotel in hotels:
+            for _ in range(rng.randint(0, 2 * reviews_per_hotel)):
+                reviews.append(Review(hotel_id=hotel, user_id=rng.choice(users) if users else None,
+                                      comment='Synthetic review',
+                                      rating=rng.choices(RATINGS, weights=RATING_WEIGHTS)[0]))
+        Review.objects.bulk_create(reviews, batch_size=BATCH_SIZE)
+        return len(reviews)
@@ -0,0 +1,69 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from booking_app.images import build_derivatives, update_photo_rows
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.room_model import Room
+
+MODELS = {
+    'hotels': Hotel,
+    'rooms': Room,
+}
+
+
+# Строит производные изображения одной фотографии в процессе пула. Ошибка отдельного файла (файл отсутствует или
+# не является изображением) не останавливает команду: вместо результата возвращается текст ошибки.
+def build(name):
+    try:
+        return name, build_derivatives(name), None
+    except Exception as error:
+        return name, None, f'{type(error).__name__}: {error}'
+
+
+# Заполнение производных изображений для уже загруженных фотографий отелей и номеров. У многих объектов одна и та же
+# фотография, поэтому производные строятся один раз на каждое имя файла, а затем записываются всем объектам с этой
+# фотографией одним запросом (update_photo_rows). Изображения обрабатываются пулом процессов (по умолчанию по
+# одному на ядро), запись в базу данных выполняет основной процесс. По умолчанию обрабатываются только объекты без
+# производных, с --force - все.
+#
+# Пример: python manage.py generate_photo_derivatives --model rooms --workers 8
+class Command(BaseCommand):
+    help = 'Builds photo derivatives for existing hotels and rooms across all CPU cores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=list(MODELS), action='append', default=None,
+                            help='Process only this model (can be repeated).')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes.')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that already exist.')
+
+    def handle(self, *args, **options):
+        for name in options['model'] or list(MODELS):
+            model = MODELS[name]
+            queryset = model.objects.exclude(photos='')
+            if not options['force']:
+                queryset = queryset.filter(photo_derivatives={})
+            names = list(queryset.values_list('photos', flat=True).distinct())
+            if not names:
+                self.stdout.write(f'{name}: nothing to do')
+                continue
+
+            started = time.perf_counter()
+            updated = 0
+            failed = 0
+            # Соединения с базой данных не должны переходить в процессы пула
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                for photo, derivatives, error in executor.map(build, names, chunksize=4):
+                    if error is not None:
+                        failed += 1
+                        self.stderr.write(f'{name}: {photo}: {error}')
+                        continue
+                    updated += update_photo_rows(model, queryset.filter(photos=photo),
+                                                 photo_derivatives=derivatives)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{name}: {len(names) - failed} photos, {updated} objects updated, {failed} failed '
+                              f'in {elapsed:.1f} s ({len(names) / elapsed:.1f} photos/s)')
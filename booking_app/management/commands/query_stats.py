@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from booking_app.middleware import query_stats, reset_query_stats
+
+
+# Выводит накопленную QueryStatsMiddleware статистику запросов к базе данных по представлениям: сначала
+# представления с наибольшим средним количеством запросов. Как и для статистики кэша, общие значения нескольких
+# процессов доступны только с общим бэкендом кэша.
+class Command(BaseCommand):
+    help = 'Prints per-view SQL query statistics collected by QueryStatsMiddleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the collected statistics after printing.')
+
+    def handle(self, *args, **options):
+        stats = sorted(query_stats().items(), key=lambda item: item[1]['avg_queries'], reverse=True)
+        for view, values in stats:
+            self.stdout.write(f"{view}: requests {values['requests']}, "
+                              f"queries {values['avg_queries']:.1f}, "
+                              f"db time {values['avg_db_time_ms']:.2f} ms, "
+                              f"duplicates {values['avg_duplicates']:.1f}")
+        if options['reset']:
+            reset_query_stats()
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking_app.models.occupancy_model import HotelDailyOccupancy
+from booking_app.models.room_night_model import RoomNight
+
+
+# Полностью пересчитывает сводную таблицу занятости (HotelDailyOccupancy) по индексу занятых ночей. Нужна после
+# первого развертывания и для восстановления, если бронирования изменялись в обход сигналов. Выручка считается по
+# цене, запомненной каждой ночью при бронировании (RoomNight.price), поэтому изменение цен номеров ни сводную
+# таблицу, ни результат пересчета не меняет.
+#
+# Пример: python manage.py rebuild_occupancy 1 2 3
+class Command(BaseCommand):
+    help = 'Rebuilds the daily hotel occupancy and revenue rollup from booked room nights.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('hotel_ids', nargs='*', type=int,
+                            help='Hotels to rebuild. All hotels are rebuilt when omitted.')
+
+    def handle(self, *args, **options):
+        hotel_ids = options['hotel_ids'] or None
+        started = time.perf_counter()
+        created = HotelDailyOccupancy.objects.rebuild(RoomNight.objects.occupancy_totals(hotel_ids), hotel_ids)
+        self.stdout.write(f'Occupancy rows: {created} in {time.perf_counter() - started:.1f} s')
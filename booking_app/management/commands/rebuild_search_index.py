@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking_app.search import rebuild_search_index
+
+
+# Полностью пересчитывает индексы полнотекстового поиска по отелям и отзывам (booking_app/search.py): на SQLite -
+# таблицы FTS5 (и восстанавливает их триггеры), на MySQL - индексы FULLTEXT. Нужна после загрузки данных в обход
+# базы данных приложения или при подозрении, что индекс разошелся с таблицами.
+#
+# Пример: python manage.py rebuild_search_index
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index over hotels and reviews.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rebuild_search_index()
+        self.stdout.write(f'Search index rebuilt in {time.perf_counter() - started:.1f} s')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from booking_app.cache import bump_generations
+from booking_app.models.hotel_model import Hotel
+
+
+# Полностью пересчитывает статистику отзывов отелей (количество отзывов, средний рейтинг и гистограмму оценок) по
+# таблице отзывов. Нужна для восстановления, если отзывы изменялись в обход сигналов (например, через
+# QuerySet.update или напрямую в базе данных).
+class Command(BaseCommand):
+    help = 'Recomputes review count, average rating and rating histogram of hotels from their reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('hotel_ids', nargs='*', type=int,
+                            help='Hotels to recompute. All hotels are recomputed when omitted.')
+
+    def handle(self, *args, **options):
+        changed = Hotel.objects.recompute_ratings(options['hotel_ids'] or None)
+        if changed:
+            bump_generations('hotels', *(f'hotel:{hotel_id}' for hotel_id in changed))
+        self.stdout.write(f'Updated hotels: {len(changed)}')
@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from booking_app.jobs import run_workers
+
+
+# Процесс пула: Ctrl+C терминала получает вся группа процессов, поэтому процессы пула его не обрабатывают и
+# завершаются по общему событию stop, которое устанавливает основной процесс.
+def run_process(threads, stop, poll_interval, burst, batch_size):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    run_workers(threads, stop, poll_interval, burst, batch_size)
+
+
+# Обработчик очереди фоновых задач (booking_app/jobs.py). Запускает --processes процессов по --threads потоков в
+# каждом: потоки подходят для задач, которые ждут базу данных или отпускают GIL (Pillow), процессы - для задач,
+# которые занимают процессор. По SIGTERM или Ctrl+C обработчик перестает забирать задачи и завершается, дождавшись
+# выполняемых. С --burst он завершается, как только готовых задач не осталось (например, при запуске из cron).
+# --batch-size задает, сколько задач поток забирает за раз: пачка забирается и удаляется после выполнения одной
+# записью в базу данных, что ускоряет короткие задачи, но долгие задачи пачки ждут друг друга в одном потоке.
+#
+# Пример: python manage.py runworker --processes 2 --threads 8
+class Command(BaseCommand):
+    help = 'Runs background jobs from the database queue with a pool of processes and threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes.')
+        parser.add_argument('--threads', type=int, default=settings.JOB_WORKER_THREADS,
+                            help='Worker threads in each process.')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--batch-size', type=int, default=settings.JOB_CLAIM_BATCH,
+                            help='Jobs claimed by a thread at once.')
+        parser.add_argument('--burst', action='store_true', help='Exit when no jobs are ready.')
+
+    def handle(self, *args, **options):
+        stop = multiprocessing.Event()
+        handlers = {signum: signal.signal(signum, lambda signum, frame: stop.set())
+                    for signum in (signal.SIGINT, signal.SIGTERM)}
+        worker_args = (options['threads'], stop, options['poll_interval'], options['burst'], options['batch_size'])
+        try:
+            if options['processes'] == 1:
+                done, failed = run_workers(*worker_args)
+                self.stdout.write(f'Jobs done: {done}, failed: {failed}')
+                return
+            # Соединения с базой данных не должны переходить в процессы пула
+            connections.close_all()
+            processes = [multiprocessing.Process(target=run_process, args=worker_args, name=f'job-worker-{index}')
+                         for index in range(options['processes'])]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            self.stdout.write('Workers stopped')
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
@@ -0,0 +1,122 @@
+import random
+import time
+from datetime import date, timedelta
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+# Инициализация процесса-воркера: каждый процесс настраивает Django самостоятельно и открывает свое соединение с
+# базой данных.
+def setup_worker():
+    import django
+    django.setup()
+
+
+# Отправляет пачку запросов на создание бронирования через BookingListGenericView в одном процессе-воркере и
+# возвращает количество принятых, отклоненных и завершившихся ошибкой запросов.
+def post_bookings(args):
+    from django.contrib.auth.models import User as AuthUser
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from booking_app.views.booking_view import BookingListGenericView
+
+    user_id, payloads = args
+    user = AuthUser.objects.get(pk=user_id)
+    view = BookingListGenericView.as_view()
+    factory = APIRequestFactory()
+    counts = {'accepted': 0, 'rejected': 0, 'failed': 0}
+    for payload in payloads:
+        request = factory.post('/bookings/', payload, format='json')
+        force_authenticate(request, user=user)
+        try:
+            response = view(request)
+        except Exception:
+            counts['failed'] += 1
+            continue
+        if response.status_code == 201:
+            counts['accepted'] += 1
+        elif response.status_code == 400:
+            counts['rejected'] += 1
+        else:
+            counts['failed'] += 1
+    connections.close_all()
+    return counts
+
+
+# Нагрузочный тест создания бронирований. Команда создает временный отель с несколькими номерами и из нескольких
+# процессов одновременно отправляет тысячи пересекающихся запросов на бронирование этих номеров. После этого
+# проверяется, что ни одна ночь ни одного номера не была забронирована дважды, и выводится пропускная способность.
+# Если найдено двойное бронирование, команда завершается ошибкой.
+#
+# Пример: python manage.py stress_bookings --processes 8 --requests 4000 --rooms 5
+class Command(BaseCommand):
+    help = 'Fires concurrent overlapping booking requests and checks that no room night is booked twice.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--rooms', type=int, default=5)
+        parser.add_argument('--days', type=int, default=60,
+                            help='Length of the date window the requested stays are drawn from.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true', help='Do not delete the generated hotel and bookings.')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User as AuthUser
+        from booking_app.models.booking_model import Booking
+        from booking_app.models.hotel_model import Hotel
+        from booking_app.models.room_model import Room
+
+        rng = random.Random(options['seed'])
+        hotel = Hotel.objects.create(name=f'stress-{int(time.time())}', location='stress', description='stress test',
+                                     photos='stress.jpg', rating=0)
+        rooms = [Room.objects.create(hotel_id=hotel, room_type='economy', photos='stress.jpg', price_per_night=1)
+                 for _ in range(options['rooms'])]
+        user, _ = AuthUser.objects.get_or_create(username='stress_bookings')
+
+        start = date.today() + timedelta(days=1)
+        payloads = []
+        for _ in range(options['requests']):
+            check_in_date = start + timedelta(days=rng.randrange(options['days']))
+            payloads.append({
+                'room_id': rng.choice(rooms).pk,
+                'check_in_date': check_in_date.isoformat(),
+                'check_out_date': (check_in_date + timedelta(days=rng.randint(1, 5))).isoformat(),
+            })
+        processes = options['processes']
+        batches = [(user.pk, payloads[index::processes]) for index in range(processes)]
+
+        # Соединения родительского процесса не должны наследоваться воркерами
+        connections.close_all()
+        started = time.perf_counter()
+        with get_context('spawn').Pool(processes, initializer=setup_worker) as pool:
+            results = pool.map(post_bookings, batches)
+        elapsed = time.perf_counter() - started
+
+        totals = {key: sum(result[key] for result in results) for key in ('accepted', 'rejected', 'failed')}
+        bookings = Booking.objects.filter(room_id__in=rooms).order_by('room_id', 'check_in_date')
+        conflicts = 0
+        previous = None
+        for booking in bookings:
+            if previous is not None and previous.room_id_id == booking.room_id_id \
+                    and booking.check_in_date < previous.check_out_date:
+                conflicts += 1
+            if previous is None or previous.room_id_id != booking.room_id_id \
+                    or booking.check_out_date > previous.check_out_date:
+                previous = booking
+
+        self.stdout.write(
+            f"requests: {len(payloads)}, processes: {processes}, elapsed: {elapsed:.2f}s\n"
+            f"accepted: {totals['accepted']}, rejected: {totals['rejected']}, failed: {totals['failed']}\n"
+            f"throughput: {len(payloads) / elapsed:.1f} requests/s, {totals['accepted'] / elapsed:.1f} accepted/s\n"
+            f"stored bookings: {bookings.count()}, conflicts: {conflicts}"
+        )
+
+        if not options['keep']:
+            bookings.delete()
+            hotel.delete()
+
+        if conflicts:
+            raise CommandError(f'{conflicts} overlapping bookings were accepted.')
+        self.stdout.write(self.style.SUCCESS('No double bookings.'))
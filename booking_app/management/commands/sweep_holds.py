@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking_app.models.room_hold_model import RoomHold
+
+
+# Удаляет просроченные удержания номеров (RoomHold). Проверки доступности просроченные удержания и так не
+# учитывают, команда только не дает таблице расти. Просроченные строки находятся по индексу expires_at, поэтому
+# проход стоит столько же при любом количестве действующих удержаний. Запускается периодически (cron) или, с
+# --interval, работает постоянно и повторяет проход каждые interval секунд.
+#
+# Пример: python manage.py sweep_holds --interval 60
+class Command(BaseCommand):
+    help = 'Deletes expired room holds, once or periodically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repeat every INTERVAL seconds. Runs once when omitted.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Holds deleted per query.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            deleted = RoomHold.objects.sweep(options['batch_size'])
+            self.stdout.write(f'Expired holds deleted: {deleted} in {(time.perf_counter() - started) * 1000:.1f} ms')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
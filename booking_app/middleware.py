@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger('booking_app.queries')
+
+VIEWS_KEY = 'booking_app:querystats:views'
+VIEW_STAT_KEY = 'booking_app:querystats:{digest}:{name}'
+VIEW_STAT_NAMES = ('requests', 'queries', 'db_time_us', 'duplicates')
+
+# Списки параметров IN (%s, %s, ...) разной длины и литералы в тексте запроса не должны различать "одинаковые"
+# запросы, поэтому перед сравнением они заменяются заглушками.
+PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+# Отпечаток запроса: текст SQL без конкретных значений. Запросы с одинаковым отпечатком, выполненные в рамках
+# одного HTTP-запроса много раз, - типичный признак проблемы N+1.
+def fingerprint(sql):
+    return LITERAL.sub('?', PLACEHOLDER_LIST.sub('%s', sql))
+
+
+# Счетчик запросов к базе данных в рамках одного HTTP-запроса. Подключается к соединениям через
+# connection.execute_wrapper и считает количество запросов, их суммарное время и отпечатки.
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    # Количество лишних выполнений повторяющихся запросов (каждый запрос после первого с тем же отпечатком).
+    def duplicates(self):
+        return sum(count - 1 for count in self.fingerprints.values() if count > 1)
+
+    # Самый часто повторяющийся запрос и количество его выполнений.
+    def most_repeated(self):
+        if not self.fingerprints:
+            return None, 0
+        return self.fingerprints.most_common(1)[0]
+
+
+# Ключ счетчика статистики представления. Имя представления содержит пробелы и угловые скобки, которые
+# недопустимы в ключах некоторых бэкендов кэша, поэтому в ключ попадает его хэш.
+def view_stat_key(view, name):
+    return VIEW_STAT_KEY.format(digest=hashlib.md5(view.encode()).hexdigest(), name=name)
+
+
+# Увеличивает счетчик статистики представления в кэше.
+def incr_view_stat(view, name, delta):
+    key = view_stat_key(view, name)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, timeout=None)
+
+
+# Накапливает статистику запросов к базе данных по представлению. Список представлений хранится отдельно, чтобы
+# статистику можно было выгрузить целиком.
+def record_view(view, counter):
+    views = cache.get(VIEWS_KEY, [])
+    if view not in views:
+        cache.set(VIEWS_KEY, views + [view], timeout=None)
+    incr_view_stat(view, 'requests', 1)
+    incr_view_stat(view, 'queries', counter.count)
+    incr_view_stat(view, 'db_time_us', int(counter.duration * 1_000_000))
+    incr_view_stat(view, 'duplicates', counter.duplicates())
+
+
+# Возвращает накопленную статистику по представлениям: количество запросов, среднее количество запросов к базе
+# данных, среднее время работы с базой данных и среднее количество повторяющихся запросов.
+def query_stats():
+    stats = {}
+    for view in cache.get(VIEWS_KEY, []):
+        keys = [view_stat_key(view, name) for name in VIEW_STAT_NAMES]
+        values = cache.get_many(keys)
+        requests, queries, db_time_us, duplicates = (values.get(key, 0) for key in keys)
+        if not requests:
+            continue
+        stats[view] = {
+            'requests': requests,
+            'avg_queries': queries / requests,
+            'avg_db_time_ms': db_time_us / requests / 1000,
+            'avg_duplicates': duplicates / requests,
+        }
+    return stats
+
+
+# Сбрасывает накопленную статистику по представлениям.
+def reset_query_stats():
+    views = cache.get(VIEWS_KEY, [])
+    cache.delete_many([view_stat_key(view, name) for view in views for name in VIEW_STAT_NAMES])
+    cache.delete(VIEWS_KEY)
+
+
+# Middleware для измерения работы с базой данных. Для доли запросов QUERY_STATS_SAMPLE_RATE (от 0 до 1) считает
+# количество SQL-запросов, их суммарное время и повторяющиеся запросы. Результат добавляется в заголовки ответа
+# X-DB-Query-Count, X-DB-Time-ms и X-DB-Duplicate-Queries, записывается строкой JSON в лог booking_app.queries и
+# накапливается по представлениям (см. команду query_stats). Запросы, не попавшие в выборку, обрабатываются без
+# изменений, поэтому при небольшой доле накладные расходы незаметны.
+#
+# Потоковые ответы (выгрузки /export/) не измеряются: их строки читаются из базы данных, когда сервер отправляет
+# тело ответа, то есть уже после возврата из middleware и после отправки заголовков. Счетчик увидел бы только
+# проверку параметров, поэтому такие ответы не получают заголовков и не попадают в статистику.
+#
+# Middleware работает и под WSGI, и под ASGI. Под ASGI запросы, не попавшие в выборку, идут дальше без перехода в
+# поток, иначе Django выполнял бы в отдельном потоке всю цепочку обработки каждого запроса и асинхронные
+# представления теряли бы смысл. Запрос из выборки измеряется в потоке: запросы к базе данных асинхронного ORM
+# выполняются в этом же потоке (sync_to_async), и счетчик, подключенный к его соединениям, их видит.
+class QueryStatsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.QUERY_STATS_SAMPLE_RATE:
+            return self.get_response(request)
+        return self.measure(request, self.get_response)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.QUERY_STATS_SAMPLE_RATE:
+            return await self.get_response(request)
+        return await sync_to_async(self.measure)(request, async_to_sync(self.get_response))
+
+    def measure(self, request, get_response):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = get_response(request)
+        duration = time.perf_counter() - start
+        if response.streaming:
+            return response
+
+        view = self.view_name(request)
+        duplicates = counter.duplicates()
+        repeated_sql, repeated_count = counter.most_repeated()
+        response['X-DB-Query-Count'] = str(counter.count)
+        response['X-DB-Time-ms'] = f'{counter.duration * 1000:.2f}'
+        response['X-DB-Duplicate-Queries'] = str(duplicates)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'queries': counter.count,
+            'db_time_ms': round(counter.duration * 1000, 2),
+            'duplicates': duplicates,
+            'most_repeated': repeated_sql[:300] if repeated_count > 1 else None,
+            'most_repeated_count': repeated_count,
+        }))
+        record_view(view, counter)
+        return response
+
+    # Имя представления для статистики: HTTP-метод и шаблон маршрута, например "GET hotels/<int:hotel_id>/".
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        return f'{request.method} {match.route if match else "<unresolved>"}'
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:16
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+# Заполняет индекс занятых ночей для уже существующих активных бронирований.
+def fill_room_nights(apps, schema_editor):
+    Booking = apps.get_model('booking_app', 'Booking')
+    RoomNight = apps.get_model('booking_app', 'RoomNight')
+    bookings = Booking.objects.filter(room_id__isnull=False, deleted=False, deleted_at__isnull=True)
+    for booking in bookings.iterator(chunk_size=2000):
+        nights = (booking.check_out_date - booking.check_in_date).days
+        RoomNight.objects.bulk_create([
+            RoomNight(room_id_id=booking.room_id_id,
+                      booking_id_id=booking.booking_id,
+                      night=booking.check_in_date + timedelta(days=day))
+            for day in range(nights)
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0006_alter_review_deleted_alter_review_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('booking_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking_app.booking')),
+                ('room_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking_app.room')),
+            ],
+            options={
+                'verbose_name': 'Room night',
+                'verbose_name_plural': 'Room nights',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roomnight',
+            constraint=models.UniqueConstraint(fields=('room_id', 'night'), name='unique_room_night'),
+        ),
+        migrations.RunPython(fill_room_nights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0007_roomnight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='capacity',
+            field=models.PositiveSmallIntegerField(default=2, help_text='Максимальное количество гостей'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['location'], name='hotel_location_idx'),
+        ),
+    ]
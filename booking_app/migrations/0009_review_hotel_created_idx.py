@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0008_room_capacity_hotel_location_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['hotel_id', 'created_at'], name='review_hotel_created_idx'),
+        ),
+    ]
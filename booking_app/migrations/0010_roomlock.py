@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0009_review_hotel_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomLock',
+            fields=[
+                ('room_id', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='booking_app.room')),
+                ('locked_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Room lock',
+                'verbose_name_plural': 'Room locks',
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:36
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Floor
+
+
+# Заполняет статистику отзывов для уже существующих отелей.
+def fill_hotel_ratings(apps, schema_editor):
+    Hotel = apps.get_model('booking_app', 'Hotel')
+    Review = apps.get_model('booking_app', 'Review')
+    stats = {}
+    rows = (Review.objects.filter(hotel_id__isnull=False, deleted=False, deleted_at__isnull=True)
+            .order_by()
+            .values('hotel_id', bucket=Floor('rating'))
+            .annotate(review_count=Count('pk'), rating_sum=Sum('rating')))
+    for row in rows:
+        hotel = stats.setdefault(row['hotel_id'], {'review_count': 0, 'rating_sum': Decimal(0), 'rating_histogram': {}})
+        hotel['review_count'] += row['review_count']
+        hotel['rating_sum'] += row['rating_sum']
+        hotel['rating_histogram'][str(int(row['bucket']))] = row['review_count']
+    for hotel_id, hotel in stats.items():
+        hotel['rating_avg'] = (hotel['rating_sum'] / hotel['review_count']).quantize(Decimal('0.01'))
+        Hotel.objects.filter(pk=hotel_id).update(**hotel)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0011_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_avg',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_histogram',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_hotel_ratings, migrations.RunPython.noop),
+    ]
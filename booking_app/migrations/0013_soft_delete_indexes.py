@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0012_hotel_rating_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_hotel_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'booking_id'], name='booking_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'hotel_id'], name='hotel_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'review_id'], name='review_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'hotel_id', 'created_at'], name='review_hotel_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'room_id'], name='room_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'hotel_id', 'room_id'], name='room_hotel_live_idx'),
+        ),
+    ]
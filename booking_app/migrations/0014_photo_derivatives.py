@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0013_soft_delete_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='photo_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='photo_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:18
+
+import booking_app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0014_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoBlob',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Photo blob',
+                'verbose_name_plural': 'Photo blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='hotel',
+            name='photos',
+            field=models.ImageField(storage=booking_app.storage.photo_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='photos',
+            field=models.ImageField(storage=booking_app.storage.photo_storage, upload_to=''),
+        ),
+    ]
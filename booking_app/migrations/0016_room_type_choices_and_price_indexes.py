@@ -0,0 +1,65 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:21
+
+import re
+
+from django.db import migrations, models
+
+ROOM_TYPES = ['economy', 'deluxe', 'luxury']
+
+# Написания типов номеров, которые встречаются в старых данных, после удаления регистра, пробелов, дефисов и других
+# символов, кроме букв.
+ROOM_TYPE_VARIANTS = {
+    'economy': 'economy', 'econom': 'economy', 'econ': 'economy', 'eco': 'economy', 'standard': 'economy',
+    'std': 'economy', 'budget': 'economy', 'basic': 'economy',
+    'deluxe': 'deluxe', 'delux': 'deluxe', 'dlx': 'deluxe', 'superior': 'deluxe', 'comfort': 'deluxe',
+    'luxury': 'luxury', 'luxe': 'luxury', 'lux': 'luxury', 'suite': 'luxury', 'premium': 'luxury',
+}
+
+
+# Приводит типы уже существующих номеров (в том числе удаленных) к значениям RoomType по известным написаниям.
+# Каждое написание изменяется одним UPDATE. Если остались типы, которые не удалось сопоставить, миграция
+# завершается ошибкой со списком таких типов и количеством номеров: их нужно исправить вручную и запустить миграцию
+# снова, иначе такие номера не попадали бы ни в фильтры, ни в фасеты и не проходили бы проверку при изменении.
+def normalize_room_types(apps, schema_editor):
+    Room = apps.get_model('booking_app', 'Room')
+    legacy = Room._base_manager.exclude(room_type__in=ROOM_TYPES)
+    unknown = {}
+    for room_type in legacy.order_by().values_list('room_type', flat=True).distinct():
+        choice = ROOM_TYPE_VARIANTS.get(re.sub(r'[^a-z]', '', room_type.lower()))
+        if choice is None:
+            unknown[room_type] = Room._base_manager.filter(room_type=room_type).count()
+        else:
+            Room._base_manager.filter(room_type=room_type).update(room_type=choice)
+    if unknown:
+        raise ValueError(
+            f'Rooms with a room type that is not one of {", ".join(ROOM_TYPES)}: '
+            + ', '.join(f'{room_type!r} ({count} rooms)' for room_type, count in sorted(unknown.items()))
+            + '. Change them to one of the room types and run the migration again.')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0015_content_addressed_photos'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_room_types, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='room',
+            name='room_type',
+            field=models.CharField(choices=[('economy', 'Economy'), ('deluxe', 'Deluxe'), ('luxury', 'Luxury')], max_length=8),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'price_per_night', 'room_id'], name='room_price_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'room_type', 'price_per_night', 'room_id'], name='room_type_price_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'hotel_id', 'price_per_night', 'room_id'], name='room_hotel_price_live_idx'),
+        ),
+    ]
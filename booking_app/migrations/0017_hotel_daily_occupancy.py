@@ -0,0 +1,51 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:26
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+# Заполняет сводную таблицу занятости по уже занятым ночам.
+def fill_occupancy(apps, schema_editor):
+    HotelDailyOccupancy = apps.get_model('booking_app', 'HotelDailyOccupancy')
+    RoomNight = apps.get_model('booking_app', 'RoomNight')
+    totals = (RoomNight.objects.filter(room_id__hotel_id__isnull=False)
+              .order_by()
+              .values_list('room_id__hotel_id', 'night')
+              .annotate(rooms_booked=Count('pk'), revenue=Sum('room_id__price_per_night')))
+    HotelDailyOccupancy.objects.bulk_create(
+        (HotelDailyOccupancy(hotel_id_id=hotel_id, date=date, rooms_booked=rooms_booked, revenue=revenue)
+         for hotel_id, date, rooms_booked, revenue in totals.iterator(chunk_size=5000)),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0016_room_type_choices_and_price_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotelDailyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('rooms_booked', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('hotel_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking_app.hotel')),
+            ],
+            options={
+                'verbose_name': 'Hotel daily occupancy',
+                'verbose_name_plural': 'Hotel daily occupancy',
+                'indexes': [models.Index(fields=['date', 'rooms_booked', 'revenue'], name='occupancy_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hoteldailyoccupancy',
+            constraint=models.UniqueConstraint(fields=('hotel_id', 'date'), name='unique_hotel_occupancy_date'),
+        ),
+        migrations.RunPython(fill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0017_hotel_daily_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'room_id', 'check_out_date', 'check_in_date'], name='booking_room_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:02
+
+from django.db import migrations
+
+import booking_app.search
+
+
+# Индексы полнотекстового поиска (booking_app/search.py): на SQLite - таблицы FTS5 и триггеры, на MySQL - индексы
+# FULLTEXT. Индексы сразу заполняются уже существующими отелями и отзывами.
+def create_search_index(apps, schema_editor):
+    booking_app.search.create_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    booking_app.search.drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0018_booking_room_dates_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0019_full_text_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomHold',
+            fields=[
+                ('hold_id', models.AutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=32, unique=True)),
+                ('check_in_date', models.DateField()),
+                ('check_out_date', models.DateField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('room_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking_app.room')),
+            ],
+            options={
+                'verbose_name': 'Room hold',
+                'verbose_name_plural': 'Room holds',
+                'indexes': [models.Index(fields=['expires_at'], name='room_hold_expiry_idx'), models.Index(fields=['room_id', 'check_out_date', 'expires_at'], name='room_hold_room_dates_idx')],
+            },
+        ),
+    ]
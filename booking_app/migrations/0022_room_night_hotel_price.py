@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-18 10:09
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+# Заполняет отель и цену уже занятых ночей текущими значениями номеров: по ним же построена сводная таблица
+# занятости, поэтому она остается согласованной с индексом.
+def fill_night_prices(apps, schema_editor):
+    Room = apps.get_model('booking_app', 'Room')
+    RoomNight = apps.get_model('booking_app', 'RoomNight')
+    rooms = Room.objects.filter(pk=OuterRef('room_id'))
+    RoomNight.objects.update(hotel_id=Subquery(rooms.values('hotel_id')),
+                             price=Subquery(rooms.values('price_per_night')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0021_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomnight',
+            name='hotel_id',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='booking_app.hotel'),
+        ),
+        migrations.AddField(
+            model_name='roomnight',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=6),
+        ),
+        migrations.RunPython(fill_night_prices, migrations.RunPython.noop),
+    ]
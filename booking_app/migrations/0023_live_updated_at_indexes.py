@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0022_room_night_hotel_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'updated_at'], name='booking_live_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'updated_at'], name='hotel_live_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'updated_at'], name='review_live_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('deleted', models.Value(False))), fields=['deleted', 'updated_at'], name='room_live_updated_idx'),
+        ),
+    ]
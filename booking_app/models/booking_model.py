@@ -1,14 +1,16 @@
 from django.db import models
 
+from booking_app.models.soft_delete_model import NOT_DELETED, SoftDeleteModel
 
-class Booking(models.Model):
+
+class Booking(SoftDeleteModel):
     booking_id = models.AutoField(primary_key=True, unique=True)
     user_id = models.ForeignKey('User', on_delete=models.SET_NULL, null=True)
     room_id = models.ForeignKey('Room', on_delete=models.SET_NULL, null=True)
     check_in_date = models.DateField()
     check_out_date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
     deleted = models.BooleanField(default=False)
 
@@ -22,6 +24,13 @@ class Booking(models.Model):
     class Meta:
         verbose_name = 'Booking'
         verbose_name_plural = 'Bookings'
+        indexes = [
+            models.Index(fields=['deleted', 'booking_id'], condition=NOT_DELETED,
+                         name='booking_live_idx'),
+            models.Index(fields=['deleted', 'updated_at'], condition=NOT_DELETED, name='booking_live_updated_idx'),
+            models.Index(fields=['deleted', 'room_id', 'check_out_date', 'check_in_date'], condition=NOT_DELETED,
+                         name='booking_room_dates_idx'),
+        ]
 
 # Класс Meta используется для определения метаданных модели. Здесь устанавливаются человекочитаемые имена для
 # единственного и множественного числа (verbose_name и verbose_name_plural соответственно) модели "Booking".
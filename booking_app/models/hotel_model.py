@@ -1,17 +1,124 @@
-from django.db import models
+from decimal import Decimal
 
+from django.db import models, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Floor
+from django.utils import timezone
 
-class Hotel(models.Model):
+from booking_app.models.photo_model import PhotoModel
+from booking_app.models.review_model import Review
+from booking_app.models.soft_delete_model import NOT_DELETED, SoftDeleteManager, SoftDeleteModel
+from booking_app.storage import photo_storage
+
+
+# Корзина гистограммы оценок, в которую попадает оценка: ее целая часть. Ключи строковые, потому что гистограмма
+# хранится в JSON.
+def rating_bucket(rating):
+    return str(int(rating))
+
+
+# Средняя оценка с точностью до сотых или None, если отзывов нет.
+def rating_average(rating_sum, review_count):
+    if not review_count:
+        return None
+    return (rating_sum / review_count).quantize(Decimal('0.01'))
+
+
+# Менеджер отелей. Здесь собраны операции над денормализованной статистикой отзывов отеля: количеством отзывов,
+# суммой и средним значением оценок и гистограммой оценок. Удаленные отели менеджер не возвращает.
+class HotelManager(SoftDeleteManager):
+
+    # Учитывает в статистике отеля изменения отзывов: changes - список пар (оценка, знак), где знак 1 добавляет
+    # отзыв с этой оценкой, а -1 убирает его. Строка отеля блокируется на время изменения, поэтому одновременные
+    # отзывы одного отеля не теряют обновлений. Стоимость не зависит от количества отзывов: одно чтение и одна
+    # запись строки отеля.
+    def apply_reviews(self, hotel_id, changes):
+        with transaction.atomic():
+            hotel = (self.select_for_update()
+                     .only('review_count', 'rating_sum', 'rating_histogram')
+                     .filter(pk=hotel_id)
+                     .first())
+            if hotel is None:
+                return False
+            histogram = dict(hotel.rating_histogram)
+            review_count = hotel.review_count
+            rating_sum = hotel.rating_sum
+            for rating, sign in changes:
+                rating = Decimal(str(rating))
+                bucket = rating_bucket(rating)
+                histogram[bucket] = histogram.get(bucket, 0) + sign
+                if histogram[bucket] <= 0:
+                    del histogram[bucket]
+                review_count = max(review_count + sign, 0)
+                rating_sum = rating_sum + sign * rating if review_count else Decimal(0)
+            self.filter(pk=hotel_id).update(review_count=review_count,
+                                            rating_sum=rating_sum,
+                                            rating_avg=rating_average(rating_sum, review_count),
+                                            rating_histogram=histogram,
+                                            updated_at=timezone.now())
+        return True
+
+    # Полностью пересчитывает статистику отзывов по таблице отзывов одним группирующим запросом и сохраняет только
+    # изменившиеся отели. Используется для восстановления после массовых изменений в обход сигналов. Возвращает
+    # идентификаторы обновленных отелей.
+    def recompute_ratings(self, hotel_ids=None):
+        reviews = Review.objects.filter(hotel_id__isnull=False, deleted=False, deleted_at__isnull=True)
+        hotels = self.all()
+        if hotel_ids is not None:
+            reviews = reviews.filter(hotel_id__in=hotel_ids)
+            hotels = hotels.filter(pk__in=hotel_ids)
+
+        stats = {}
+        rows = (reviews.order_by()
+                .values('hotel_id', bucket=Floor('rating'))
+                .annotate(review_count=Count('pk'), rating_sum=Sum('rating')))
+        for row in rows:
+            review_count, rating_sum, histogram = stats.get(row['hotel_id'], (0, Decimal(0), {}))
+            histogram[rating_bucket(row['bucket'])] = row['review_count']
+            stats[row['hotel_id']] = (review_count + row['review_count'], rating_sum + row['rating_sum'], histogram)
+
+        changed = []
+        now = timezone.now()
+        hotels = hotels.only('review_count', 'rating_sum', 'rating_avg', 'rating_histogram')
+        for hotel in hotels.iterator(chunk_size=2000):
+            review_count, rating_sum, histogram = stats.get(hotel.pk, (0, Decimal(0), {}))
+            rating_avg = rating_average(rating_sum, review_count)
+            if (hotel.review_count, hotel.rating_sum, hotel.rating_avg, hotel.rating_histogram) != (
+                    review_count, rating_sum, rating_avg, histogram):
+                hotel.review_count = review_count
+                hotel.rating_sum = rating_sum
+                hotel.rating_avg = rating_avg
+                hotel.rating_histogram = histogram
+                hotel.updated_at = now
+                changed.append(hotel)
+        self.bulk_update(changed, ['review_count', 'rating_sum', 'rating_avg', 'rating_histogram', 'updated_at'],
+                         batch_size=1000)
+        return [hotel.pk for hotel in changed]
+
+
+class Hotel(SoftDeleteModel, PhotoModel):
     hotel_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=25, unique=True)
     location = models.CharField(max_length=60)
     description = models.TextField()
-    photos = models.ImageField()
+    # Фотографии хранятся по хэшу содержимого: одинаковые загрузки - один файл (см. booking_app/storage.py)
+    photos = models.ImageField(storage=photo_storage)
+    # Производные изображения фотографии (уменьшенные копии в нескольких форматах). Заполняются фоновыми потоками
+    # после сохранения фотографии (см. booking_app/images.py), до этого поле пустое.
+    photo_derivatives = models.JSONField(default=dict, blank=True)
     rating = models.DecimalField(max_digits=2, decimal_places=1)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
     deleted = models.BooleanField(default=False)
+    # Статистика отзывов отеля. Поля обновляются автоматически при изменении отзывов (см. booking_app/signals.py),
+    # поэтому списки отелей отдают средний рейтинг без агрегирования таблицы отзывов.
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.DecimalField(max_digits=12, decimal_places=1, default=0)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    rating_histogram = models.JSONField(default=dict, blank=True)
+
+    objects = HotelManager()
 
     def __str__(self):
         return (f'Отель: {self.name} '
@@ -25,6 +132,11 @@ class Hotel(models.Model):
     class Meta:
         verbose_name = 'Hotel'
         verbose_name_plural = 'Hotels'
+        indexes = [
+            models.Index(fields=['location'], name='hotel_location_idx'),
+            models.Index(fields=['deleted', 'hotel_id'], condition=NOT_DELETED, name='hotel_live_idx'),
+            models.Index(fields=['deleted', 'updated_at'], condition=NOT_DELETED, name='hotel_live_updated_idx'),
+        ]
 
 # Класс Meta используется для определения метаданных модели. Здесь устанавливаются человекочитаемые имена для
 # единственного и множественного числа (verbose_name и verbose_name_plural соответственно) модели "Hotel".
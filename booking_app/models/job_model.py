@@ -0,0 +1,118 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+# Менеджер очереди фоновых задач. Задача ставится в очередь записью строки в текущей транзакции, поэтому она
+# появляется в очереди только вместе с изменениями, которые ее породили, и пропадает при их откате. Выполненные
+# задачи удаляются, задачи, исчерпавшие попытки, остаются в таблице со статусом failed и текстом последней ошибки.
+class JobManager(models.Manager):
+
+    def enqueue(self, task, *args, priority=0, delay=0, max_attempts=None, **kwargs):
+        return self.create(task=task, args=list(args), kwargs=kwargs, priority=priority,
+                           run_at=timezone.now() + timedelta(seconds=delay),
+                           max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS)
+
+    # Задачи, готовые к выполнению: сначала с большим приоритетом, при равном приоритете - в порядке очереди. Список
+    # читается по индексу (status, -priority, run_at).
+    def ready(self):
+        return self.filter(status=Job.QUEUED, run_at__lte=timezone.now()).order_by('-priority', 'run_at', 'pk')
+
+    # Забирает до limit готовых задач обработчику worker и возвращает их. Задача забирается на JOB_LEASE_SECONDS
+    # секунд: если обработчик за это время не завершил ее (например, процесс был убит), requeue_stale возвращает ее
+    # в очередь. На MySQL и PostgreSQL строки задач выбираются через SELECT ... FOR UPDATE SKIP LOCKED: параллельные
+    # обработчики пропускают строки, уже выбранные другими, и не ждут друг друга. SQLite не поддерживает блокировку
+    # строк, но выполняет записи по одной, поэтому задачи забираются одним UPDATE с условием status = queued:
+    # задачу, которую успел забрать другой обработчик, UPDATE не изменит, и выборка повторяется.
+    def claim(self, worker, limit=1):
+        values = {'status': Job.RUNNING, 'locked_by': worker, 'attempts': F('attempts') + 1,
+                  'locked_until': timezone.now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)}
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                job_ids = list(self.ready().select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+                self.filter(pk__in=job_ids).update(**values)
+        else:
+            while True:
+                job_ids = list(self.ready().values_list('pk', flat=True)[:limit])
+                if not job_ids or self.filter(pk__in=job_ids, status=Job.QUEUED).update(**values):
+                    break
+        return list(self.filter(pk__in=job_ids, status=Job.RUNNING, locked_by=worker).order_by('-priority', 'run_at'))
+
+    # Выполненные задачи одного обработчика удаляются одним запросом. Условие на обработчика не дает удалить задачу,
+    # которую после истечения срока уже вернули в очередь и забрал другой обработчик.
+    def complete(self, jobs):
+        if jobs:
+            self.filter(pk__in=[job.pk for job in jobs], status=Job.RUNNING, locked_by=jobs[0].locked_by).delete()
+
+    # Задача с ошибкой возвращается в очередь с экспоненциально растущей задержкой (JOB_RETRY_DELAY секунд после
+    # первой попытки, вдвое больше после каждой следующей, но не больше JOB_RETRY_MAX_DELAY, со случайным разбросом,
+    # чтобы задачи, упавшие вместе, не повторялись вместе). После max_attempts попыток или при retry=False задача
+    # получает статус failed.
+    def fail(self, job, error, retry=True):
+        values = {'last_error': error, 'locked_by': '', 'locked_until': None}
+        if retry and job.attempts < job.max_attempts:
+            delay = min(settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1), settings.JOB_RETRY_MAX_DELAY)
+            values.update(status=Job.QUEUED, run_at=timezone.now() + timedelta(seconds=delay * random.uniform(0.5, 1)))
+        else:
+            values.update(status=Job.FAILED, finished_at=timezone.now())
+        self.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(**values)
+
+    # Возвращает в очередь задачи, срок которых истек до завершения; задачи без оставшихся попыток получают статус
+    # failed. Обработчики вызывают ее на каждом пустом опросе очереди, поэтому сначала только проверяется наличие
+    # таких задач: UPDATE, даже не изменивший ни одной строки, на SQLite захватывает блокировку базы на запись.
+    # Возвращает количество возвращенных задач.
+    def requeue_stale(self):
+        now = timezone.now()
+        stale = self.filter(status=Job.RUNNING, locked_until__lt=now)
+        if not stale.exists():
+            return 0
+        stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED, locked_by='', locked_until=None, finished_at=now, last_error='Lease expired.')
+        return stale.update(status=Job.QUEUED, locked_by='', locked_until=None, run_at=now)
+
+
+# Фоновая задача: имя зарегистрированной функции (см. booking_app/jobs.py) и ее аргументы в JSON. Задачи выполняет
+# команда runworker.
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    job_id = models.BigAutoField(primary_key=True)
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = JobManager()
+
+    def __str__(self):
+        return (f'Job_id: {self.job_id} '
+                f'Задача: {self.task} '
+                f'Статус: {self.status}')
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_ready_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_lease_idx'),
+        ]
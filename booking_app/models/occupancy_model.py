@@ -0,0 +1,161 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections, models, transaction
+from django.db.models import Case, F, Sum, Value, When
+
+# Периоды отчета о занятости: день, неделя (с понедельника) и календарный месяц.
+PERIODS = ['day', 'week', 'month']
+
+
+# Начало периода, следующего за периодом, который начинается в день start.
+def next_period(start, period):
+    if period == 'day':
+        return start + timedelta(days=1)
+    if period == 'week':
+        return start + timedelta(days=7)
+    return (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+# Начало периода, в который попадает день.
+def period_start(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+# Менеджер сводной таблицы занятости. Изменения вносятся приращениями: changes - словарь
+# {(hotel_id, date): (количество ночей, выручка)}, где отрицательные значения убирают освобожденные ночи. Приращения
+# прибавляются к строкам самой базой данных (rooms_booked = rooms_booked + приращение), поэтому строки не читаются
+# и не блокируются заранее, а параллельные бронирования не теряют изменений друг друга. Освобождаемые ночи
+# вычитаются по тем же отелю и цене, по которым были добавлены (см. RoomNight), поэтому значения не уходят в минус и
+# не требуют поправок. Стоимость не зависит от количества дней: один запрос на добавленные ночи и один на
+# освобожденные.
+class HotelDailyOccupancyManager(models.Manager):
+
+    def apply_nights(self, changes):
+        changes = {key: value for key, value in changes.items() if key[0] is not None and any(value)}
+        added = {key: value for key, value in changes.items() if value[0] > 0}
+        released = {key: value for key, value in changes.items() if value[0] <= 0}
+        if added:
+            self.add_nights(added)
+        if released:
+            self.release_nights(released)
+
+    # Добавляет занятые ночи одним запросом INSERT ... ON CONFLICT DO UPDATE (на MySQL - ON DUPLICATE KEY UPDATE):
+    # строки отеля и дня, которой еще нет, создаются, к существующим прибавляются приращения. Django не умеет
+    # прибавлять значения при конфликте в bulk_create, поэтому запрос собирается здесь.
+    def add_nights(self, changes):
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        fields = [self.model._meta.get_field(name) for name in ('hotel_id', 'date', 'rooms_booked', 'revenue')]
+        table = quote(self.model._meta.db_table)
+        hotel, day, rooms, revenue = (quote(field.column) for field in fields)
+        if connection.vendor == 'mysql':
+            conflict = (f'ON DUPLICATE KEY UPDATE {rooms} = {rooms} + VALUES({rooms}), '
+                        f'{revenue} = {revenue} + VALUES({revenue})')
+        else:
+            conflict = (f'ON CONFLICT ({hotel}, {day}) DO UPDATE SET {rooms} = {table}.{rooms} + excluded.{rooms}, '
+                        f'{revenue} = {table}.{revenue} + excluded.{revenue}')
+        rows = [(hotel_id, date, rooms_booked, revenue_change)
+                for (hotel_id, date), (rooms_booked, revenue_change) in changes.items()]
+        batch_size = connection.ops.bulk_batch_size(fields, rows)
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                values = ', '.join(['(%s, %s, %s, %s)'] * len(batch))
+                params = [field.get_db_prep_save(value, connection)
+                          for row in batch for field, value in zip(fields, row)]
+                cursor.execute(f'INSERT INTO {table} ({hotel}, {day}, {rooms}, {revenue}) VALUES {values} {conflict}',
+                               params)
+
+    # Вычитает освобожденные ночи одним запросом UPDATE: строки таких ночей уже есть, они создавались при занятии.
+    # Строки выбираются по отелям и диапазону дат (одно условие вместо OR на каждую пару), а приращение каждой
+    # строки выбирает CASE; строки диапазона без изменений получают нулевое приращение.
+    def release_nights(self, changes):
+        hotel_ids = {hotel_id for hotel_id, _ in changes}
+        dates = [date for _, date in changes]
+        rooms_cases = []
+        revenue_cases = []
+        for (hotel_id, date), (rooms_booked, revenue) in changes.items():
+            rooms_cases.append(When(hotel_id=hotel_id, date=date, then=Value(rooms_booked)))
+            revenue_cases.append(When(hotel_id=hotel_id, date=date, then=Value(revenue)))
+        self.filter(hotel_id__in=hotel_ids, date__gte=min(dates), date__lte=max(dates)).update(
+            rooms_booked=F('rooms_booked') + Case(*rooms_cases, default=Value(0)),
+            revenue=F('revenue') + Case(*revenue_cases, default=Value(Decimal(0)), output_field=models.DecimalField()),
+        )
+
+    # Заменяет строки сводной таблицы (всех отелей или отелей hotel_ids) итогами totals - строками
+    # (hotel_id, date, rooms_booked, revenue), см. RoomNightManager.occupancy_totals. Возвращает количество
+    # записанных строк.
+    def rebuild(self, totals, hotel_ids=None, batch_size=5000):
+        rows = self.all()
+        if hotel_ids is not None:
+            rows = rows.filter(hotel_id__in=hotel_ids)
+        with transaction.atomic():
+            rows.delete()
+            created = 0
+            batch = []
+            for hotel_id, date, rooms_booked, revenue in totals.iterator(chunk_size=batch_size):
+                batch.append(self.model(hotel_id_id=hotel_id, date=date, rooms_booked=rooms_booked, revenue=revenue))
+                if len(batch) == batch_size:
+                    created += len(self.bulk_create(batch))
+                    batch = []
+            created += len(self.bulk_create(batch))
+        return created
+
+    # Занятость и выручка за полуинтервал [date_from, date_to) по периодам period (day, week, month): одного отеля
+    # или всех отелей вместе. Суммы по дням считает база данных одним группирующим запросом по индексу
+    # (hotel_id, date) или (date, rooms_booked, revenue), а дни складываются в недели и месяцы здесь: дней в отчете
+    # не больше ANALYTICS_MAX_DAYS, а функции усечения дат SQLite вызывает на каждую строку. Периоды без
+    # бронирований возвращаются с нулями. Возвращает список {start, end, rooms_booked, revenue}, где start и end -
+    # границы периода внутри запрошенного интервала.
+    def series(self, date_from, date_to, period='day', hotel_id=None):
+        rows = self.filter(date__gte=date_from, date__lt=date_to)
+        if hotel_id is not None:
+            rows = rows.filter(hotel_id=hotel_id)
+        totals = {}
+        days = rows.order_by().values_list('date').annotate(rooms_booked=Sum('rooms_booked'), revenue=Sum('revenue'))
+        for day, rooms_booked, revenue in days:
+            start = period_start(day, period)
+            period_rooms, period_revenue = totals.get(start, (0, Decimal(0)))
+            totals[start] = (period_rooms + rooms_booked, period_revenue + revenue)
+        series = []
+        start = period_start(date_from, period)
+        while start < date_to:
+            end = next_period(start, period)
+            rooms_booked, revenue = totals.get(start, (0, Decimal(0)))
+            series.append({'start': max(start, date_from), 'end': min(end, date_to),
+                           'rooms_booked': rooms_booked, 'revenue': revenue})
+            start = end
+        return series
+
+
+# Сводная таблица занятости: по строке на каждый отель и день, в который у отеля есть занятые ночи. rooms_booked -
+# количество занятых номеров в эту ночь, revenue - их выручка по цене номера на момент бронирования. Таблица
+# обновляется приращениями вместе с индексом занятых ночей (RoomNightManager) и пересчитывается командой
+# rebuild_occupancy. По ней отчет /analytics/occupancy/ строится без чтения бронирований и номеров.
+class HotelDailyOccupancy(models.Model):
+    hotel_id = models.ForeignKey('Hotel', on_delete=models.CASCADE)
+    date = models.DateField()
+    rooms_booked = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal(0))
+
+    objects = HotelDailyOccupancyManager()
+
+    def __str__(self):
+        return (f'Hotel_id: {self.hotel_id_id} '
+                f'Дата: {self.date} '
+                f'Занято номеров: {self.rooms_booked}')
+
+    class Meta:
+        verbose_name = 'Hotel daily occupancy'
+        verbose_name_plural = 'Hotel daily occupancy'
+        constraints = [
+            models.UniqueConstraint(fields=['hotel_id', 'date'], name='unique_hotel_occupancy_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'rooms_booked', 'revenue'], name='occupancy_date_idx'),
+        ]
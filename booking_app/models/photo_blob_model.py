@@ -0,0 +1,98 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from booking_app.storage import content_digest, photo_storage
+
+
+# Счетчики по именам файлов: {имя: количество}. Учитываются только файлы хранилища по содержимому: файлы со старыми
+# именами (загруженные до ContentAddressedStorage) не удаляются автоматически.
+def content_counts(names):
+    counts = names if isinstance(names, Counter) else Counter(names)
+    return {name: count for name, count in counts.items() if count and content_digest(name)}
+
+
+# Удаляет из хранилища файлы без ссылок вместе с их строками. Перед удалением счетчики проверяются еще раз: файл
+# мог снова понадобиться после фиксации транзакции, которая его освободила. Строки с нулевым счетчиком сначала
+# блокируются UPDATE без изменений (на SQLite он захватывает блокировку базы на запись), поэтому загрузка того же
+# файла, которая удерживает его строку (см. PhotoBlobManager.hold), ждет удаления или сама заставляет его ждать и
+# увеличивает счетчик до проверки.
+def delete_orphans(names):
+    with transaction.atomic():
+        PhotoBlob.objects.filter(name__in=names, ref_count=0).update(ref_count=0)
+        orphans = list(PhotoBlob.objects.filter(name__in=names, ref_count=0).values_list('name', flat=True))
+        storage = photo_storage()
+        for name in orphans:
+            storage.delete(name)
+        PhotoBlob.objects.filter(name__in=orphans, ref_count=0).delete()
+
+
+# Менеджер счетчиков ссылок на файлы хранилища. names - имена файлов (каждое считается один раз) или Counter
+# {имя: количество ссылок}. Стоимость не зависит от числа файлов: по одному запросу на каждое различное количество.
+class PhotoBlobManager(models.Manager):
+
+    def acquire(self, names):
+        counts = content_counts(names)
+        if not counts:
+            return
+        self.bulk_create([self.model(name=name) for name in counts], ignore_conflicts=True)
+        for count, group in self.group_by_count(counts).items():
+            self.filter(name__in=group).update(ref_count=F('ref_count') + count)
+
+    # Файлы, на которые больше никто не ссылается, удаляются из хранилища и из таблицы после фиксации транзакции,
+    # чтобы откат не оставил объект без файла. До удаления строка остается с нулевым счетчиком: по ней удаление
+    # файла блокирует одновременную загрузку того же файла (см. delete_orphans).
+    def release(self, names):
+        counts = content_counts(names)
+        if not counts:
+            return
+        for count, group in self.group_by_count(counts).items():
+            self.filter(name__in=group).update(ref_count=Greatest(F('ref_count') - count, 0))
+        orphans = list(self.filter(name__in=counts, ref_count=0).values_list('name', flat=True))
+        if orphans:
+            transaction.on_commit(lambda: delete_orphans(orphans))
+
+    # Удерживает файлы на время блока: пока файл удерживается, его счетчик не равен нулю, и delete_orphans его не
+    # удаляет. Нужно там, где файл, уже найденный в хранилище, используется повторно, а ссылка на него появляется
+    # позже: ContentAddressedStorage._save не записывает файл заново, если он существует, а счетчик увеличивает
+    # только сигнал post_save. Блок выполняется в транзакции вызывающего кода и должен сослаться на удерживаемые
+    # файлы, поэтому после него счетчики только уменьшаются, без поиска файлов без ссылок.
+    @contextmanager
+    def hold(self, names):
+        names = set(content_counts(names))
+        self.acquire(names)
+        yield
+        if names:
+            self.filter(name__in=names).update(ref_count=F('ref_count') - 1)
+
+    @staticmethod
+    def group_by_count(counts):
+        groups = {}
+        for name, count in counts.items():
+            groups.setdefault(count, []).append(name)
+        return groups
+
+
+# Файл хранилища фотографий по содержимому (см. booking_app/storage.py) и количество ссылок на него: фотографий и
+# производных изображений отелей и номеров, в том числе мягко удаленных. Счетчики обновляются сигналами при
+# сохранении и удалении объектов.
+class PhotoBlob(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PhotoBlobManager()
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count})'
+
+    @property
+    def digest(self):
+        return content_digest(self.name)
+
+    class Meta:
+        verbose_name = 'Photo blob'
+        verbose_name_plural = 'Photo blobs'
@@ -0,0 +1,70 @@
+from django.db import models, transaction
+
+from booking_app.models.photo_blob_model import PhotoBlob
+from booking_app.storage import file_digest
+
+
+# Базовая модель с фотографией (поле photos) и ее производными изображениями (поле photo_derivatives, см.
+# booking_app/images.py). Поля объявляются в самих моделях. Модель запоминает файлы, загруженные из базы данных,
+# чтобы сигналы могли без дополнительного запроса узнать, заменили ли фотографию при сохранении и на какие файлы
+# хранилища объект перестал ссылаться (см. PhotoBlob).
+class PhotoModel(models.Model):
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_photo()
+        return instance
+
+    # Имена файлов, на которые ссылается объект: {поле: множество имен}. Поля, не загруженные из базы данных
+    # (only/defer), в результат не попадают.
+    def photo_files(self):
+        files = {}
+        if 'photos' in self.__dict__:
+            photo = self.__dict__['photos']
+            name = getattr(photo, 'name', photo)
+            files['photos'] = {name} if name else set()
+        if 'photo_derivatives' in self.__dict__:
+            files['photo_derivatives'] = {name for formats in self.photo_derivatives.values()
+                                          for name in formats.values()}
+        return files
+
+    # Загруженная, но еще не сохраненная фотография удерживается на время сохранения под тем именем, которое ей даст
+    # хранилище по содержимому. Иначе файл, который хранилище нашло и не стало записывать заново, мог быть удален
+    # освободившей его транзакцией до того, как post_save увеличит счетчик ссылок.
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            with PhotoBlob.objects.hold(self.uploaded_files()):
+                super().save(*args, **kwargs)
+
+    def uploaded_files(self):
+        if 'photos' not in self.__dict__:
+            return set()
+        photo = self.photos
+        if not photo or photo._committed:
+            return set()
+        return {photo.storage.content_name(file_digest(photo), photo.name)}
+
+    def remember_photo(self):
+        self._loaded_photo_files = self.photo_files()
+
+    def photo_changed(self):
+        if 'photos' not in self.__dict__:
+            return False
+        return self.photo_files()['photos'] != getattr(self, '_loaded_photo_files', {}).get('photos', set())
+
+    # Файлы, на которые объект стал ссылаться и перестал ссылаться с момента загрузки или последнего сохранения.
+    # Поле, которое не было загружено вместе с объектом, не учитывается: его прежнее значение неизвестно.
+    def photo_file_changes(self):
+        loaded = getattr(self, '_loaded_photo_files', None)
+        acquired, released = set(), set()
+        for field, names in self.photo_files().items():
+            if loaded is not None and field not in loaded:
+                continue
+            previous = loaded[field] if loaded is not None else set()
+            acquired |= names - previous
+            released |= previous - names
+        return acquired, released
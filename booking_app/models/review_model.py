@@ -1,14 +1,16 @@
 from django.db import models
 
+from booking_app.models.soft_delete_model import NOT_DELETED, SoftDeleteModel
 
-class Review(models.Model):
+
+class Review(SoftDeleteModel):
     review_id = models.AutoField(primary_key=True)
     user_id = models.ForeignKey('User', on_delete=models.SET_NULL, null=True)
     hotel_id = models.ForeignKey('Hotel', on_delete=models.SET_NULL, null=True)
     comment = models.CharField(max_length=1000)
     rating = models.DecimalField(max_digits=2, decimal_places=1)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
     deleted = models.BooleanField(default=False)
 
@@ -23,6 +25,12 @@ class Review(models.Model):
     class Meta:
         verbose_name = 'Review'
         verbose_name_plural = 'Reviews'
+        indexes = [
+            models.Index(fields=['deleted', 'review_id'], condition=NOT_DELETED, name='review_live_idx'),
+            models.Index(fields=['deleted', 'updated_at'], condition=NOT_DELETED, name='review_live_updated_idx'),
+            models.Index(fields=['deleted', 'hotel_id', 'created_at'], condition=NOT_DELETED,
+                         name='review_hotel_live_idx'),
+        ]
 
     # Класс Meta используется для определения метаданных модели. Здесь устанавливаются человекочитаемые имена для
     # единственного и множественного числа (verbose_name и verbose_name_plural соответственно) модели "Review".
@@ -0,0 +1,81 @@
+import secrets
+from datetime import timedelta
+
+from django.db import models
+from django.utils import timezone
+
+
+# Менеджер временных удержаний номеров. Удержание действует до expires_at; просроченные удержания не учитываются
+# ни одной проверкой сразу, даже если команда sweep_holds еще не удалила их из таблицы.
+class RoomHoldManager(models.Manager):
+
+    def live(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    # Действующие удержания номера, которые пересекаются с полуинтервалом [check_in_date, check_out_date).
+    # exclude_token - удержание, которое не учитывается (например, удержание самого бронирующего).
+    def overlapping(self, room_id, check_in_date, check_out_date, exclude_token=None):
+        holds = self.live().filter(room_id=room_id, check_in_date__lt=check_out_date, check_out_date__gt=check_in_date)
+        if exclude_token:
+            holds = holds.exclude(token=exclude_token)
+        return holds
+
+    # Удержанные ночи номеров room_ids в интервале [date_from, date_to) в виде {room_id: {ночь: множество токенов
+    # удержаний}}. Токены нужны, чтобы бронирование пачки не учитывало только свое удержание своего номера. Один
+    # запрос на всю пачку номеров.
+    def held_nights(self, room_ids, date_from, date_to):
+        held = {}
+        holds = self.live().filter(room_id__in=room_ids, check_in_date__lt=date_to, check_out_date__gt=date_from)
+        for room_id, token, check_in_date, check_out_date in holds.values_list('room_id', 'token', 'check_in_date',
+                                                                              'check_out_date'):
+            nights = held.setdefault(room_id, {})
+            for day in range((check_out_date - check_in_date).days):
+                nights.setdefault(check_in_date + timedelta(days=day), set()).add(token)
+        return held
+
+    # Удерживает номер на полуинтервал дат на minutes минут. Вызывается внутри транзакции после lock_rooms, когда
+    # доступность номера уже проверена.
+    def place(self, room_id, check_in_date, check_out_date, minutes):
+        return self.create(room_id_id=room_id, token=secrets.token_urlsafe(24), check_in_date=check_in_date,
+                           check_out_date=check_out_date, expires_at=timezone.now() + timedelta(minutes=minutes))
+
+    # Удаляет просроченные удержания пачками по batch_size строк. Просроченные строки находятся по индексу expires_at,
+    # поэтому стоимость зависит только от количества просроченных удержаний, а не от размера таблицы. Возвращает
+    # количество удаленных строк.
+    def sweep(self, batch_size=1000):
+        deleted = 0
+        now = timezone.now()
+        while True:
+            expired = list(self.filter(expires_at__lte=now).order_by('expires_at')
+                           .values_list('pk', flat=True)[:batch_size])
+            if not expired:
+                return deleted
+            deleted += self.filter(pk__in=expired).delete()[0]
+
+
+# Временное удержание номера на время оформления бронирования: пока удержание действует, номер на эти даты не
+# считается свободным ни при проверке доступности, ни в поиске свободных номеров и календаре занятости. Бронирование
+# с токеном удержания (hold_token) свое удержание не учитывает и снимает его.
+class RoomHold(models.Model):
+    hold_id = models.AutoField(primary_key=True)
+    room_id = models.ForeignKey('Room', on_delete=models.CASCADE)
+    token = models.CharField(max_length=32, unique=True)
+    check_in_date = models.DateField()
+    check_out_date = models.DateField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = RoomHoldManager()
+
+    def __str__(self):
+        return (f'Room_id: {self.room_id_id} '
+                f'Даты: {self.check_in_date} - {self.check_out_date} '
+                f'До: {self.expires_at}')
+
+    class Meta:
+        verbose_name = 'Room hold'
+        verbose_name_plural = 'Room holds'
+        indexes = [
+            models.Index(fields=['expires_at'], name='room_hold_expiry_idx'),
+            models.Index(fields=['room_id', 'check_out_date', 'expires_at'], name='room_hold_room_dates_idx'),
+        ]
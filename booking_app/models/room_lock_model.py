@@ -0,0 +1,40 @@
+from django.db import connection, models
+from django.utils import timezone
+
+from booking_app.models.room_model import Room
+
+
+# Блокирует номера до конца текущей транзакции, чтобы проверка доступности и создание бронирования для одного
+# номера выполнялись строго по очереди, не мешая бронированию других номеров. На MySQL и PostgreSQL блокируются
+# строки самих номеров через SELECT ... FOR UPDATE. SQLite не поддерживает блокировку строк, поэтому для нее
+# используется таблица рекомендательных блокировок RoomLock: запись в нее сразу захватывает блокировку базы на
+# запись, и последующее чтение занятых ночей в этой транзакции уже не может устареть. Номера блокируются в порядке
+# возрастания ID, чтобы параллельные транзакции не попадали во взаимную блокировку.
+def lock_rooms(room_ids):
+    room_ids = sorted(set(room_ids))
+    if not room_ids:
+        return
+    if connection.features.has_select_for_update:
+        list(Room.all_objects.select_for_update().filter(room_id__in=room_ids).order_by('room_id').values_list('pk'))
+        return
+    RoomLock.objects.bulk_create(
+        [RoomLock(room_id_id=room_id, locked_at=timezone.now()) for room_id in room_ids],
+        update_conflicts=True,
+        unique_fields=['room_id'],
+        update_fields=['locked_at'],
+    )
+
+
+# Таблица рекомендательных блокировок номеров для баз данных без SELECT ... FOR UPDATE (SQLite). Одна строка на
+# номер, locked_at хранит время последней блокировки.
+class RoomLock(models.Model):
+    room_id = models.OneToOneField('Room', on_delete=models.CASCADE, primary_key=True)
+    locked_at = models.DateTimeField()
+
+    def __str__(self):
+        return (f'Room_id: {self.room_id_id} '
+                f'Заблокирован: {self.locked_at}')
+
+    class Meta:
+        verbose_name = 'Room lock'
+        verbose_name_plural = 'Room locks'
@@ -1,19 +1,34 @@
 from django.db import models
 from booking_app.models.hotel_model import Hotel
+from booking_app.models.photo_model import PhotoModel
+from booking_app.models.soft_delete_model import NOT_DELETED, SoftDeleteModel
+from booking_app.storage import photo_storage
 
 
-class Room(models.Model):
+# Типы номеров. В базе данных хранится значение в нижнем регистре, по нему номера фильтруются и считаются фасеты.
+class RoomType(models.TextChoices):
+    ECONOMY = 'economy', 'Economy'
+    DELUXE = 'deluxe', 'Deluxe'
+    LUXURY = 'luxury', 'Luxury'
+
+
+class Room(SoftDeleteModel, PhotoModel):
     room_id = models.AutoField(primary_key=True)
     hotel_id = models.ForeignKey('Hotel',
                                  on_delete=models.CASCADE,
                                  blank=True,
                                  null=True)
-    room_type = models.CharField(help_text='economy, deluxe, luxury', max_length=8)
-    photos = models.ImageField()
+    room_type = models.CharField(max_length=8, choices=RoomType.choices)
+    # Фотографии хранятся по хэшу содержимого: одинаковые загрузки - один файл (см. booking_app/storage.py)
+    photos = models.ImageField(storage=photo_storage)
+    # Производные изображения фотографии (уменьшенные копии в нескольких форматах). Заполняются фоновыми потоками
+    # после сохранения фотографии (см. booking_app/images.py), до этого поле пустое.
+    photo_derivatives = models.JSONField(default=dict, blank=True)
     price_per_night = models.DecimalField(max_digits=6, decimal_places=2)
+    capacity = models.PositiveSmallIntegerField(default=2, help_text='Максимальное количество гостей')
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
     deleted = models.BooleanField(default=False)
 
@@ -28,6 +43,20 @@ class Room(models.Model):
     class Meta:
         verbose_name = 'Room'
         verbose_name_plural = 'Rooms'
+        indexes = [
+            models.Index(fields=['deleted', 'room_id'], condition=NOT_DELETED, name='room_live_idx'),
+            models.Index(fields=['deleted', 'updated_at'], condition=NOT_DELETED, name='room_live_updated_idx'),
+            models.Index(fields=['deleted', 'hotel_id', 'room_id'], condition=NOT_DELETED,
+                         name='room_hotel_live_idx'),
+            # Фильтры и сортировка списка номеров по цене (см. booking_app/views/room_view.py): по этим индексам
+            # страница, отсортированная по цене, читается диапазоном без сортировки всех подходящих номеров
+            models.Index(fields=['deleted', 'price_per_night', 'room_id'], condition=NOT_DELETED,
+                         name='room_price_live_idx'),
+            models.Index(fields=['deleted', 'room_type', 'price_per_night', 'room_id'], condition=NOT_DELETED,
+                         name='room_type_price_live_idx'),
+            models.Index(fields=['deleted', 'hotel_id', 'price_per_night', 'room_id'], condition=NOT_DELETED,
+                         name='room_hotel_price_live_idx'),
+        ]
 
     # Класс Meta используется для определения метаданных модели. Здесь устанавливаются человекочитаемые имена для
     # единственного и множественного числа (verbose_name и verbose_name_plural соответственно) модели "Room".
@@ -0,0 +1,156 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import models
+
+from booking_app.models.occupancy_model import HotelDailyOccupancy
+from booking_app.models.room_hold_model import RoomHold
+
+
+# Вспомогательная функция, которая возвращает список ночей полуинтервала [check_in_date, check_out_date).
+# День выезда ночью не считается, поэтому выезд одного гостя и заезд другого в один день не конфликтуют.
+def nights_between(check_in_date, check_out_date):
+    return [check_in_date + timedelta(days=day) for day in range((check_out_date - check_in_date).days)]
+
+
+# Добавляет в изменения сводной таблицы занятости (HotelDailyOccupancy.objects.apply_nights) одну ночь номера
+# отеля hotel_id по цене price: sign = 1 - ночь занята, -1 - освобождена.
+def add_night(changes, hotel_id, night, price, sign):
+    rooms_booked, revenue = changes.get((hotel_id, night), (0, 0))
+    changes[(hotel_id, night)] = (rooms_booked + sign, revenue + sign * price)
+
+
+# Менеджер индекса занятости. Все операции по поиску и изменению занятых ночей собраны здесь, чтобы сериализаторы
+# и сигналы не работали с таблицей напрямую.
+class RoomNightManager(models.Manager):
+
+    # Проверяет, свободен ли номер на полуинтервал [check_in_date, check_out_date): нет ни занятых ночей, ни
+    # действующих удержаний (RoomHold). Запрос идет по уникальному индексу (room_id, night) и индексу удержаний
+    # номера, поэтому его стоимость зависит только от длины интервала, а не от размера таблицы бронирований.
+    # exclude_booking позволяет не учитывать ночи самого редактируемого бронирования, hold_token - удержание
+    # самого бронирующего. Ночи и удержания проверяются одним запросом (UNION ALL).
+    def is_free(self, room_id, check_in_date, check_out_date, exclude_booking=None, hold_token=None):
+        nights = self.filter(room_id=room_id, night__gte=check_in_date, night__lt=check_out_date)
+        if exclude_booking is not None:
+            nights = nights.exclude(booking_id=exclude_booking)
+        holds = RoomHold.objects.overlapping(room_id, check_in_date, check_out_date, exclude_token=hold_token)
+        return not nights.values('pk').union(holds.values('pk'), all=True).exists()
+
+    # Занимает ночи бронирования. Уникальный индекс (room_id, night) не даст занять одну ночь дважды.
+    def occupy(self, booking):
+        return self.occupy_many([booking])
+
+    # Занимает ночи сразу нескольких бронирований одним запросом INSERT. Используется при массовом создании
+    # бронирований, когда сигналы post_save не вызываются.
+    def occupy_many(self, bookings):
+        nights, changes = self.occupy_nights(bookings)
+        HotelDailyOccupancy.objects.apply_nights(changes)
+        return nights
+
+    # Занимает ночи бронирований и возвращает их вместе с изменениями сводной таблицы занятости. Каждая ночь
+    # запоминает отель и цену номера на момент бронирования: ровно эти значения вычитаются из сводной таблицы при
+    # освобождении ночи, даже если номер с тех пор перенесли в другой отель или изменили его цену. Отель и цена
+    # номеров читаются одним запросом на всю пачку.
+    def occupy_nights(self, bookings):
+        bookings = [booking for booking in bookings
+                    if booking.room_id_id is not None and not booking.deleted and booking.deleted_at is None]
+        if not bookings:
+            return [], {}
+        rooms = self.room_prices(bookings)
+        nights = self.bulk_create([
+            self.model(room_id_id=booking.room_id_id, booking_id=booking, night=night,
+                       hotel_id_id=rooms[booking.room_id_id][0], price=rooms[booking.room_id_id][1])
+            for booking in bookings
+            for night in nights_between(booking.check_in_date, booking.check_out_date)
+        ])
+        changes = {}
+        for night in nights:
+            add_night(changes, night.hotel_id_id, night.night, night.price, 1)
+        return nights, changes
+
+    # Возвращает занятые ночи указанных номеров в интервале [date_from, date_to) в виде словаря
+    # {room_id: множество ночей}. Один запрос по индексу (room_id, night) на всю пачку номеров.
+    def occupied_nights(self, room_ids, date_from, date_to):
+        occupied = {}
+        nights = self.filter(room_id__in=room_ids, night__gte=date_from, night__lt=date_to)
+        for room_id, night in nights.values_list('room_id', 'night'):
+            occupied.setdefault(room_id, set()).add(night)
+        return occupied
+
+    # Отель и цена номеров бронирований: {room_id: (hotel_id, цена)}. Номера, уже загруженные вместе с
+    # бронированиями (например, сериализатором при проверке), повторно не читаются.
+    def room_prices(self, bookings):
+        booking_room = type(bookings[0]).room_id
+        rooms = {booking.room_id_id: (booking.room_id.hotel_id_id, booking.room_id.price_per_night)
+                 for booking in bookings if booking_room.is_cached(booking) and booking.room_id is not None}
+        missing = {booking.room_id_id for booking in bookings} - set(rooms) - {None}
+        if missing:
+            room_model = self.model._meta.get_field('room_id').related_model
+            rooms.update((room_id, (hotel_id, price)) for room_id, hotel_id, price in room_model.all_objects.filter(
+                pk__in=missing).values_list('pk', 'hotel_id', 'price_per_night'))
+        return rooms
+
+    # Освобождает все ночи, занятые бронированием.
+    def release(self, booking):
+        HotelDailyOccupancy.objects.apply_nights(self.release_nights(booking))
+
+    # Освобождает ночи бронирования и возвращает изменения сводной таблицы занятости: по отелю и цене, которые ночи
+    # запомнили при занятии.
+    def release_nights(self, booking):
+        changes = {}
+        nights = self.filter(booking_id=booking).values_list('hotel_id', 'night', 'price')
+        for hotel_id, night, price in nights:
+            add_night(changes, hotel_id, night, price, -1)
+        if changes:
+            self.filter(booking_id=booking).delete()
+        return changes
+
+    # Приводит индекс в соответствие с текущим состоянием бронирования после его сохранения. Сводная таблица
+    # занятости получает освобожденные и занятые ночи одним изменением.
+    def sync_booking(self, booking):
+        changes = self.release_nights(booking)
+        nights, occupied = self.occupy_nights([booking])
+        for (hotel_id, night), (rooms_booked, revenue) in occupied.items():
+            released_rooms, released_revenue = changes.get((hotel_id, night), (0, 0))
+            changes[(hotel_id, night)] = (released_rooms + rooms_booked, released_revenue + revenue)
+        HotelDailyOccupancy.objects.apply_nights(changes)
+        return nights
+
+    # Итоги занятых ночей по отелям и дням для пересчета сводной таблицы занятости (команда rebuild_occupancy):
+    # строки (hotel_id, night, rooms_booked, revenue) по отелю и цене, запомненным ночами при бронировании, как и
+    # при изменении таблицы приращениями. Один группирующий запрос без соединения с номерами.
+    def occupancy_totals(self, hotel_ids=None):
+        nights = self.filter(hotel_id__isnull=False)
+        if hotel_ids is not None:
+            nights = nights.filter(hotel_id__in=hotel_ids)
+        return (nights.order_by()
+                .values_list('hotel_id', 'night')
+                .annotate(rooms_booked=models.Count('pk'), revenue=models.Sum('price')))
+
+
+# Индекс занятости номеров: одна строка на каждую занятую ночь каждого номера. Таблица заполняется автоматически
+# при сохранении бронирований (см. booking_app/signals.py) и позволяет проверять доступность номера без
+# сканирования всей истории бронирований. hotel_id и price - отель и цена номера на момент бронирования, по ним
+# ночь учитывается в сводной таблице занятости.
+class RoomNight(models.Model):
+    room_id = models.ForeignKey('Room', on_delete=models.CASCADE)
+    booking_id = models.ForeignKey('Booking', on_delete=models.CASCADE)
+    night = models.DateField()
+    hotel_id = models.ForeignKey('Hotel', on_delete=models.CASCADE, null=True, blank=True)
+    price = models.DecimalField(max_digits=6, decimal_places=2, default=Decimal(0))
+
+    objects = RoomNightManager()
+
+    def __str__(self):
+        return (f'Room_id: {self.room_id_id} '
+                f'Ночь: {self.night}')
+
+    class Meta:
+        verbose_name = 'Room night'
+        verbose_name_plural = 'Room nights'
+        constraints = [
+            models.UniqueConstraint(fields=['room_id', 'night'], name='unique_room_night'),
+        ]
+
+# Уникальное ограничение (room_id, night) одновременно служит индексом для проверки доступности и защищает от
+# повторного занятия одной и той же ночи на уровне базы данных.
@@ -0,0 +1,40 @@
+from django.db import models
+from django.db.models import Q, Value
+from django.utils import timezone
+
+# Условие "строка не удалена". Значение обернуто в Value, чтобы Django записал условие как deleted = (0), а не как
+# NOT deleted: по такому условию SQLite выбирает частичный индекс и ищет по нему, а MySQL - по индексу с deleted
+# в начале ключа. Одно и то же условие используется и в менеджере, и в индексах.
+NOT_DELETED = Q(deleted=Value(False))
+
+
+# Менеджер для моделей с мягким удалением: удаленные строки (deleted=True) не попадают ни в одну выборку через него.
+# Условие NOT_DELETED совпадает с условием частичных индексов моделей, поэтому списки и проверки читают только
+# живые строки и не замедляются по мере накопления удаленных.
+class SoftDeleteManager(models.Manager):
+
+    def get_queryset(self):
+        return super().get_queryset().filter(NOT_DELETED)
+
+
+# Индексы моделей с мягким удалением объявляются как Index(fields=['deleted', ...], condition=NOT_DELETED). На
+# SQLite это частичный индекс, в который удаленные строки не попадают вовсе. MySQL условия индексов не поддерживает и
+# создает обычный индекс, но столбец deleted в начале ключа отделяет живые строки от удаленных, поэтому запросы с
+# NOT_DELETED их тоже не читают (предупреждение models.W037 для MySQL отключено в настройках).
+
+# Базовая модель с мягким удалением. objects - менеджер по умолчанию, который скрывает удаленные строки, all_objects
+# - обычный менеджер для случаев, когда нужны все строки (выгрузки, восстановление, служебные запросы). Поля
+# deleted и deleted_at объявляются в самих моделях.
+class SoftDeleteModel(models.Model):
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    # Помечает строку удаленной вместо удаления из базы данных. Сохранение идет через save(), поэтому сигналы
+    # post_save обновляют кэш, индекс занятых ночей и статистику отзывов так же, как при обычном изменении.
+    def soft_delete(self):
+        self.deleted = True
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted', 'deleted_at', 'updated_at'])
@@ -8,7 +8,7 @@ class User(models.Model):
     password = models.CharField(max_length=50)
     bookings = models.ForeignKey('Booking', on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return (f'ID: {self.user_id} '
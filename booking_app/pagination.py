@@ -0,0 +1,175 @@
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+# Базовая курсорная (keyset) пагинация приложения. Следующая страница выбирается условием по полю сортировки
+# относительно курсора, а не через OFFSET, поэтому стоимость выборки страницы не растет с ее номером. Курсор
+# передается клиенту в закодированном виде и не раскрывает значений полей. Размер страницы по умолчанию задается
+# настройкой PAGE_SIZE, клиент может изменить его параметром page_size, но не больше MAX_PAGE_SIZE.
+class KeysetPagination(CursorPagination):
+    page_size = settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    # paginate_queryset из CursorPagination (DRF 3.15), разделенный на две части: page_queryset строит запрос
+    # страницы, set_page разбирает прочитанные строки. Между ними выполняется единственный запрос к базе данных,
+    # поэтому ту же пагинацию можно использовать и в асинхронных представлениях (apaginate_queryset).
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        # Курсорная пагинация всегда задает сортировку
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        # Если у курсора есть позиция, страница начинается сразу после нее
+        if str(current_position) != 'None' and len(self.ordering) > 1:
+            queryset = queryset.filter(self.composite_position_filter(current_position))
+        elif str(current_position) != 'None':
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': current_position}
+            else:
+                kwargs = {order_attr + '__gt': current_position}
+
+            filter_query = Q(**kwargs)
+            # Строки с NULL в поле сортировки при обратном порядке идут последними, их нельзя потерять
+            if (reverse and not is_reversed) or is_reversed:
+                filter_query |= Q(**{order_attr + '__isnull': True})
+            queryset = queryset.filter(filter_query)
+
+        # Одна лишняя строка показывает, есть ли следующая страница
+        self.reverse = reverse
+        self.offset = offset
+        self.current_position = current_position
+        return queryset[offset:offset + self.page_size + 1]
+
+    # Условие "после позиции" для сортировки по нескольким полям (например, цена и первичный ключ): строки с большим
+    # первым полем или с тем же первым полем и большим вторым и т. д. Первое поле дополнительно ограничено условием
+    # >= (или <=), чтобы база данных начала чтение индекса с позиции, а не с начала. Поля такой сортировки не
+    # должны содержать NULL.
+    def composite_position_filter(self, position):
+        values = position.split(',')
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, values):
+            order_attr = order.lstrip('-')
+            lookup = 'lt' if self.cursor.reverse != order.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{order_attr}__{lookup}': value})
+            equal &= Q(**{order_attr: value})
+        order_attr = self.ordering[0].lstrip('-')
+        lookup = 'lte' if self.cursor.reverse != self.ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{order_attr}__{lookup}': values[0]}) & condition
+
+    # Позиция строки в курсоре. При сортировке по нескольким полям в нее входят значения всех полей через запятую.
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+        return ','.join(str(instance[order.lstrip('-')] if isinstance(instance, dict)
+                            else getattr(instance, order.lstrip('-'))) for order in ordering)
+
+    def set_page(self, results):
+        self.page = list(results[:self.page_size])
+
+        # Позиция строки, следующей за страницей
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if self.reverse:
+            # Запрос читал строки в обратном порядке, клиенту они отдаются в прямом
+            self.page = list(reversed(self.page))
+
+            self.has_next = (self.current_position is not None) or (self.offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = self.current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (self.current_position is not None) or (self.offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = self.current_position
+
+        # Элементы управления страницами в Browsable API показываются, только если страниц больше одной
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class BookingCursorPagination(KeysetPagination):
+    ordering = 'booking_id'
+
+
+class HotelCursorPagination(KeysetPagination):
+    ordering = 'hotel_id'
+
+
+class ReviewCursorPagination(KeysetPagination):
+    ordering = 'review_id'
+
+
+# Курсорная пагинация номеров. Параметр sort=price (или -price) сортирует номера по цене; при равной цене порядок
+# задает первичный ключ, поэтому позиция в курсоре однозначна и следующая страница выбирается по индексу цены.
+class RoomCursorPagination(KeysetPagination):
+    ordering = 'room_id'
+    sort_query_param = 'sort'
+    sort_orderings = {
+        'price': ('price_per_night', 'room_id'),
+        '-price': ('-price_per_night', '-room_id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        sort = request.query_params.get(self.sort_query_param)
+        if sort in self.sort_orderings:
+            return self.sort_orderings[sort]
+        return super().get_ordering(request, queryset, view)
+
+
+class UserCursorPagination(KeysetPagination):
+    ordering = 'user_id'
+
+
+# Курсорная пагинация для отзывов отеля: от новых к старым. Вместе с индексом (hotel_id, created_at) каждая
+# страница читается одним диапазонным запросом по индексу.
+class HotelReviewCursorPagination(KeysetPagination):
+    ordering = '-created_at'
@@ -0,0 +1,77 @@
+import csv
+import json
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+# orjson - необязательная зависимость: если пакет не установлен, FastJSONRenderer работает как обычный JSONRenderer.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Вспомогательный "файл", который не хранит записанные строки, а сразу возвращает их. Нужен, чтобы csv.writer
+# формировал строки по одной для потоковой отдачи.
+class Echo:
+    def write(self, value):
+        return value
+
+
+# Рендерер формата NDJSON: один JSON-объект на строку. Метод render используется для обычных ответов (например,
+# ошибок), а render_rows - для потоковой выгрузки, когда строки формируются по мере чтения из базы данных.
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self.render_rows(rows, fields=None)).encode(self.charset)
+
+    def render_rows(self, rows, fields):
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+# Рендерер формата CSV. Первой строкой выводятся названия полей, далее по одной строке на объект.
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows and isinstance(rows[0], dict) else []
+        # Ошибки валидации приходят списками сообщений, объединяем их в одну ячейку
+        rows = [{field: '; '.join(map(str, value)) if isinstance(value, list) else value
+                 for field, value in row.items()} for row in rows]
+        return ''.join(self.render_rows(rows, fields)).encode(self.charset)
+
+    def render_rows(self, rows, fields):
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row.get(field) for field in fields])
+
+
+# Рендерер JSON на основе orjson. Вывод совпадает с JSONRenderer DRF: компактные разделители, символы не-ASCII без
+# экранирования, \u2028 и \u2029 экранируются. Даты, Decimal и ленивые строки orjson передает кодировщику DRF, чтобы
+# они выводились так же, как в JSONRenderer. Отступы (например, в Browsable API) и отключенная настройка
+# FAST_JSON_RENDERER обрабатываются обычным JSONRenderer.
+class FastJSONRenderer(JSONRenderer):
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson is not None else None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or not settings.FAST_JSON_RENDERER or indent is not None or not self.compact or \
+                self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
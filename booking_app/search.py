@@ -0,0 +1,224 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+# Полнотекстовый поиск по отелям (название, расположение, описание) и отзывам (комментарий) вместо LIKE '%слово%',
+# который читает все строки. На SQLite поиск идет по виртуальным таблицам FTS5 booking_app_hotel_search и
+# booking_app_review_search с внешним содержимым (сам текст хранится только в таблицах отелей и отзывов), на MySQL -
+# по индексам FULLTEXT. Индексы создает миграция 0019_full_text_search и поддерживает сама база данных: на SQLite -
+# триггеры на вставку, изменение текстовых полей и удаление строк, на MySQL - InnoDB. Поэтому индексы не отстают и
+# при изменениях в обход save() и сигналов. Пересчитывает индексы команда rebuild_search_index.
+
+# Слова запроса. Служебный синтаксис FTS5 и MySQL (кавычки, операторы, звездочки) из запроса не попадает в поиск.
+WORD_RE = re.compile(r'\w+')
+
+# Веса полей отеля в оценке bm25 на SQLite: совпадение в названии важнее совпадения в расположении и описании.
+HOTEL_WEIGHTS = (10.0, 5.0, 1.0)
+
+SQLITE_SEARCH = f'''
+SELECT * FROM (
+    SELECT 'hotel', booking_app_hotel.hotel_id, NULL, booking_app_hotel.name,
+           -bm25(booking_app_hotel_search, {', '.join(map(str, HOTEL_WEIGHTS))}) AS score,
+           snippet(booking_app_hotel_search, -1, '[', ']', '...', %s)
+    FROM booking_app_hotel_search
+    JOIN booking_app_hotel ON booking_app_hotel.hotel_id = booking_app_hotel_search.rowid
+    WHERE booking_app_hotel_search MATCH %s AND booking_app_hotel.deleted = 0
+    ORDER BY score DESC LIMIT %s
+)
+UNION ALL
+SELECT * FROM (
+    SELECT 'review', booking_app_hotel.hotel_id, booking_app_review.review_id, booking_app_hotel.name,
+           -bm25(booking_app_review_search) AS score,
+           snippet(booking_app_review_search, 0, '[', ']', '...', %s)
+    FROM booking_app_review_search
+    JOIN booking_app_review ON booking_app_review.review_id = booking_app_review_search.rowid
+    JOIN booking_app_hotel ON booking_app_hotel.hotel_id = booking_app_review.hotel_id_id
+    WHERE booking_app_review_search MATCH %s AND booking_app_review.deleted = 0 AND booking_app_hotel.deleted = 0
+      AND booking_app_review_search.rowid >= (
+          SELECT IFNULL(MIN(rowid), 0) FROM (
+              SELECT rowid FROM booking_app_review_search WHERE booking_app_review_search MATCH %s
+              ORDER BY rowid DESC LIMIT %s
+          )
+      )
+    ORDER BY score DESC LIMIT %s
+)
+ORDER BY 5 DESC LIMIT %s
+'''
+
+MYSQL_SEARCH = '''
+(SELECT 'hotel', hotel_id, NULL, name,
+        MATCH (name, location, description) AGAINST (%s IN BOOLEAN MODE) AS score, LEFT(description, %s)
+ FROM booking_app_hotel
+ WHERE MATCH (name, location, description) AGAINST (%s IN BOOLEAN MODE) AND deleted = 0
+ ORDER BY score DESC LIMIT %s)
+UNION ALL
+(SELECT 'review', booking_app_hotel.hotel_id, booking_app_review.review_id, booking_app_hotel.name,
+        MATCH (booking_app_review.comment) AGAINST (%s IN BOOLEAN MODE) AS score,
+        LEFT(booking_app_review.comment, %s)
+ FROM booking_app_review
+ JOIN booking_app_hotel ON booking_app_hotel.hotel_id = booking_app_review.hotel_id_id
+ WHERE MATCH (booking_app_review.comment) AGAINST (%s IN BOOLEAN MODE)
+       AND booking_app_review.deleted = 0 AND booking_app_hotel.deleted = 0
+ ORDER BY score DESC LIMIT %s)
+ORDER BY 5 DESC LIMIT %s
+'''
+
+# Таблицы FTS5 с внешним содержимым: rowid строки индекса - первичный ключ отеля или отзыва.
+SQLITE_TABLES = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS booking_app_hotel_search USING fts5(name, location, description, "
+    "content='booking_app_hotel', content_rowid='hotel_id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS booking_app_review_search USING fts5(comment, "
+    "content='booking_app_review', content_rowid='review_id', tokenize='unicode61 remove_diacritics 2')",
+]
+
+# Триггеры, которые поддерживают таблицы FTS5. Изменение отеля перестраивает его строку индекса, только если в
+# UPDATE есть текстовые поля, поэтому пересчет рейтинга (HotelManager.apply_reviews) индекс не трогает.
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS booking_app_hotel_search_insert AFTER INSERT ON booking_app_hotel BEGIN "
+    "INSERT INTO booking_app_hotel_search(rowid, name, location, description) "
+    "VALUES (new.hotel_id, new.name, new.location, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS booking_app_hotel_search_delete AFTER DELETE ON booking_app_hotel BEGIN "
+    "INSERT INTO booking_app_hotel_search(booking_app_hotel_search, rowid, name, location, description) "
+    "VALUES ('delete', old.hotel_id, old.name, old.location, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS booking_app_hotel_search_update AFTER UPDATE OF name, location, description "
+    "ON booking_app_hotel BEGIN "
+    "INSERT INTO booking_app_hotel_search(booking_app_hotel_search, rowid, name, location, description) "
+    "VALUES ('delete', old.hotel_id, old.name, old.location, old.description); "
+    "INSERT INTO booking_app_hotel_search(rowid, name, location, description) "
+    "VALUES (new.hotel_id, new.name, new.location, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS booking_app_review_search_insert AFTER INSERT ON booking_app_review BEGIN "
+    "INSERT INTO booking_app_review_search(rowid, comment) VALUES (new.review_id, new.comment); END",
+    "CREATE TRIGGER IF NOT EXISTS booking_app_review_search_delete AFTER DELETE ON booking_app_review BEGIN "
+    "INSERT INTO booking_app_review_search(booking_app_review_search, rowid, comment) "
+    "VALUES ('delete', old.review_id, old.comment); END",
+    "CREATE TRIGGER IF NOT EXISTS booking_app_review_search_update AFTER UPDATE OF comment ON booking_app_review "
+    "BEGIN "
+    "INSERT INTO booking_app_review_search(booking_app_review_search, rowid, comment) "
+    "VALUES ('delete', old.review_id, old.comment); "
+    "INSERT INTO booking_app_review_search(rowid, comment) VALUES (new.review_id, new.comment); END",
+]
+
+SQLITE_REBUILD = [
+    "INSERT INTO booking_app_hotel_search(booking_app_hotel_search) VALUES ('rebuild')",
+    "INSERT INTO booking_app_review_search(booking_app_review_search) VALUES ('rebuild')",
+    "INSERT INTO booking_app_hotel_search(booking_app_hotel_search) VALUES ('optimize')",
+    "INSERT INTO booking_app_review_search(booking_app_review_search) VALUES ('optimize')",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS booking_app_hotel_search_insert',
+    'DROP TRIGGER IF EXISTS booking_app_hotel_search_delete',
+    'DROP TRIGGER IF EXISTS booking_app_hotel_search_update',
+    'DROP TRIGGER IF EXISTS booking_app_review_search_insert',
+    'DROP TRIGGER IF EXISTS booking_app_review_search_delete',
+    'DROP TRIGGER IF EXISTS booking_app_review_search_update',
+    'DROP TABLE IF EXISTS booking_app_hotel_search',
+    'DROP TABLE IF EXISTS booking_app_review_search',
+]
+
+MYSQL_CREATE = [
+    'ALTER TABLE booking_app_hotel ADD FULLTEXT INDEX hotel_search_idx (name, location, description)',
+    'ALTER TABLE booking_app_review ADD FULLTEXT INDEX review_search_idx (comment)',
+]
+
+MYSQL_DROP = [
+    'ALTER TABLE booking_app_hotel DROP INDEX hotel_search_idx',
+    'ALTER TABLE booking_app_review DROP INDEX review_search_idx',
+]
+
+
+def query_words(query):
+    return WORD_RE.findall(query.lower())[:settings.SEARCH_MAX_WORDS]
+
+
+# Запрос к индексу: результат должен содержать все слова. Каждое слово на SQLite заключается в кавычки, на MySQL
+# помечается обязательным (+).
+def match_expression(words):
+    if connection.vendor == 'mysql':
+        return ' '.join(f'+{word}' for word in words)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+# Ищет отели и отзывы со всеми словами запроса query и возвращает не больше limit результатов от более
+# релевантных к менее: словари {type, hotel_id, review_id, hotel_name, score, snippet}, где type - 'hotel' или
+# 'review', а snippet - фрагмент текста с совпадением (на SQLite слова запроса выделены квадратными скобками, на MySQL
+# - начало текста). Отели и отзывы ищутся каждый по своему индексу, и из каждого берется не больше limit лучших
+# строк; удаленные отели и отзывы удаленных отелей в результаты не попадают. Один запрос.
+#
+# Оценка bm25 считается для каждой найденной строки, и для частых слов, которые есть в большинстве из миллиона
+# отзывов, это секунды. Поэтому на SQLite отзывы ранжируются среди SEARCH_MAX_CANDIDATES самых новых совпадений:
+# FTS5 перебирает совпадения в порядке rowid и отсекает остальные по диапазону rowid без вычисления оценки. Для
+# запросов с меньшим количеством совпадений результат точный.
+def search(query, limit):
+    words = query_words(query)
+    if not words:
+        return []
+    match = match_expression(words)
+    if connection.vendor == 'mysql':
+        sql = MYSQL_SEARCH
+        params = [match, settings.SEARCH_SNIPPET_CHARS, match, limit,
+                  match, settings.SEARCH_SNIPPET_CHARS, match, limit, limit]
+    else:
+        sql = SQLITE_SEARCH
+        params = [settings.SEARCH_SNIPPET_WORDS, match, limit,
+                  settings.SEARCH_SNIPPET_WORDS, match, match, settings.SEARCH_MAX_CANDIDATES, limit, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {'type': kind, 'hotel_id': hotel_id, 'review_id': review_id, 'hotel_name': hotel_name,
+         'score': score, 'snippet': snippet}
+        for kind, hotel_id, review_id, hotel_name, score, snippet in rows
+    ]
+
+
+# Подзапрос идентификаторов всех отелей (в том числе удаленных) со всеми словами запроса в названии, расположении
+# или описании, для фильтра pk__in. Используется поиском в административной панели вместо LIKE по полям отеля:
+# подзапрос к индексу выполняется внутри запроса списка отелей и его подсчета, и идентификаторы не переходят в Python
+# и обратно в параметры запроса. Для запроса без слов возвращает None.
+def matching_hotel_ids(query):
+    words = query_words(query)
+    if not words:
+        return None
+    if connection.vendor == 'mysql':
+        sql = ('SELECT hotel_id FROM booking_app_hotel '
+               'WHERE MATCH (name, location, description) AGAINST (%s IN BOOLEAN MODE)')
+    else:
+        sql = 'SELECT rowid FROM booking_app_hotel_search WHERE booking_app_hotel_search MATCH %s'
+    return RawSQL(sql, [match_expression(words)])
+
+
+def execute_all(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+# Создает индексы полнотекстового поиска и заполняет их уже существующими строками (миграция 0019_full_text_search).
+def create_search_index(connection):
+    if connection.vendor == 'mysql':
+        execute_all(connection, MYSQL_CREATE)
+    else:
+        execute_all(connection, SQLITE_TABLES + SQLITE_TRIGGERS + SQLITE_REBUILD)
+
+
+def drop_search_index(connection):
+    execute_all(connection, MYSQL_DROP if connection.vendor == 'mysql' else SQLITE_DROP)
+
+
+# Восстанавливает триггеры FTS5. Изменяя таблицу, SQLite-миграции Django пересоздают ее, а вместе с ней пропадают
+# и триггеры, поэтому они восстанавливаются после каждой миграции (см. booking_app/signals.py). Содержимое таблицы
+# при пересоздании не меняется, и индекс остается верным.
+def install_search_triggers(connection):
+    if connection.vendor == 'sqlite' and 'booking_app_hotel_search' in connection.introspection.table_names():
+        execute_all(connection, SQLITE_TRIGGERS)
+
+
+# Пересчитывает индексы полнотекстового поиска по текущему содержимому таблиц отелей и отзывов.
+def rebuild_search_index():
+    if connection.vendor == 'mysql':
+        execute_all(connection, MYSQL_DROP + MYSQL_CREATE)
+    else:
+        execute_all(connection, SQLITE_TRIGGERS + SQLITE_REBUILD)
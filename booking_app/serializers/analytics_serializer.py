@@ -0,0 +1,33 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from booking_app.error_messages import ANALYTICS_RANGE_ERROR
+from booking_app.models.occupancy_model import PERIODS
+
+
+# Этот сериализатор проверяет параметры отчета о занятости: полуинтервал дат [date_from, date_to) не длиннее
+# ANALYTICS_MAX_DAYS дней, период группировки (day, week, month) и, при необходимости, отель.
+class OccupancyParamsSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    period = serializers.ChoiceField(choices=PERIODS, default='day')
+    hotel_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        days = (attrs['date_to'] - attrs['date_from']).days
+        if not 0 < days <= settings.ANALYTICS_MAX_DAYS:
+            raise serializers.ValidationError(
+                ANALYTICS_RANGE_ERROR.format(max_days=settings.ANALYTICS_MAX_DAYS)
+            )
+        return attrs
+
+
+# Этот сериализатор представляет один период отчета о занятости: границы периода, количество занятых
+# номеро-ночей, количество доступных номеро-ночей, долю занятости и выручку.
+class OccupancyPeriodSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    rooms_booked = serializers.IntegerField()
+    room_nights = serializers.IntegerField()
+    occupancy = serializers.FloatField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
@@ -1,29 +1,151 @@
+from django.db import IntegrityError, connection, transaction
 from rest_framework import serializers
-from booking_app.error_messages import BOOKING_OCCUPIED_ERROR
+from booking_app.error_messages import BOOKING_OCCUPIED_ERROR, BOOKING_DATES_ERROR
 from booking_app.models.booking_model import Booking
+from booking_app.models.room_hold_model import RoomHold
+from booking_app.models.room_lock_model import lock_rooms
+from booking_app.models.room_night_model import RoomNight, nights_between
 
 
 class BookingSerializer(serializers.ModelSerializer):
+    # Проверять ли доступность номера при валидации. При массовом создании бронирований доступность проверяется
+    # сразу для всей пачки (см. sweep_conflicts), поэтому там проверка отключается.
+    check_availability = True
+    # Токен удержания номера (POST /rooms/<room_id>/hold/): удержание не мешает своему бронированию и снимается,
+    # когда бронирование сохранено.
+    hold_token = serializers.CharField(required=False, write_only=True, max_length=32)
+
     class Meta:
         model = Booking
         fields = '__all__'
 
     def validate(self, booking):
-        # Получаем данные из запроса
-        room_id = booking.get('room_id')
-        check_in_date = booking.get('check_in_date')
-        check_out_date = booking.get('check_out_date')
-
-        # Проверяем, есть ли уже бронирование для данного номера на указанные даты
-        existing_bookings = Booking.objects.filter(
-            room_id=room_id,
-            check_in_date__lte=check_out_date,
-            check_out_date__gte=check_in_date,
-            deleted_at__isnull=True  # Для активных бронирований
-        )
-
-        if existing_bookings.exists():
+        # Получаем данные из запроса. При частичном обновлении недостающие значения берем из самого бронирования
+        # (для номера - только идентификатор, чтобы не загружать номер отдельным запросом)
+        room_id = booking['room_id'] if 'room_id' in booking else getattr(self.instance, 'room_id_id', None)
+        check_in_date = booking.get('check_in_date', getattr(self.instance, 'check_in_date', None))
+        check_out_date = booking.get('check_out_date', getattr(self.instance, 'check_out_date', None))
+
+        if check_in_date >= check_out_date:
+            raise serializers.ValidationError(
+                BOOKING_DATES_ERROR)
+
+        # Проверяем по индексу занятых ночей и удержаниям, свободен ли номер на указанные даты. Ночи самого
+        # редактируемого бронирования и удержание с переданным токеном не учитываются
+        if self.check_availability and room_id is not None and not RoomNight.objects.is_free(
+                room_id, check_in_date, check_out_date, exclude_booking=self.instance,
+                hold_token=booking.get('hold_token')):
             raise serializers.ValidationError(
                 BOOKING_OCCUPIED_ERROR)
 
         return booking
+
+    # Бронирование и занятые им ночи сохраняются в одной транзакции, чтобы индекс не расходился с таблицей
+    # бронирований. Перед сохранением номер блокируется и доступность проверяется повторно уже под блокировкой:
+    # так параллельные запросы на один номер выполняются по очереди, а запросы на разные номера - одновременно.
+    def create(self, validated_data):
+        hold_token = validated_data.pop('hold_token', None)
+        with transaction.atomic():
+            self.lock_and_check(validated_data, hold_token)
+            booking = self.save_or_reject(super().create, validated_data)
+            self.release_hold(booking, hold_token)
+            return booking
+
+    def update(self, instance, validated_data):
+        hold_token = validated_data.pop('hold_token', None)
+        with transaction.atomic():
+            self.lock_and_check(validated_data, hold_token)
+            booking = self.save_or_reject(super().update, instance, validated_data)
+            self.release_hold(booking, hold_token)
+            return booking
+
+    def lock_and_check(self, validated_data, hold_token=None):
+        if 'room_id' in validated_data:
+            room_id = getattr(validated_data['room_id'], 'pk', None)
+        else:
+            room_id = getattr(self.instance, 'room_id_id', None)
+        if room_id is None:
+            return
+        lock_rooms([room_id, getattr(self.instance, 'room_id_id', None) or room_id])
+        check_in_date = validated_data.get('check_in_date', getattr(self.instance, 'check_in_date', None))
+        check_out_date = validated_data.get('check_out_date', getattr(self.instance, 'check_out_date', None))
+        if not RoomNight.objects.is_free(room_id, check_in_date, check_out_date, exclude_booking=self.instance,
+                                         hold_token=hold_token):
+            raise serializers.ValidationError(
+                BOOKING_OCCUPIED_ERROR)
+
+    # Снимает удержание, по которому номер забронирован.
+    @staticmethod
+    def release_hold(booking, hold_token):
+        if hold_token and booking.room_id_id is not None:
+            RoomHold.objects.filter(token=hold_token, room_id=booking.room_id_id).delete()
+
+    # Уникальный индекс (room_id, night) остается последней защитой от двойного бронирования: если ночь все же
+    # оказалась занята, запрос отклоняется так же, как при обычной проверке доступности.
+    @staticmethod
+    def save_or_reject(save, *args):
+        try:
+            with transaction.atomic():
+                return save(*args)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                BOOKING_OCCUPIED_ERROR)
+
+
+# Сериализатор одного элемента массового создания бронирований: проверяет поля и даты, но не доступность номера.
+class BookingBulkItemSerializer(BookingSerializer):
+    check_availability = False
+
+
+# Проверяет пачку бронирований на конфликты за один проход. bookings - список кортежей
+# (index, room_id, check_in_date, check_out_date), occupied - уже занятые ночи в виде {room_id: множество ночей}.
+# Бронирования группируются по номерам и сортируются по дате заезда, после чего каждое сравнивается с концом
+# последнего принятого бронирования этого номера и с уже занятыми ночами. Возвращает множество индексов
+# отклоненных бронирований.
+def sweep_conflicts(bookings, occupied):
+    rejected = set()
+    by_room = {}
+    for booking in bookings:
+        by_room.setdefault(booking[1], []).append(booking)
+
+    for room_id, room_bookings in by_room.items():
+        room_bookings.sort(key=lambda booking: (booking[2], booking[0]))
+        occupied_nights = occupied.get(room_id, set())
+        accepted_until = None
+        for index, _, check_in_date, check_out_date in room_bookings:
+            overlaps_batch = accepted_until is not None and check_in_date < accepted_until
+            if overlaps_batch or any(night in occupied_nights
+                                     for night in nights_between(check_in_date, check_out_date)):
+                rejected.add(index)
+                continue
+            accepted_until = check_out_date
+    return rejected
+
+
+# Бронирования пачки, которые пересекаются с чужими удержаниями. bookings - кортежи (index, room_id,
+# check_in_date, check_out_date), held - удержанные ночи в виде {room_id: {ночь: множество токенов}} (см.
+# RoomHoldManager.held_nights), hold_tokens - токены удержаний бронирований по индексам. Удержание не учитывается
+# только бронированием, которое передало его токен, и только для номера этого удержания. Возвращает множество
+# индексов отклоненных бронирований.
+def hold_conflicts(bookings, held, hold_tokens):
+    rejected = set()
+    for index, room_id, check_in_date, check_out_date in bookings:
+        held_nights = held.get(room_id, {})
+        own = {hold_tokens.get(index)}
+        if any(held_nights.get(night, own) - own for night in nights_between(check_in_date, check_out_date)):
+            rejected.add(index)
+    return rejected
+
+
+# Сохраняет пачку бронирований. Бронирования вставляются одним bulk_create, а их ночи - одним запросом в индекс
+# занятости. Если база данных не возвращает первичные ключи после bulk_create (MySQL), бронирования сохраняются по
+# одному, а индекс обновляется сигналом post_save. Вызывается внутри транзакции после lock_rooms.
+def create_bookings(bookings):
+    if not connection.features.can_return_rows_from_bulk_insert:
+        for booking in bookings:
+            booking.save()
+        return bookings
+
+    bookings = Booking.objects.bulk_create(bookings)
+    RoomNight.objects.occupy_many(bookings)
+    return bookings
@@ -0,0 +1,7 @@
+from rest_framework import serializers
+
+
+# Этот сериализатор проверяет параметры выгрузки. Параметр since ограничивает выгрузку объектами, которые были
+# созданы или изменены начиная с указанного момента.
+class ExportParamsSerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
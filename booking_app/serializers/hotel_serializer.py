@@ -1,10 +1,12 @@
 # Следующий блок кода определяет сериализатор Django REST Framework для модели Hotel. Сериализаторы используются
 # для преобразования объектов Django в JSON и обратно.
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from booking_app.error_messages import NON_UNIQUE_HOTEL_NAME_ERROR, HOTEL_NAME_LEN_ERROR
 from booking_app.models.hotel_model import Hotel
+from booking_app.serializers.photo_field import PhotoDerivativesMixin
 
 
 # Внутри класса HotelSerializer определен класс Meta, где указывается модель, с которой работает сериализатор,
@@ -17,13 +19,20 @@ from booking_app.models.hotel_model import Hotel
 # случае, метод возвращает значение имени отеля.
 
 
-class HotelSerializer(serializers.ModelSerializer):
+class HotelSerializer(PhotoDerivativesMixin, serializers.ModelSerializer):
     class Meta:
         model = Hotel
         fields = '__all__'
+        # Статистика отзывов хранится прямо в строке отеля и пересчитывается автоматически, поэтому клиент может
+        # только читать ее.
+        read_only_fields = ['review_count', 'rating_sum', 'rating_avg', 'rating_histogram']
 
     def validate_name(self, value):
-        if Hotel.objects.filter(name=value).exists():
+        # Имя уникально на уровне базы данных, поэтому учитываются и удаленные отели
+        hotels = Hotel.all_objects.filter(name=value)
+        if self.instance is not None:
+            hotels = hotels.exclude(pk=self.instance.pk)
+        if hotels.exists():
             raise ValidationError(
                 NON_UNIQUE_HOTEL_NAME_ERROR
             )
@@ -34,3 +43,13 @@ class HotelSerializer(serializers.ModelSerializer):
             )
 
         return value
+
+
+# Этот сериализатор проверяет параметры подсказок расположения: начало названия prefix и количество подсказок limit
+# (по умолчанию LOCATION_SUGGEST_DEFAULT_LIMIT, не больше LOCATION_SUGGEST_MAX_LIMIT).
+class LocationSuggestSerializer(serializers.Serializer):
+    prefix = serializers.CharField(max_length=60, trim_whitespace=False)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_limit(self, value):
+        return min(value, settings.LOCATION_SUGGEST_MAX_LIMIT)
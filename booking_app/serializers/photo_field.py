@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+from booking_app.images import derivative_urls
+from booking_app.storage import photo_storage
+
+
+# Поле сериализатора для производных изображений фотографии (photo_derivatives). Отдает ссылки на файлы вместо их
+# имен: {размер: {формат: ссылка}}. Как и ImageField, строит абсолютные ссылки, если в контексте есть запрос.
+# Поле только для чтения: производные строятся автоматически.
+class PhotoDerivativesField(serializers.Field):
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        storage = photo_storage()
+        if request is None:
+            return derivative_urls(value, storage.url)
+        return derivative_urls(value, lambda name: request.build_absolute_uri(storage.url(name)))
+
+
+# Примесь для ModelSerializer моделей с фотографией: поле модели photo_derivatives сериализуется через
+# PhotoDerivativesField и остается на своем месте в списке полей (в том числе при fields = '__all__').
+class PhotoDerivativesMixin:
+
+    def build_field(self, field_name, info, model_class, nested_depth):
+        if field_name == 'photo_derivatives':
+            return PhotoDerivativesField, {}
+        return super().build_field(field_name, info, model_class, nested_depth)
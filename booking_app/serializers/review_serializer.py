@@ -70,3 +70,20 @@ class AllReviewsSerializer(serializers.ModelSerializer):
 
     def validate(self, value):
         return validate_fields(value=value)
+
+
+# Этот сериализатор используется для списка отзывов конкретного отеля. Вместо ID пользователя он дополнительно
+# отдает его имя, которое берется из присоединенной через select_related('user_id') таблицы пользователей.
+class HotelReviewSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user_id.username', read_only=True, default=None)
+
+    class Meta:
+        model = Review
+        fields = [
+            'review_id',
+            'user_id',
+            'username',
+            'comment',
+            'rating',
+            'created_at',
+        ]
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from booking_app.error_messages import BOOKING_DATES_ERROR, ROOM_HOLD_NIGHTS_ERROR, ROOM_HOLD_OCCUPIED_ERROR
+from booking_app.models.room_hold_model import RoomHold
+from booking_app.models.room_lock_model import lock_rooms
+from booking_app.models.room_night_model import RoomNight
+
+
+# Этот сериализатор создает временное удержание номера: даты заезда и выезда (не больше ROOM_HOLD_MAX_NIGHTS ночей)
+# и срок удержания minutes (по умолчанию ROOM_HOLD_MINUTES, не больше ROOM_HOLD_MAX_MINUTES). В ответе возвращается
+# токен, который передается при бронировании (hold_token).
+class RoomHoldSerializer(serializers.ModelSerializer):
+    minutes = serializers.IntegerField(required=False, min_value=1, write_only=True)
+
+    class Meta:
+        model = RoomHold
+        fields = ['hold_id', 'room_id', 'token', 'check_in_date', 'check_out_date', 'expires_at', 'minutes']
+        read_only_fields = ['room_id', 'token', 'expires_at']
+
+    def validate_minutes(self, value):
+        return min(value, settings.ROOM_HOLD_MAX_MINUTES)
+
+    def validate(self, attrs):
+        if attrs['check_in_date'] >= attrs['check_out_date']:
+            raise serializers.ValidationError(
+                BOOKING_DATES_ERROR)
+        if (attrs['check_out_date'] - attrs['check_in_date']).days > settings.ROOM_HOLD_MAX_NIGHTS:
+            raise serializers.ValidationError(
+                ROOM_HOLD_NIGHTS_ERROR.format(max_nights=settings.ROOM_HOLD_MAX_NIGHTS))
+        return attrs
+
+    # Номер блокируется так же, как при бронировании (lock_rooms), и доступность проверяется уже под блокировкой:
+    # два одновременных удержания или удержание и бронирование одного номера выполняются по очереди.
+    def create(self, validated_data):
+        room_id = validated_data['room_id'].pk
+        with transaction.atomic():
+            lock_rooms([room_id])
+            if not RoomNight.objects.is_free(room_id, validated_data['check_in_date'],
+                                             validated_data['check_out_date']):
+                raise serializers.ValidationError(
+                    ROOM_HOLD_OCCUPIED_ERROR)
+            return RoomHold.objects.place(room_id, validated_data['check_in_date'], validated_data['check_out_date'],
+                                          validated_data.get('minutes', settings.ROOM_HOLD_MINUTES))
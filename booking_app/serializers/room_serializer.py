@@ -1,12 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from booking_app.error_messages import ROOM_TYPE_LENGTH_ERROR, ROOM_TYPE_REQUIRED_ERROR
-from booking_app.models.room_model import Room
+from booking_app.availability import ENCODINGS
+from booking_app.error_messages import (ROOM_TYPE_LENGTH_ERROR, ROOM_TYPE_REQUIRED_ERROR, BOOKING_DATES_ERROR,
+                                        ROOM_PRICE_RANGE_ERROR, ROOM_CALENDAR_RANGE_ERROR,
+                                        ROOM_CALENDAR_ROOMS_ERROR)
+from booking_app.models.room_model import Room, RoomType
+from booking_app.serializers.photo_field import PhotoDerivativesMixin
 
 
 # Это вспомогательная функция для валидации поля. Она проверяет, что room_type не является пустым и не превышает
 # максимальную длину.
 
-def validate_fields(self, attrs):
+def validate_fields(attrs):
     room_type = attrs.get('room_type')
 
     if not room_type:
@@ -23,9 +31,7 @@ def validate_fields(self, attrs):
 # Этот сериализатор используется для представления информации о номере, включая его отель(ID), тип номера,
 # цену за ночь и занятость. Он также включает метод validate, который вызывает функцию validate_fields для валидации
 # полей перед сохранением.
-class RoomInfoSerializer(serializers.ModelSerializer):
-    room = serializers.StringRelatedField()
-
+class RoomInfoSerializer(PhotoDerivativesMixin, serializers.ModelSerializer):
     class Meta:
         model = Room
         fields = [
@@ -33,18 +39,20 @@ class RoomInfoSerializer(serializers.ModelSerializer):
             'hotel_id',
             'room_type',
             'photos',
+            'photo_derivatives',
             'price_per_night',
+            'capacity',
             'available'
         ]
 
     def validate(self, attrs):
-        return validate_fields(attrs=attrs)
+        return validate_fields(attrs)
 
 
 # Этот сериализатор предназначен для представления всех полей номера, включая дату открытия(создания) номера и
 # последнего обновления. Он также включает метод validate, который вызывает ту же функцию validate_fields для
 # валидации полей перед сохранением.
-class AllRoomsSerializer(serializers.ModelSerializer):
+class AllRoomsSerializer(PhotoDerivativesMixin, serializers.ModelSerializer):
     class Meta:
         model = Room
         fields = [
@@ -52,7 +60,9 @@ class AllRoomsSerializer(serializers.ModelSerializer):
             'hotel_id',
             'room_type',
             'photos',
+            'photo_derivatives',
             'price_per_night',
+            'capacity',
             'available',
             'created_at',
             'updated_at',
@@ -60,5 +70,91 @@ class AllRoomsSerializer(serializers.ModelSerializer):
             'deleted'
         ]
 
-    def validate(self, value):
-        return validate_fields(value=value)
+    def validate(self, attrs):
+        return validate_fields(attrs)
+
+
+# Этот сериализатор проверяет параметры поиска свободных номеров: даты заезда и выезда, количество гостей,
+# расположение отеля и диапазон цены. Даты передаются вместе или не передаются вовсе.
+class FreeRoomSearchSerializer(serializers.Serializer):
+    check_in = serializers.DateField(required=False)
+    check_out = serializers.DateField(required=False)
+    guests = serializers.IntegerField(required=False, min_value=1)
+    location = serializers.CharField(required=False, max_length=60)
+    min_price = serializers.DecimalField(required=False, max_digits=6, decimal_places=2)
+    max_price = serializers.DecimalField(required=False, max_digits=6, decimal_places=2)
+
+    def validate(self, attrs):
+        check_in = attrs.get('check_in')
+        check_out = attrs.get('check_out')
+        if (check_in is None) != (check_out is None):
+            raise serializers.ValidationError(
+                BOOKING_DATES_ERROR
+            )
+        if check_in is not None and check_in >= check_out:
+            raise serializers.ValidationError(
+                BOOKING_DATES_ERROR
+            )
+        return attrs
+
+
+# Этот сериализатор проверяет параметры списка номеров: отель, типы номеров (параметр room_type можно повторять),
+# диапазон цены, сортировку и запрос фасетов (facets=true).
+class RoomFilterSerializer(serializers.Serializer):
+    hotel_id = serializers.IntegerField(required=False)
+    room_type = serializers.MultipleChoiceField(required=False, choices=RoomType.choices)
+    min_price = serializers.DecimalField(required=False, max_digits=6, decimal_places=2)
+    max_price = serializers.DecimalField(required=False, max_digits=6, decimal_places=2)
+    sort = serializers.ChoiceField(required=False, choices=['price', '-price'])
+    facets = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        min_price = attrs.get('min_price')
+        max_price = attrs.get('max_price')
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError(
+                ROOM_PRICE_RANGE_ERROR
+            )
+        return attrs
+
+
+# Этот сериализатор проверяет параметры календаря занятости номеров: полуинтервал дат [from, to) не длиннее
+# ROOM_CALENDAR_MAX_DAYS дней (по умолчанию ROOM_CALENDAR_DEFAULT_DAYS дней, начиная с сегодняшнего), способ
+# кодирования и, для календаря нескольких номеров, номера (параметр room_id можно повторять, не больше
+# ROOM_CALENDAR_MAX_ROOMS) или отель. Даты попадают в validated_data как date_from и date_to.
+class RoomCalendarSerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False, source='date_from')
+    to = serializers.DateField(required=False, source='date_to')
+    encoding = serializers.ChoiceField(choices=ENCODINGS, default='base64')
+    room_id = serializers.ListField(child=serializers.IntegerField(), required=False)
+    hotel_id = serializers.IntegerField(required=False)
+
+    # "from" - ключевое слово Python, поэтому поле объявлено под другим именем
+    def get_fields(self):
+        fields = super().get_fields()
+        fields['from'] = fields.pop('date_from')
+        return fields
+
+    def validate(self, attrs):
+        date_from = attrs.setdefault('date_from', timezone.localdate())
+        date_to = attrs.setdefault('date_to', date_from + timedelta(days=settings.ROOM_CALENDAR_DEFAULT_DAYS))
+        if not 0 < (date_to - date_from).days <= settings.ROOM_CALENDAR_MAX_DAYS:
+            raise serializers.ValidationError(
+                ROOM_CALENDAR_RANGE_ERROR.format(max_days=settings.ROOM_CALENDAR_MAX_DAYS)
+            )
+        if len(attrs.get('room_id', [])) > settings.ROOM_CALENDAR_MAX_ROOMS:
+            raise serializers.ValidationError(
+                ROOM_CALENDAR_ROOMS_ERROR.format(max_rooms=settings.ROOM_CALENDAR_MAX_ROOMS)
+            )
+        return attrs
+
+
+# Календарь нескольких номеров требует номеров или отеля.
+class RoomBatchCalendarSerializer(RoomCalendarSerializer):
+
+    def validate(self, attrs):
+        if not attrs.get('room_id') and 'hotel_id' not in attrs:
+            raise serializers.ValidationError(
+                ROOM_CALENDAR_ROOMS_ERROR.format(max_rooms=settings.ROOM_CALENDAR_MAX_ROOMS)
+            )
+        return super().validate(attrs)
@@ -0,0 +1,33 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from booking_app.error_messages import SEARCH_QUERY_ERROR
+from booking_app.search import query_words
+
+
+# Этот сериализатор проверяет параметры полнотекстового поиска: запрос q хотя бы из одного слова и количество
+# результатов limit (по умолчанию SEARCH_DEFAULT_LIMIT, не больше SEARCH_MAX_LIMIT).
+class SearchParamsSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_q(self, value):
+        if not query_words(value):
+            raise serializers.ValidationError(
+                SEARCH_QUERY_ERROR
+            )
+        return value
+
+    def validate_limit(self, value):
+        return min(value, settings.SEARCH_MAX_LIMIT)
+
+
+# Этот сериализатор представляет один результат поиска: отель или отзыв (review_id), отель, к которому он относится,
+# оценку релевантности и фрагмент текста с совпадением.
+class SearchResultSerializer(serializers.Serializer):
+    type = serializers.CharField()
+    hotel_id = serializers.IntegerField()
+    review_id = serializers.IntegerField(allow_null=True)
+    hotel_name = serializers.CharField()
+    score = serializers.FloatField()
+    snippet = serializers.CharField()
@@ -8,7 +8,44 @@ from booking_app.error_messages import (USERNAME_LEN_ERROR,
                                         USERNAME_REQUIRED_ERROR,
                                         USER_EMAIL_REQUIRED_ERROR)
 from booking_app.models.user_model import User
-from booking_app.serializers.room_serializer import validate_fields
+
+
+# Это вспомогательная функция для валидации полей. Она проверяет, что поля username и email не являются пустыми,
+# уникальны и не превышают максимальную длину. instance - изменяемый пользователь, его собственные значения не
+# считаются повторами.
+def validate_fields(attrs, instance=None):
+    username = attrs.get('username')
+    user_email = attrs.get('email')
+    users = User.objects.all()
+    if instance is not None:
+        users = users.exclude(pk=instance.pk)
+
+    if not username:
+        raise serializers.ValidationError(
+            USERNAME_REQUIRED_ERROR
+        )
+    if len(username) > 25 or len(username) < 2:
+        raise serializers.ValidationError(
+            USERNAME_LEN_ERROR
+        )
+    if users.filter(username=username).exists():
+        raise ValidationError(
+            USERNAME_NON_UNIQUE_ERROR
+        )
+
+    if not user_email:
+        raise serializers.ValidationError(
+            USER_EMAIL_REQUIRED_ERROR
+        )
+    if len(user_email) > 25 or len(user_email) < 2:
+        raise serializers.ValidationError(
+            USER_EMAIL_LEN_ERROR
+        )
+    if users.filter(email=user_email).exists():
+        raise ValidationError(
+            USER_EMAIL_NON_UNIQUE_ERROR
+        )
+    return attrs
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -16,44 +53,10 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = '__all__'
 
-    # Это вспомогательная функция для валидации поля. Она проверяет, что поля username и email не является пустыми,
-    # уникальны и не превышают максимальную длину.
-    def validate_fields(self, value):
-        username = value.get('username')
-        user_email = value.get('email')
-
-        if not username:
-            raise serializers.ValidationError(
-                USERNAME_REQUIRED_ERROR
-            )
-        if len(username) > 25 or len(username) < 2:
-            raise serializers.ValidationError(
-                USERNAME_LEN_ERROR
-            )
-        if User.objects.filter(username=value).exists():
-            raise ValidationError(
-                USERNAME_NON_UNIQUE_ERROR
-            )
-
-        if not user_email:
-            raise serializers.ValidationError(
-                USER_EMAIL_REQUIRED_ERROR
-            )
-        if len(user_email) > 25 or len(user_email) < 2:
-            raise serializers.ValidationError(
-                USER_EMAIL_LEN_ERROR
-            )
-        if User.objects.filter(user_email=value).exists():
-            raise ValidationError(
-                USER_EMAIL_NON_UNIQUE_ERROR
-            )
-        return value
-
 
 # Этот сериализатор используется для представления информации о пользователе, включая его email и бронирования. Он
 # также включает метод validate, который вызывает функцию validate_fields для валидации полей перед сохранением.
 class UserInfoSerializer(serializers.ModelSerializer):
-    user = serializers.StringRelatedField()
 
     # Вложенный класс, используемый для предоставления дополнительной конфигурации сериализатора.
     class Meta:
@@ -67,7 +70,7 @@ class UserInfoSerializer(serializers.ModelSerializer):
         ]
 
     def validate(self, attrs):
-        return validate_fields(attrs=attrs)
+        return validate_fields(attrs, self.instance)
 
 
 # Этот сериализатор предназначен для представления всех полей модели пользователя(кроме пароля), включая дату создания
@@ -85,5 +88,5 @@ class AllUsersSerializer(serializers.ModelSerializer):
             'updated_at',
         ]
 
-    def validate(self, value):
-        return validate_fields(value=value)
+    def validate(self, attrs):
+        return validate_fields(attrs, self.instance)
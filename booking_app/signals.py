@@ -0,0 +1,181 @@
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from booking_app.cache import bump_generations
+from booking_app.images import schedule_derivatives
+from booking_app.locations import refresh_locations
+from booking_app.models.booking_model import Booking
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.photo_blob_model import PhotoBlob
+from booking_app.models.review_model import Review
+from booking_app.models.room_model import Room
+from booking_app.models.room_night_model import RoomNight
+from booking_app.search import install_search_triggers
+
+
+# После каждого сохранения бронирования обновляем индекс занятых ночей и вместе с ним сводную таблицу занятости.
+# Мягко удаленное бронирование ночей не занимает, поэтому при удалении его ночи освобождаются здесь же. У нового
+# бронирования занятых ночей еще нет, поэтому они только добавляются.
+@receiver(post_save, sender=Booking)
+def sync_booking_nights(sender, instance, created, **kwargs):
+    if created:
+        RoomNight.objects.occupy(instance)
+    else:
+        RoomNight.objects.sync_booking(instance)
+
+
+# Перед физическим удалением бронирования его ночи освобождаются через индекс занятости, чтобы сводная таблица
+# занятости (HotelDailyOccupancy) их не учитывала. Каскадное удаление строк RoomNight этого не делает.
+@receiver(pre_delete, sender=Booking)
+def release_deleted_booking_nights(sender, instance, **kwargs):
+    RoomNight.objects.release(instance)
+
+
+# При изменении или удалении отеля становятся недействительными закэшированные список отелей и карточка этого
+# отеля.
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def invalidate_hotel_cache(sender, instance, **kwargs):
+    bump_generations('hotels', f'hotel:{instance.pk}')
+
+
+# Подсказки расположений (booking_app/locations.py) строятся заново после фиксации транзакции, в которой отель
+# добавлен, удален или изменилось его расположение. Сохранения только отдельных полей, без расположения и отметки
+# удаления (например, производных изображений), подсказки не меняют.
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def refresh_location_suggestions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'location', 'deleted'} & set(update_fields):
+        return
+    transaction.on_commit(refresh_locations)
+
+
+# При мягком удалении отеля мягко удаляются и его номера: они пропадают из списков и поиска свободных номеров так
+# же, как раньше пропадали при каскадном удалении. Номера обновляются одним запросом, поэтому кэш номеров
+# сбрасывается здесь, а не сигналами отдельных номеров.
+@receiver(post_save, sender=Hotel)
+def soft_delete_hotel_rooms(sender, instance, **kwargs):
+    if not instance.deleted:
+        return
+    rooms = Room.objects.filter(hotel_id=instance)
+    room_ids = list(rooms.values_list('pk', flat=True))
+    if not room_ids:
+        return
+    rooms.update(deleted=True, deleted_at=instance.deleted_at or timezone.now(), updated_at=timezone.now())
+    bump_generations('rooms', f'hotel:{instance.pk}:rooms', *(f'room:{room_id}' for room_id in room_ids))
+
+
+# Если фотографию отеля или номера заменили, прежние производные изображения к ней больше не относятся: поле
+# очищается в той же записи, а новые производные строятся фоновыми потоками после фиксации транзакции.
+@receiver(pre_save, sender=Hotel)
+@receiver(pre_save, sender=Room)
+def reset_photo_derivatives(sender, instance, **kwargs):
+    if instance.photo_changed():
+        instance.photo_derivatives = {}
+
+
+# После сохранения отеля или номера обновляются счетчики ссылок на файлы фотографии и производных изображений
+# (файлы без ссылок удаляются из хранилища), а для новой фотографии ставится в очередь построение производных.
+@receiver(post_save, sender=Hotel)
+@receiver(post_save, sender=Room)
+def sync_photo_files(sender, instance, **kwargs):
+    acquired, released = instance.photo_file_changes()
+    PhotoBlob.objects.acquire(acquired)
+    PhotoBlob.objects.release(released)
+    if instance.photo_changed() and instance.photos:
+        schedule_derivatives(instance)
+    instance.remember_photo()
+
+
+# При физическом удалении отеля или номера (в том числе каскадном) его файлы освобождаются.
+@receiver(post_delete, sender=Hotel)
+@receiver(post_delete, sender=Room)
+def release_photo_files(sender, instance, **kwargs):
+    PhotoBlob.objects.release(set().union(*instance.photo_files().values()))
+
+
+# Перед сохранением номера запоминаем отель, к которому он относился, чтобы при переносе номера в другой отель
+# сбросить кэш списка номеров и старого, и нового отеля.
+@receiver(pre_save, sender=Room)
+def remember_room_hotel(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._previous_hotel_id = None
+    else:
+        instance._previous_hotel_id = Room.all_objects.filter(pk=instance.pk).values_list('hotel_id', flat=True).first()
+
+
+# При изменении или удалении номера становятся недействительными закэшированные полный список номеров, карточка
+# номера и список номеров его отеля.
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def invalidate_room_cache(sender, instance, **kwargs):
+    scopes = {'rooms', f'room:{instance.pk}', f'hotel:{instance.hotel_id_id}:rooms'}
+    previous_hotel_id = getattr(instance, '_previous_hotel_id', None)
+    if previous_hotel_id is not None:
+        scopes.add(f'hotel:{previous_hotel_id}:rooms')
+    bump_generations(*scopes)
+
+
+# Отзыв учитывается в статистике отеля, только если он привязан к отелю и не удален.
+def counted_review(hotel_id, rating, deleted, deleted_at):
+    if hotel_id is None or deleted or deleted_at is not None:
+        return None
+    return hotel_id, Decimal(str(rating))
+
+
+# Перед сохранением отзыва запоминаем, как он был учтен в статистике отеля до изменения.
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    previous = None
+    if instance.pk is not None:
+        previous = (Review.all_objects.filter(pk=instance.pk)
+                    .values_list('hotel_id', 'rating', 'deleted', 'deleted_at')
+                    .first())
+    instance._previous_rating = counted_review(*previous) if previous else None
+
+
+# Применяет изменения статистики отзывов (список троек (отель, оценка, знак)) к отелям: каждый отель обновляется
+# одной записью, даже если отзыв остался в том же отеле и изменилась только оценка.
+def apply_review_changes(changes):
+    by_hotel = {}
+    for hotel_id, rating, sign in changes:
+        by_hotel.setdefault(hotel_id, []).append((rating, sign))
+    for hotel_id, hotel_changes in by_hotel.items():
+        if Hotel.objects.apply_reviews(hotel_id, hotel_changes):
+            bump_generations('hotels', f'hotel:{hotel_id}')
+
+
+# После сохранения отзыва убираем из статистики отеля его прежнее состояние и добавляем новое. Если отель и
+# оценка не изменились, статистика не трогается.
+@receiver(post_save, sender=Review)
+def update_hotel_rating(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    current = counted_review(instance.hotel_id_id, instance.rating, instance.deleted, instance.deleted_at)
+    if previous == current:
+        return
+    changes = []
+    if previous is not None:
+        changes.append((*previous, -1))
+    if current is not None:
+        changes.append((*current, 1))
+    apply_review_changes(changes)
+
+
+# При удалении отзыва убираем его из статистики отеля.
+@receiver(post_delete, sender=Review)
+def remove_hotel_rating(sender, instance, **kwargs):
+    current = counted_review(instance.hotel_id_id, instance.rating, instance.deleted, instance.deleted_at)
+    if current is not None:
+        apply_review_changes([(*current, -1)])
+
+
+# После миграций приложения восстанавливаются триггеры полнотекстового поиска, которые SQLite теряет при
+# пересоздании таблиц отелей и отзывов (см. booking_app/search.py).
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'booking_app':
+        install_search_triggers(connections[using])
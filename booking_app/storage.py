@@ -0,0 +1,79 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.utils.deconstruct import deconstructible
+
+# Имя файла в хранилище по содержимому: <prefix>/ab/cd/<sha256><расширение>.
+CONTENT_NAME = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(?:\.\w+)?$')
+# Разные расширения одного формата приводятся к одному, чтобы одинаковые файлы получали одинаковые имена.
+EXTENSION_ALIASES = {'.jpeg': '.jpg', '.jpe': '.jpg', '.tif': '.tiff'}
+
+
+# Хэш SHA-256 содержимого файла. Файл читается частями, поэтому большие загрузки не попадают в память целиком.
+def file_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Хэш содержимого по имени файла в ContentAddressedStorage или None для файлов, сохраненных под другими именами.
+def content_digest(name):
+    match = CONTENT_NAME.search(name or '')
+    return match['digest'] if match else None
+
+
+# Хранилище фотографий с адресацией по содержимому. Имя файла строится из хэша SHA-256 его содержимого, а не из
+# имени загруженного файла, поэтому одинаковые загрузки сохраняются одним файлом, а не копиями с суффиксами, как в
+# FileSystemStorage. Содержимое файла с таким именем никогда не меняется: имя (и ссылка) служит постоянным ключом
+# кэша. Сколько объектов ссылается на файл, хранит модель PhotoBlob; файл удаляется, когда ссылок не остается.
+@deconstructible(path='booking_app.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+
+    def __init__(self, prefix='photos', **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+
+    def content_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        extension = EXTENSION_ALIASES.get(extension, extension)
+        return f'{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    # Имя выбирается в _save по содержимому. Суффиксы при совпадении имен не нужны: файл с тем же именем имеет то
+    # же содержимое.
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    # Файл записывается во временный файл того же каталога и переименовывается. Одновременная загрузка одинаковых
+    # файлов безопасна: оба процесса записывают одно и то же содержимое под одним именем. Существующий файл не
+    # записывается заново, поэтому до появления ссылки на него его удерживает вызывающий код (см.
+    # PhotoBlobManager.hold), иначе его может удалить транзакция, освободившая последнюю ссылку.
+    def _save(self, name, content):
+        name = self.content_name(file_digest(content), name)
+        if self.exists(name):
+            return name
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary_path, self.file_permissions_mode)
+            os.replace(temporary_path, full_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return name
+
+
+# Хранилище полей photos отелей и номеров (настройка STORAGES['photos']). Функция, а не объект, чтобы миграции не
+# зависели от настроек хранилища.
+def photo_storage():
+    return storages['photos']
@@ -13,6 +13,9 @@ USER_DELETED_MESSAGE = "The User was deleted successfully"
 BOOKING_CREATED_MESSAGE = "New booking was created successfully."
 BOOKING_UPDATED_MESSAGE = "The booking was updated successfully."
 BOOKING_DELETED_MESSAGE = "The booking was deleted successfully"
+BOOKINGS_BULK_CREATED_MESSAGE = "{created} of {total} bookings were created successfully."
+ROOM_HOLD_CREATED_MESSAGE = "The room is held for you until the hold expires."
+ROOM_HOLD_RELEASED_MESSAGE = "The room hold was released."
 
 REVIEW_CREATED_MESSAGE = "New review was created successfully."
 REVIEW_UPDATED_MESSAGE = "The review was updated successfully."
@@ -1,3 +1,1281 @@
-from django.test import TestCase
+import base64
+import io
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings, skipIfDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.test import APIClient
+
+from booking_app import locations
+from booking_app.cache import cache_stats
+from booking_app.error_messages import BOOKING_OCCUPIED_ERROR
+from booking_app.jobs import TASKS, run_jobs
+from booking_app.middleware import QueryCounter, query_stats, reset_query_stats
+from booking_app.models.booking_model import Booking
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.job_model import Job
+from booking_app.models.occupancy_model import HotelDailyOccupancy
+from booking_app.models.photo_blob_model import PhotoBlob
+from booking_app.models.review_model import Review
+from booking_app.models.room_hold_model import RoomHold
+from booking_app.models.room_lock_model import RoomLock, lock_rooms
+from booking_app.models.room_model import Room
+from booking_app.models.room_night_model import RoomNight
+from booking_app.models.user_model import User
+from booking_app.storage import ContentAddressedStorage, photo_storage
+from booking_app.views.export_view import ReviewExportView
+
+SMALL_DATASET = 3
+LARGE_DATASET = 30
+
+
+# Общая основа тестов API: клиент с аутентифицированным пользователем и набор данных, который растет вызовами
+# populate. Кэш ответов и выборочный подсчет запросов отключены: тесты проверяют работу представлений, а не
+# попадания в кэш. Тесты, которым нужен кэш, включают его сами.
+@override_settings(RESPONSE_CACHE_ENABLED=False, QUERY_STATS_SAMPLE_RATE=0.0)
+class BookingDataTestCase(TestCase):
+
+    # Загруженные в тестах фотографии сохраняются во временный каталог.
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root.name))
+        cls.addClassCleanup(cls.media_root.cleanup)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(AuthUser.objects.create(username='api_user'))
+        self.counter = 0
+
+    # Добавляет count отелей, у каждого из которых есть номер, бронирование, отзыв и пользователь. Кроме того,
+    # первый отель получает по дополнительному номеру и отзыву на каждый новый отель, чтобы с данными росли и
+    # списки номеров и отзывов одного отеля.
+    def populate(self, count):
+        for _ in range(count):
+            self.counter += 1
+            number = self.counter
+            hotel = Hotel.objects.create(name=f'Hotel {number}', location='Paris', description='Hotel',
+                                         photos='hotel.jpg', rating=4)
+            first_hotel = Hotel.objects.order_by('pk').first()
+            user = User.objects.create(username=f'user{number}', email=f'user{number}@mail.com', password='secret')
+            for room_hotel in (hotel, first_hotel):
+                room = Room.objects.create(hotel_id=room_hotel, room_type='economy', photos='room.jpg',
+                                           price_per_night=100)
+                Review.objects.create(user_id=user, hotel_id=room_hotel, comment='Nice', rating=4)
+            check_in_date = date(2030, 1, 1) + timedelta(days=number * 3)
+            Booking.objects.create(user_id=user, room_id=room, check_in_date=check_in_date,
+                                   check_out_date=check_in_date + timedelta(days=2))
+
+    # Запрашивает url с быстрой сериализацией и рендерингом (booking_app/fast_serialization.py) и без них,
+    # проверяет, что ответы совпадают байт в байт, и возвращает тело ответа.
+    def assertFastResponseMatches(self, url):
+        responses = []
+        for fast in (False, True):
+            with self.settings(FAST_SERIALIZATION_ENABLED=fast, FAST_JSON_RENDERER=fast):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            responses.append(b''.join(response.streaming_content) if response.streaming else response.content)
+        self.assertEqual(responses[0], responses[1])
+        return responses[1]
+
+    # Объект модели, с которым работает прогон run: в каждом прогоне берется свой объект.
+    @staticmethod
+    def first(model, run):
+        return model.objects.order_by('pk')[run]
+
+    # Фотография для полей ImageField, по умолчанию размером 1x1 пиксель.
+    @staticmethod
+    def photo(name, size=(1, 1)):
+        content = io.BytesIO()
+        Image.new('RGB', size).save(content, 'PNG')
+        return SimpleUploadedFile(name, content.getvalue(), content_type='image/png')
+
+
+# Тесты бюджета SQL-запросов. Каждый запрос к представлению выполняется дважды: на маленьком наборе данных и после
+# его увеличения в десять раз. В обоих случаях количество запросов должно совпасть с зафиксированным бюджетом, то
+# есть не расти вместе с данными (проблема N+1).
+class QueryBudgetTestCase(BookingDataTestCase):
+
+    # Выполняет запрос method к адресу url с данными data на двух размерах данных и проверяет, что количество
+    # SQL-запросов в обоих случаях равно budget. url и data могут быть функциями от номера прогона: они вызываются
+    # до начала подсчета запросов, поэтому поиск идентификаторов объектов в бюджет не входит.
+    def assertQueryBudget(self, budget, method, url, data=None, status_code=200, format=None):
+        for run, size in enumerate((SMALL_DATASET, LARGE_DATASET - SMALL_DATASET)):
+            self.populate(size)
+            request_url = url(run) if callable(url) else url
+            request_data = data(run) if callable(data) else data
+            with self.assertNumQueries(budget):
+                response = getattr(self.client, method)(request_url, request_data, format=format)
+            self.assertEqual(response.status_code, status_code, getattr(response, 'data', None))
+
+
+class HotelQueryBudgetTest(QueryBudgetTestCase):
+
+    def hotel_payload(self, run):
+        return {'name': f'New hotel {run}', 'location': 'Rome', 'description': 'New', 'rating': 5,
+                'photos': self.photo('hotel.png')}
+
+    def test_list(self):
+        self.assertQueryBudget(3, 'get', '/hotels/')
+
+    def test_retrieve(self):
+        self.assertQueryBudget(3, 'get', lambda run: f'/hotels/{self.first(Hotel, run).pk}/')
+
+    def test_create(self):
+        self.assertQueryBudget(8, 'post', '/hotels/', self.hotel_payload, status_code=201, format='multipart')
+
+    def test_update(self):
+        self.assertQueryBudget(9, 'put', lambda run: f'/hotels/{self.first(Hotel, run).pk}/', self.hotel_payload,
+                               format='multipart')
+
+    def test_delete(self):
+        self.assertQueryBudget(4, 'delete', lambda run: f'/hotels/{self.first(Hotel, run).pk}/')
+
+    def test_free_rooms(self):
+        self.assertQueryBudget(1, 'get', '/hotels/free_rooms/?check_in=2030-01-01&check_out=2030-03-01'
+                                         '&location=Paris&guests=1')
+
+    def test_reviews_by_hotel(self):
+        self.assertQueryBudget(3, 'get', lambda run: f'/hotels/{self.first(Hotel, run).pk}/reviews/')
+
+
+class RoomQueryBudgetTest(QueryBudgetTestCase):
+
+    def room_payload(self, run):
+        return {'hotel_id': self.first(Hotel, run).pk, 'room_type': 'deluxe', 'price_per_night': 200,
+                'photos': self.photo('room.png')}
+
+    def test_list(self):
+        self.assertQueryBudget(3, 'get', '/rooms/')
+
+    def test_list_by_hotel(self):
+        self.assertQueryBudget(3, 'get', lambda run: f'/rooms/?hotel_id={self.first(Hotel, run).pk}')
+
+    def test_list_filtered_by_price(self):
+        self.assertQueryBudget(3, 'get', '/rooms/?room_type=economy&min_price=50&max_price=150&sort=-price')
+
+    def test_list_with_facets(self):
+        self.assertQueryBudget(4, 'get', '/rooms/?room_type=deluxe&facets=true')
+
+    def test_retrieve(self):
+        self.assertQueryBudget(3, 'get', lambda run: f'/rooms/{self.first(Room, run).pk}/')
+
+    def test_create(self):
+        self.assertQueryBudget(7, 'post', '/rooms/', self.room_payload, status_code=201, format='multipart')
+
+    def test_update(self):
+        self.assertQueryBudget(9, 'put', lambda run: f'/rooms/{self.first(Room, run).pk}/', self.room_payload,
+                               format='multipart')
+
+    def test_delete(self):
+        self.assertQueryBudget(3, 'delete', lambda run: f'/rooms/{self.first(Room, run).pk}/')
+
+    def test_calendar_batch(self):
+        self.assertQueryBudget(2, 'get', lambda run: f'/rooms/calendar/?from=2030-01-01&to=2031-01-01&hotel_id='
+                                                     f'{Hotel.objects.order_by("pk").first().pk}')
+
+
+class BookingQueryBudgetTest(QueryBudgetTestCase):
+
+    def booking_payload(self, run):
+        return {'room_id': self.first(Room, run).pk, 'check_in_date': f'2031-0{run + 1}-01',
+                'check_out_date': f'2031-0{run + 1}-05'}
+
+    def bulk_payload(self, run):
+        return [{'room_id': room.pk, 'check_in_date': f'2032-0{run + 1}-01', 'check_out_date': f'2032-0{run + 1}-03'}
+                for room in Room.objects.order_by('pk')[:SMALL_DATASET]]
+
+    def test_list(self):
+        self.assertQueryBudget(3, 'get', '/bookings/')
+
+    def test_retrieve(self):
+        self.assertQueryBudget(3, 'get', lambda run: f'/bookings/{self.first(Booking, run).pk}/')
+
+    def test_create(self):
+        self.assertQueryBudget(11, 'post', '/bookings/', self.booking_payload, status_code=201, format='json')
+
+    def test_update(self):
+        self.assertQueryBudget(15, 'put', lambda run: f'/bookings/{self.first(Booking, run).pk}/',
+                               self.booking_payload, format='json')
+
+    def test_delete(self):
+        self.assertQueryBudget(5, 'delete', lambda run: f'/bookings/{self.first(Booking, run).pk}/')
+
+    def test_bulk_create(self):
+        self.assertQueryBudget(11, 'post', '/bookings/bulk/', self.bulk_payload, status_code=201, format='json')
+
+
+class ReviewQueryBudgetTest(QueryBudgetTestCase):
+
+    def review_payload(self, run):
+        return {'user_id': self.first(User, run).pk, 'hotel_id': self.first(Review, run).hotel_id_id,
+                'comment': f'Review {run}', 'rating': '3.5'}
+
+    def test_list(self):
+        self.assertQueryBudget(3, 'get', '/reviews/')
+
+    def test_retrieve(self):
+        self.assertQueryBudget(3, 'get', lambda run: f'/reviews/{self.first(Review, run).pk}/')
+
+    def test_create(self):
+        self.assertQueryBudget(7, 'post', '/reviews/', self.review_payload, status_code=201, format='json')
+
+    def test_update(self):
+        self.assertQueryBudget(9, 'put', lambda run: f'/reviews/{self.first(Review, run).pk}/', self.review_payload,
+                               format='json')
+
+    def test_delete(self):
+        self.assertQueryBudget(7, 'delete', lambda run: f'/reviews/{self.first(Review, run).pk}/')
+
+
+class UserQueryBudgetTest(QueryBudgetTestCase):
+
+    def user_payload(self, run):
+        return {'username': f'new{run}', 'email': f'new{run}@mail.com', 'password': 'secret'}
+
+    def test_list(self):
+        self.assertQueryBudget(3, 'get', '/users/')
+
+    def test_retrieve(self):
+        self.assertQueryBudget(3, 'get', lambda run: f'/users/{self.first(User, run).pk}/')
+
+    def test_create(self):
+        self.assertQueryBudget(5, 'post', '/users/', self.user_payload, status_code=201, format='json')
+
+    def test_update(self):
+        self.assertQueryBudget(6, 'put', lambda run: f'/users/{self.first(User, run).pk}/', self.user_payload,
+                               format='json')
+
+    def test_delete(self):
+        self.assertQueryBudget(4, 'delete', lambda run: f'/users/{self.first(User, run).pk}/')
+
+
+# Списки, сериализованные через values() и отрендеренные orjson, должны совпадать с выводом сериализаторов и
+# JSONRenderer DRF байт в байт.
+class FastSerializationTest(BookingDataTestCase):
+
+    def test_list_responses_match_drf(self):
+        self.populate(SMALL_DATASET)
+        Review.objects.update(comment='Отличный отель\u2028"без" ошибок\t')
+        hotel = Hotel.objects.order_by('pk').first()
+        urls = ['/hotels/', '/rooms/', f'/rooms/?hotel_id={hotel.pk}', '/bookings/', '/reviews/', '/users/',
+                f'/hotels/{hotel.pk}/reviews/', '/hotels/free_rooms/?check_in=2030-01-01&check_out=2030-03-01',
+                '/rooms/?page_size=2', '/reviews/export/', '/rooms/export/?format=csv']
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertFastResponseMatches(url)
+
+
+# Выгрузка читается из базы данных порциями и отдается потоком: пиковая память при чтении всей выгрузки не растет
+# вместе с таблицей.
+class ExportTest(BookingDataTestCase):
+
+    # Читает выгрузку целиком и возвращает ее размер в байтах, количество строк и пиковый объем памяти, выделенной за
+    # время чтения.
+    def stream(self, url):
+        size = lines = 0
+        tracemalloc.start()
+        try:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            for chunk in response.streaming_content:
+                size += len(chunk)
+                lines += chunk.count(b'\n')
+            return size, lines, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # Порции уменьшены, чтобы обе выгрузки состояли из многих порций.
+    @mock.patch.object(ReviewExportView, 'chunk_size', 50)
+    def test_memory_is_bounded(self):
+        self.populate(1)
+        hotel, user = Hotel.objects.order_by('pk').first(), User.objects.get()
+        peaks = {}
+        for count in (500, 5000):
+            Review.objects.bulk_create([Review(user_id=user, hotel_id=hotel, comment='Nice ' * 40, rating=4)
+                                        for _ in range(count - Review.all_objects.count())])
+            for fast in (False, True):
+                with self.settings(FAST_SERIALIZATION_ENABLED=fast):
+                    size, lines, peaks[count, fast] = self.stream('/reviews/export/')
+                self.assertEqual(lines, count)
+        for fast in (False, True):
+            with self.subTest(fast=fast):
+                self.assertLess(peaks[5000, fast], peaks[500, fast] * 1.5)
+                self.assertLess(peaks[5000, fast], size / 4)
+
+
+# Асинхронные представления (/async/...) должны отдавать те же ответы, что и синхронные представления DRF.
+# Запросы выполняются через AsyncClient, то есть через обработчик ASGI.
+class AsyncViewTest(BookingDataTestCase):
+
+    def test_responses_match_sync_views(self):
+        self.populate(SMALL_DATASET)
+        hotel = Hotel.objects.order_by('pk').first()
+        room = Room.objects.order_by('pk').first()
+        next_page = self.client.get('/rooms/?page_size=2').data['next'].replace('http://testserver', '')
+        urls = ['/hotels/', '/hotels/?page_size=2', f'/hotels/{hotel.pk}/', '/hotels/0/', '/rooms/', next_page,
+                f'/rooms/?hotel_id={hotel.pk}', '/rooms/?hotel_id=0', f'/rooms/{room.pk}/', '/rooms/0/',
+                '/hotels/free_rooms/?check_in=2030-01-01&check_out=2030-03-01&location=Paris&guests=1',
+                '/hotels/free_rooms/?check_in=2030-03-01&check_out=2030-01-01',
+                '/rooms/?room_type=economy&sort=-price&facets=true', '/rooms/?min_price=300&max_price=100']
+        async_client = AsyncClient()
+        async_client.force_login(AuthUser.objects.get(username='api_user'))
+        for url in urls:
+            with self.subTest(url=url):
+                expected = self.client.get(url)
+                response = async_to_sync(async_client.get)(f'/async{url}')
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content.replace(b'/async/', b'/'), expected.content)
+
+    def test_authentication(self):
+        self.populate(SMALL_DATASET)
+        room = Room.objects.order_by('pk').first()
+        anonymous = AsyncClient()
+        self.assertEqual(async_to_sync(anonymous.get)('/async/hotels/').status_code, 403)
+        self.assertEqual(async_to_sync(anonymous.get)(f'/async/rooms/{room.pk}/').status_code, 200)
+
+    # Асинхронные представления принимают те же способы аутентификации, что и синхронные, в том числе HTTP Basic.
+    def test_basic_authentication(self):
+        self.populate(SMALL_DATASET)
+        user = AuthUser.objects.create_user(username='basic_user', password='secret')
+        client = AsyncClient()
+        credentials = base64.b64encode(f'{user.username}:secret'.encode()).decode()
+        for url in ['/hotels/', '/rooms/']:
+            with self.subTest(url=url):
+                expected = APIClient().get(url, HTTP_AUTHORIZATION=f'Basic {credentials}')
+                response = async_to_sync(client.get)(f'/async{url}', headers={'Authorization': f'Basic {credentials}'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content.replace(b'/async/', b'/'), expected.content)
+
+        wrong = base64.b64encode(f'{user.username}:wrong'.encode()).decode()
+        expected = APIClient().get('/hotels/', HTTP_AUTHORIZATION=f'Basic {wrong}')
+        response = async_to_sync(client.get)('/async/hotels/', headers={'Authorization': f'Basic {wrong}'})
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+
+
+# Производные изображения загруженной фотографии строятся после фиксации транзакции (здесь - сразу, без фоновых
+# потоков) и отдаются в ответах ссылками.
+@override_settings(PHOTO_DERIVATIVE_WORKERS=0)
+class PhotoDerivativesTest(BookingDataTestCase):
+
+    def hotel_payload(self, photo):
+        return {'name': 'Photo hotel', 'location': 'Rome', 'description': 'New', 'rating': 5, 'photos': photo}
+
+    def test_uploaded_photo_gets_derivatives(self):
+        self.populate(SMALL_DATASET)
+        hotel = Hotel.objects.order_by('pk').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(f'/hotels/{hotel.pk}/', self.hotel_payload(self.photo('big.png', (1000, 500))),
+                                       format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+
+        hotel.refresh_from_db()
+        self.assertEqual(set(hotel.photo_derivatives), {'thumbnail', 'card', 'full'})
+        with photo_storage().open(hotel.photo_derivatives['thumbnail']['webp']) as file:
+            self.assertEqual(Image.open(file).size, (320, 160))
+        with photo_storage().open(hotel.photo_derivatives['full']['jpeg']) as file:
+            self.assertEqual(Image.open(file).size, (1000, 500))
+        data = self.client.get(f'/hotels/{hotel.pk}/').data
+        self.assertEqual(data['photo_derivatives']['card']['webp'],
+                         photo_storage().url(hotel.photo_derivatives['card']['webp']))
+
+        # Новая фотография сбрасывает производные прежней и ставит в очередь построение своих, а файлы прежней
+        # фотографии, на которые больше никто не ссылается, удаляются
+        old_files = {hotel.photos.name, *(name for formats in hotel.photo_derivatives.values()
+                                          for name in formats.values())}
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.put(f'/hotels/{hotel.pk}/', self.hotel_payload(self.photo('new.png')), format='multipart')
+        hotel.refresh_from_db()
+        self.assertEqual(hotel.photo_derivatives, {})
+        for callback in callbacks:
+            callback()
+        self.assertFalse(PhotoBlob.objects.filter(name__in=old_files).exists())
+        self.assertFalse(any(photo_storage().exists(name) for name in old_files))
+
+    def test_list_responses_match_drf(self):
+        self.populate(SMALL_DATASET)
+        derivatives = {'thumbnail': {'webp': 'derivatives/room_thumbnail.webp', 'jpeg': 'derivatives/room.jpg'}}
+        Hotel.objects.update(photo_derivatives=derivatives)
+        Room.objects.update(photo_derivatives=derivatives)
+        for url in ['/hotels/', '/rooms/', '/hotels/free_rooms/?check_in=2030-01-01&check_out=2030-03-01']:
+            with self.subTest(url=url):
+                self.assertIn(b'derivatives/room_thumbnail.webp', self.assertFastResponseMatches(url))
+
+    # Одинаковые загрузки хранятся одним файлом с именем по хэшу содержимого. Файл удаляется, когда на него не
+    # остается ссылок, в том числе после мягкого удаления и последующего физического удаления объектов.
+    def test_identical_uploads_share_one_file(self):
+        self.populate(SMALL_DATASET)
+        first, second = Hotel.objects.order_by('pk')[:2]
+        for hotel, name in ((first, 'one.png'), (second, 'two.png')):
+            payload = {**self.hotel_payload(self.photo(name, (4, 4))), 'name': name}
+            response = self.client.put(f'/hotels/{hotel.pk}/', payload, format='multipart')
+            self.assertEqual(response.status_code, 200, response.data)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.photos.name, second.photos.name)
+        self.assertRegex(first.photos.name, r'^photos/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(PhotoBlob.objects.get(name=first.photos.name).ref_count, 2)
+
+        self.client.delete(f'/hotels/{first.pk}/')
+        self.assertEqual(PhotoBlob.objects.get(name=first.photos.name).ref_count, 2)
+        first.delete()
+        self.assertEqual(PhotoBlob.objects.get(name=first.photos.name).ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(PhotoBlob.objects.filter(name=first.photos.name).exists())
+        self.assertFalse(photo_storage().exists(first.photos.name))
+
+    # Освобожденный файл удаляется после фиксации освободившей его транзакции. Если тот же файл в это время
+    # загружают снова, хранилище находит его и не записывает заново, а ссылка появляется только в post_save: удаление
+    # между ними не должно оставить объект без файла.
+    def test_release_during_identical_upload(self):
+        self.populate(SMALL_DATASET)
+        first, second = Hotel.objects.order_by('pk')[:2]
+        self.client.put(f'/hotels/{first.pk}/', self.hotel_payload(self.photo('one.png', (4, 4))), format='multipart')
+        first.refresh_from_db()
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+
+        save = ContentAddressedStorage._save
+
+        def save_and_delete_orphans(storage, name, content):
+            name = save(storage, name, content)
+            for callback in callbacks:
+                callback()
+            return name
+
+        with mock.patch.object(ContentAddressedStorage, '_save', save_and_delete_orphans):
+            response = self.client.put(f'/hotels/{second.pk}/', self.hotel_payload(self.photo('two.png', (4, 4))),
+                                       format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        second.refresh_from_db()
+        self.assertEqual(second.photos.name, first.photos.name)
+        self.assertEqual(PhotoBlob.objects.get(name=second.photos.name).ref_count, 1)
+        self.assertTrue(photo_storage().exists(second.photos.name))
+
+
+# Удаление через API мягкое: строка остается в базе данных, но пропадает из списков, а занятые ночи и статистика
+# отзывов обновляются так же, как при физическом удалении.
+class SoftDeleteTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+
+    def test_deleted_booking_releases_nights(self):
+        booking = Booking.objects.order_by('pk').first()
+        self.assertEqual(self.client.delete(f'/bookings/{booking.pk}/').status_code, 200)
+
+        self.assertFalse(Booking.objects.filter(pk=booking.pk).exists())
+        self.assertTrue(Booking.all_objects.get(pk=booking.pk).deleted)
+        self.assertFalse(RoomNight.objects.filter(booking_id=booking.pk).exists())
+        self.assertEqual(self.client.get(f'/bookings/{booking.pk}/').status_code, 404)
+        response = self.client.post('/bookings/', {'room_id': booking.room_id_id,
+                                                   'check_in_date': booking.check_in_date,
+                                                   'check_out_date': booking.check_out_date}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_deleted_hotel_hides_its_rooms(self):
+        hotel = Hotel.objects.order_by('pk').last()
+        room_ids = set(Room.objects.filter(hotel_id=hotel).values_list('pk', flat=True))
+        self.assertEqual(self.client.delete(f'/hotels/{hotel.pk}/').status_code, 200)
+
+        listed = {room['room_id'] for room in self.client.get('/rooms/?page_size=100').data['results']}
+        self.assertFalse(room_ids & listed)
+        self.assertEqual(Room.all_objects.filter(pk__in=room_ids, deleted=True).count(), len(room_ids))
+        free_rooms = self.client.get('/hotels/free_rooms/?check_in=2040-01-01&check_out=2040-01-02')
+        self.assertFalse(room_ids & {room['room_id'] for room in free_rooms.data['results']})
+
+    def test_deleted_review_leaves_hotel_rating(self):
+        review = Review.objects.order_by('pk').first()
+        hotel = review.hotel_id
+        self.assertEqual(self.client.delete(f'/reviews/{review.pk}/').status_code, 200)
+
+        hotel.refresh_from_db()
+        self.assertEqual(hotel.review_count, Review.objects.filter(hotel_id=hotel).count())
+        self.assertIn(review.pk, Review.all_objects.values_list('pk', flat=True))
+
+
+# Статистика отзывов отелей обновляется сигналами по изменениям отдельных отзывов и после каждого изменения должна
+# совпадать с полным пересчетом по таблице отзывов.
+class RatingStatsTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+        self.hotel, self.other_hotel = Hotel.objects.order_by('pk')[:2]
+        self.user = User.objects.order_by('pk').first()
+
+    @staticmethod
+    def stats():
+        return {hotel.pk: (hotel.review_count, hotel.rating_sum, hotel.rating_avg, hotel.rating_histogram)
+                for hotel in Hotel.all_objects.all()}
+
+    def assertStatsMatchRecompute(self):
+        stats = self.stats()
+        self.assertEqual(Hotel.objects.recompute_ratings(), [])
+        self.assertEqual(self.stats(), stats)
+        return stats
+
+    def test_review_changes(self):
+        before = self.assertStatsMatchRecompute()
+        review = {'user_id': self.user.pk, 'hotel_id': self.hotel.pk, 'comment': 'Fine', 'rating': '3.5'}
+        response = self.client.post('/reviews/', review, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        review_id = response.data['data']['review_id']
+        stats = self.assertStatsMatchRecompute()
+        self.assertEqual(stats[self.hotel.pk][0], before[self.hotel.pk][0] + 1)
+        self.assertEqual(stats[self.hotel.pk][3].get('3'), 1)
+
+        # Изменение оценки и перенос отзыва в другой отель
+        response = self.client.put(f'/reviews/{review_id}/', {**review, 'rating': '1.5'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertStatsMatchRecompute()
+        response = self.client.put(f'/reviews/{review_id}/', {**review, 'hotel_id': self.other_hotel.pk},
+                                   format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        stats = self.assertStatsMatchRecompute()
+        self.assertEqual(stats[self.hotel.pk], before[self.hotel.pk])
+
+        self.assertEqual(self.client.delete(f'/reviews/{review_id}/').status_code, 200)
+        self.assertEqual(self.assertStatsMatchRecompute(), before)
+        Review.all_objects.get(pk=review_id).delete()
+        self.assertEqual(self.assertStatsMatchRecompute(), before)
+
+        Review.objects.filter(hotel_id=self.hotel).order_by('pk').first().delete()
+        stats = self.assertStatsMatchRecompute()
+        self.assertEqual(stats[self.hotel.pk][0], before[self.hotel.pk][0] - 1)
+
+
+# Подсчет SQL-запросов QueryStatsMiddleware: заголовки ответа, доля измеряемых запросов и накопленная статистика по
+# представлениям.
+@override_settings(QUERY_STATS_SAMPLE_RATE=1.0)
+class QueryStatsTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+        self.hotel = Hotel.objects.order_by('pk').first()
+
+    def test_headers(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/hotels/')
+        self.assertEqual(response['X-DB-Query-Count'], str(len(queries)))
+        self.assertGreaterEqual(float(response['X-DB-Time-ms']), 0)
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+
+    # Запросы, которые отличаются только значениями параметров и длиной списков IN, считаются повторами.
+    def test_duplicates(self):
+        counter = QueryCounter()
+        for sql in ('SELECT * FROM room WHERE id = 1', 'SELECT * FROM room WHERE id = 2',
+                    'SELECT * FROM room WHERE id IN (%s, %s)', 'SELECT * FROM room WHERE id IN (%s, %s, %s)',
+                    'SELECT * FROM hotel WHERE id = %s'):
+            counter(lambda *args: None, sql, (), False, {})
+        self.assertEqual((counter.count, counter.duplicates()), (5, 2))
+        self.assertEqual(counter.most_repeated()[1], 2)
+
+    def test_sampling(self):
+        for rate, sampled in ((0.0, False), (0.5, False), (0.6, True), (1.0, True)):
+            with self.subTest(rate=rate), self.settings(QUERY_STATS_SAMPLE_RATE=rate), \
+                    mock.patch('booking_app.middleware.random.random', return_value=0.5):
+                self.assertEqual('X-DB-Query-Count' in self.client.get('/hotels/'), sampled)
+
+    def test_view_stats(self):
+        reset_query_stats()
+        counts = [int(self.client.get(url)['X-DB-Query-Count'])
+                  for url in ('/hotels/', '/hotels/', f'/hotels/{self.hotel.pk}/')]
+        stats = query_stats()
+        self.assertEqual(set(stats), {'GET hotels/', 'GET hotels/<int:hotel_id>/'})
+        self.assertEqual(stats['GET hotels/']['requests'], 2)
+        self.assertEqual(stats['GET hotels/']['avg_queries'], (counts[0] + counts[1]) / 2)
+        self.assertEqual(stats['GET hotels/<int:hotel_id>/']['avg_queries'], counts[2])
+
+        reset_query_stats()
+        self.assertEqual(query_stats(), {})
+
+    # Потоковые ответы читают строки уже после middleware, поэтому не измеряются.
+    def test_streaming_response_is_skipped(self):
+        reset_query_stats()
+        response = self.client.get('/reviews/export/')
+        self.assertTrue(response.streaming)
+        self.assertNotIn('X-DB-Query-Count', response)
+        self.assertEqual(query_stats(), {})
+
+
+# Кэш ответов (booking_app/cache.py): повторный GET отдается из кэша без запросов к базе данных, а изменение отеля
+# или номера увеличивает поколение его областей, и следующий GET строит ответ заново. Ответы других областей
+# остаются в кэше.
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+        self.hotel = Hotel.objects.order_by('pk').first()
+        self.room = Room.objects.filter(hotel_id=self.hotel).order_by('pk').first()
+        self.urls = ['/hotels/', f'/hotels/{self.hotel.pk}/', '/rooms/', f'/rooms/?hotel_id={self.hotel.pk}',
+                     f'/rooms/{self.room.pk}/']
+
+    # Запрашивает адреса и возвращает значения заголовка X-Cache по адресам.
+    def cache_states(self):
+        return {url: self.client.get(url)['X-Cache'] for url in self.urls}
+
+    def test_hit(self):
+        self.assertEqual(set(self.cache_states().values()), {'MISS'})
+        for url in self.urls:
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(cache_stats()['hits'], len(self.urls))
+
+    def test_hotel_write(self):
+        self.cache_states()
+        response = self.client.patch(f'/hotels/{self.hotel.pk}/', {'description': 'Renovated'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.cache_states(), {
+            '/hotels/': 'MISS', f'/hotels/{self.hotel.pk}/': 'MISS', '/rooms/': 'HIT',
+            f'/rooms/?hotel_id={self.hotel.pk}': 'HIT', f'/rooms/{self.room.pk}/': 'HIT',
+        })
+        self.assertEqual(self.client.get(f'/hotels/{self.hotel.pk}/').data['description'], 'Renovated')
+
+    def test_room_write(self):
+        self.cache_states()
+        self.room.price_per_night = 150
+        self.room.save()
+        self.assertEqual(self.cache_states(), {
+            '/hotels/': 'HIT', f'/hotels/{self.hotel.pk}/': 'HIT', '/rooms/': 'MISS',
+            f'/rooms/?hotel_id={self.hotel.pk}': 'MISS', f'/rooms/{self.room.pk}/': 'MISS',
+        })
+        self.assertEqual(self.client.get(f'/rooms/{self.room.pk}/').data['price_per_night'], '150.00')
+
+
+# Условные GET-запросы (booking_app/conditional.py): валидаторы ответа, 304 Not Modified и смена ETag после записи.
+class ConditionalGetTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+
+    def test_validators(self):
+        response = self.client.get('/reviews/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        last_modified = Review.objects.order_by('-updated_at').first().updated_at
+        self.assertEqual(response['Last-Modified'], http_date(int(last_modified.timestamp())))
+
+    def test_not_modified(self):
+        response = self.client.get('/reviews/')
+        for headers in ({'HTTP_IF_NONE_MATCH': response['ETag']},
+                        {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']}):
+            with self.assertNumQueries(2):
+                not_modified = self.client.get('/reviews/', **headers)
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+            self.assertFalse(not_modified.content)
+
+    def test_write_changes_etag(self):
+        review = Review.objects.order_by('pk').first()
+        url = f'/hotels/{review.hotel_id_id}/'
+        etags = [self.client.get(url)['ETag']]
+        self.client.patch(url, {'description': 'Renovated'}, format='json')
+        etags.append(self.client.get(url)['ETag'])
+        self.assertNotEqual(etags[0], etags[1])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['description'], 'Renovated')
+
+        # Мягкое удаление меняет updated_at, физическое удаление старой строки - только количество строк.
+        etags = [self.client.get('/reviews/')['ETag']]
+        self.client.delete(f'/reviews/{review.pk}/')
+        etags.append(self.client.get('/reviews/')['ETag'])
+        Review.objects.order_by('pk').first().delete()
+        etags.append(self.client.get('/reviews/')['ETag'])
+        self.assertEqual(len(set(etags)), 3)
+
+
+# Фильтры, сортировка по цене и фасеты списка номеров.
+class RoomFilterTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+        hotel = Hotel.objects.order_by('pk').first()
+        for room_type, price in [('deluxe', 150), ('deluxe', 250), ('luxury', 600), ('luxury', 150), ('economy', 60)]:
+            Room.objects.create(hotel_id=hotel, room_type=room_type, photos='room.jpg', price_per_night=price)
+
+    # Все страницы списка: ссылки next проходятся до конца.
+    def all_pages(self, url):
+        rooms = []
+        while url:
+            data = self.client.get(url).data
+            rooms += data['results']
+            url = data['next']
+        return rooms
+
+    def test_filters(self):
+        rooms = self.all_pages('/rooms/?room_type=deluxe&room_type=luxury&max_price=300')
+        self.assertEqual(sorted((room['room_type'], room['price_per_night']) for room in rooms),
+                         [('deluxe', '150.00'), ('deluxe', '250.00'), ('luxury', '150.00')])
+        self.assertEqual(self.client.get('/rooms/?room_type=suite').status_code, 400)
+        self.assertEqual(self.client.get('/rooms/?min_price=300&max_price=100').status_code, 400)
+
+    def test_sort_by_price_pages(self):
+        expected = list(Room.objects.order_by('price_per_night', 'room_id').values_list('pk', flat=True))
+        for sort, order in (('price', expected), ('-price', expected[::-1])):
+            with self.subTest(sort=sort):
+                rooms = self.all_pages(f'/rooms/?sort={sort}&page_size=2')
+                self.assertEqual([room['room_id'] for room in rooms], order)
+
+        # Ссылка previous возвращает к той же странице
+        second = self.client.get(self.client.get('/rooms/?sort=price&page_size=2').data['next']).data
+        first = self.client.get(second['previous']).data
+        self.assertEqual([room['room_id'] for room in first['results']], expected[:2])
+
+    # Счетчики типов не учитывают фильтр по типу, счетчики цены - фильтр по цене.
+    def test_facets(self):
+        data = self.client.get('/rooms/?room_type=luxury&max_price=200&facets=true').data
+        self.assertEqual([room['price_per_night'] for room in data['results']], ['150.00'])
+        economy = Room.objects.filter(room_type='economy').count()
+        self.assertEqual(data['facets']['room_type'], {'economy': economy, 'deluxe': 1, 'luxury': 1})
+        self.assertEqual(data['facets']['price'], [{'min': 0, 'max': 100, 'count': 0},
+                                                   {'min': 100, 'max': 200, 'count': 1},
+                                                   {'min': 200, 'max': 500, 'count': 0},
+                                                   {'min': 500, 'max': None, 'count': 1}])
+        response = self.client.get('/rooms/?room_type=luxury&min_price=900&facets=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+# Миграция 0016 приводит старые написания типов номеров к значениям RoomType и не пропускает неизвестные.
+class RoomTypeMigrationTest(BookingDataTestCase):
+
+    def test_normalize_room_types(self):
+        migration = import_module('booking_app.migrations.0016_room_type_choices_and_price_indexes')
+        self.populate(SMALL_DATASET)
+        rooms = list(Room.objects.order_by('pk')[:5])
+        legacy = [' Econom ', 'DE-LUXE', 'Suite', 'luxury', 'cabin']
+        for room, room_type in zip(rooms, legacy):
+            Room.all_objects.filter(pk=room.pk).update(room_type=room_type)
+        rooms[1].soft_delete()
+
+        with self.assertRaisesMessage(ValueError, "'cabin' (1 rooms)"):
+            migration.normalize_room_types(django_apps, None)
+        Room.all_objects.filter(room_type='cabin').update(room_type='economy')
+        migration.normalize_room_types(django_apps, None)
+        self.assertEqual(list(Room.all_objects.filter(pk__in=[room.pk for room in rooms]).order_by('pk')
+                              .values_list('room_type', flat=True)),
+                         ['economy', 'deluxe', 'luxury', 'luxury', 'economy'])
+
+
+# Сводная таблица занятости обновляется вместе с бронированиями и совпадает с результатом полного пересчета, а
+# отчет /analytics/occupancy/ строится по ней.
+class OccupancyAnalyticsTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(AuthUser.objects.create(username='manager', is_staff=True))
+        self.populate(SMALL_DATASET)
+
+    def rollup(self):
+        return sorted(HotelDailyOccupancy.objects.filter(rooms_booked__gt=0)
+                      .values_list('hotel_id', 'date', 'rooms_booked', 'revenue'))
+
+    def test_rollup_follows_bookings(self):
+        booking = Booking.objects.order_by('pk').first()
+        self.client.put(f'/bookings/{booking.pk}/', {'room_id': booking.room_id_id, 'check_in_date': '2030-06-01',
+                                                     'check_out_date': '2030-06-04'}, format='json')
+        self.client.delete(f'/bookings/{Booking.objects.order_by("pk").last().pk}/')
+        Booking.objects.order_by('pk')[1].delete()
+        incremental = self.rollup()
+
+        call_command('rebuild_occupancy', stdout=io.StringIO())
+        self.assertEqual(incremental, self.rollup())
+        self.assertIn((booking.room_id.hotel_id_id, date(2030, 6, 3), 1, 100), incremental)
+
+    # Освобожденные ночи вычитаются по отелю и цене на момент бронирования, даже если номер потом перенесли в
+    # другой отель и изменили его цену.
+    def test_rollup_survives_room_changes(self):
+        first, second = Hotel.objects.order_by('pk')[:2]
+        moved, other = Room.objects.filter(hotel_id=first).order_by('pk')[:2]
+        dates = {'check_in_date': '2031-05-01', 'check_out_date': '2031-05-03'}
+        for room in (moved, other):
+            response = self.client.post('/bookings/', {'room_id': room.pk, **dates}, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+        moved.hotel_id = second
+        moved.price_per_night = 250
+        moved.save()
+        other.price_per_night = 80
+        other.save()
+        booking = Booking.objects.get(room_id=moved, check_in_date='2031-05-01')
+        self.assertEqual(self.client.delete(f'/bookings/{booking.pk}/').status_code, 200)
+
+        incremental = self.rollup()
+        self.assertIn((first.pk, date(2031, 5, 1), 1, 100), incremental)
+        self.assertFalse(HotelDailyOccupancy.objects.filter(hotel_id=second, date=date(2031, 5, 1)).exists())
+        call_command('rebuild_occupancy', stdout=io.StringIO())
+        self.assertEqual(incremental, self.rollup())
+
+    def test_report(self):
+        hotel = Hotel.objects.order_by('pk').first()
+        url = f'/analytics/occupancy/?date_from=2030-01-01&date_to=2030-02-01&period=week&hotel_id={hotel.pk}'
+        with self.assertNumQueries(3):
+            data = self.client.get(url).data
+        rooms = Room.objects.filter(hotel_id=hotel).count()
+        nights = RoomNight.objects.filter(room_id__hotel_id=hotel, night__lt=date(2030, 2, 1)).count()
+        self.assertEqual(data['rooms'], rooms)
+        self.assertEqual(data['results'][0]['start'], '2030-01-01')
+        self.assertEqual(data['results'][-1]['end'], '2030-02-01')
+        self.assertEqual(data['total']['rooms_booked'], nights)
+        self.assertEqual(data['total']['room_nights'], rooms * 31)
+        self.assertEqual(data['total']['revenue'], f'{nights * 100}.00')
+
+        self.assertEqual(self.client.get('/analytics/occupancy/?date_from=2030-02-01&date_to=2030-01-01').status_code,
+                         400)
+        self.client.force_authenticate(AuthUser.objects.get(username='api_user'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+# Календарь занятости номеров совпадает с индексом занятых ночей в обоих способах кодирования.
+class RoomCalendarTest(BookingDataTestCase):
+
+    def test_calendar_matches_nights(self):
+        self.populate(SMALL_DATASET)
+        booking = Booking.objects.order_by('pk').first()
+        booking.check_out_date = booking.check_in_date + timedelta(days=10)
+        booking.save()
+        date_from, days = date(2030, 1, 2), 20
+        for room in Room.objects.all():
+            nights = set(RoomNight.objects.filter(room_id=room).values_list('night', flat=True))
+            expected = [date_from + timedelta(days=day) in nights for day in range(days)]
+
+            data = self.client.get(f'/rooms/{room.pk}/calendar/?from=2030-01-02&to=2030-01-22').data
+            bits = int.from_bytes(base64.b64decode(data['busy']), 'little')
+            self.assertEqual([bool(bits >> day & 1) for day in range(days)], expected)
+
+            data = self.client.get(f'/rooms/{room.pk}/calendar/?from=2030-01-02&to=2030-01-22&encoding=rle').data
+            decoded = []
+            for index, run in enumerate(data['busy']):
+                decoded += [index % 2 == 1] * run
+            self.assertEqual(decoded, expected)
+
+        room_ids = list(Room.objects.order_by('pk').values_list('pk', flat=True)[:2])
+        data = self.client.get('/rooms/calendar/', {'room_id': room_ids, 'from': '2030-01-02', 'to': '2030-01-22'}).data
+        self.assertEqual([room['room_id'] for room in data['rooms']], room_ids)
+        self.assertEqual(self.client.get('/rooms/calendar/').status_code, 400)
+        self.assertEqual(self.client.get(f'/rooms/{room_ids[0]}/calendar/?from=2030-01-02&to=2030-01-01').status_code,
+                         400)
+
+
+# Поиск /search/ идет по индексу полнотекстового поиска, который база данных поддерживает сама при изменении
+# отелей и отзывов.
+class SearchTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.hotel = Hotel.objects.create(name='Seaside Palace', location='Nice', description='Quiet beach resort',
+                                          photos='hotel.jpg', rating=4)
+        user = User.objects.create(username='guest', email='guest@mail.com', password='secret')
+        self.review = Review.objects.create(user_id=user, hotel_id=self.hotel, comment='Lovely sea view', rating=5)
+
+    def results(self, query):
+        response = self.client.get('/search/', {'q': query})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(result['type'], result['hotel_id'], result['review_id']) for result in response.data['results']]
+
+    def test_search(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/search/', {'q': 'BEACH resort!'})
+        self.assertEqual(response.data['results'][0]['snippet'], 'Quiet [beach] [resort]')
+        self.assertEqual(self.results('palace'), [('hotel', self.hotel.pk, None)])
+        self.assertEqual(self.results('sea view'), [('review', self.hotel.pk, self.review.pk)])
+        self.assertEqual(self.results('sea resort'), [])
+        self.assertEqual(self.client.get('/search/', {'q': '"*"'}).status_code, 400)
+
+    def test_index_follows_writes(self):
+        self.review.comment = 'Noisy street'
+        self.review.save()
+        self.assertEqual(self.results('view'), [])
+        self.assertEqual(self.results('noisy'), [('review', self.hotel.pk, self.review.pk)])
+
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.results('noisy'), [('review', self.hotel.pk, self.review.pk)])
+
+        self.hotel.soft_delete()
+        self.assertEqual(self.results('noisy palace'), [])
+        self.review.delete()
+        Hotel.all_objects.filter(pk=self.hotel.pk).delete()
+        self.assertEqual(self.results('noisy'), [])
+
+    # Поиск в административной панели фильтрует отели подзапросом к индексу в том же запросе.
+    def test_admin_search(self):
+        hotel_admin = admin.site._registry[Hotel]
+        self.hotel.soft_delete()
+        queryset, _ = hotel_admin.get_search_results(None, Hotel.all_objects.all(), 'seaside PALACE')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(list(queryset), [self.hotel])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('booking_app_hotel_search', queries[0]['sql'])
+        self.assertEqual(list(hotel_admin.get_search_results(None, Hotel.all_objects.all(), 'palace resort')[0]),
+                         [self.hotel])
+        self.assertFalse(hotel_admin.get_search_results(None, Hotel.all_objects.all(), 'sea view')[0].exists())
+        self.assertFalse(hotel_admin.get_search_results(None, Hotel.all_objects.all(), '"*"')[0].exists())
+
+
+# Подсказки расположения отдаются из индекса в памяти: к базе данных обращается только первый запрос, а изменения
+# отелей попадают в подсказки после фиксации транзакции.
+class LocationSuggestTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for number, location in enumerate(['Paris', 'Paris', 'paris ', 'Parma', 'Berlin']):
+            Hotel.objects.create(name=f'Hotel {number}', location=location, description='Hotel', photos='hotel.jpg',
+                                 rating=4)
+        self.client = APIClient()
+
+    def suggest(self, prefix):
+        response = self.client.get('/hotels/locations/suggest/', {'prefix': prefix})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(result['location'], result['hotel_count']) for result in response.data['results']]
+
+    def test_suggest(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.suggest('PA'), [('Paris', 3), ('Parma', 1)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('parm'), [('Parma', 1)])
+            self.assertEqual(self.suggest('x'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Hotel.objects.create(name='Hotel 5', location='Parma', description='Hotel', photos='hotel.jpg', rating=4)
+            Hotel.objects.filter(location='Berlin').get().soft_delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('par'), [('Paris', 3), ('Parma', 2)])
+            self.assertEqual(self.suggest('b'), [])
+
+    # Новый процесс строит индекс из списка в общем кэше, уже с изменениями отелей.
+    def test_new_process_index(self):
+        self.assertEqual(self.suggest('parm'), [('Parma', 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            Hotel.objects.create(name='Hotel 5', location='Parma', description='Hotel', photos='hotel.jpg', rating=4)
+        locations._index = None
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('parm'), [('Parma', 2)])
+
+    # С кэшем в памяти процесса отель, измененный в другом процессе, не обновляет список этого процесса: изменение
+    # становится видно по истечении срока списка в кэше.
+    def test_change_in_other_process(self):
+        self.assertEqual(self.suggest('parm'), [('Parma', 1)])
+        with self.captureOnCommitCallbacks(execute=False):
+            Hotel.objects.create(name='Hotel 5', location='Parma', description='Hotel', photos='hotel.jpg', rating=4)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('parm'), [('Parma', 1)])
+        with mock.patch('time.time', return_value=time.time() + settings.LOCATION_SUGGEST_TIMEOUT + 1):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.suggest('parm'), [('Parma', 2)])
+
+
+# Массовое создание бронирований: пересечения внутри пачки и с уже существующими бронированиями, ограничение размера
+# пачки и результат для каждого элемента по его индексу.
+class BulkBookingTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+        self.booking = Booking.objects.order_by('pk').first()
+        self.room = self.booking.room_id
+        self.user = User.objects.order_by('pk').first()
+
+    def item(self, check_in_date, check_out_date, **data):
+        return {'user_id': self.user.pk, 'room_id': self.room.pk, 'check_in_date': check_in_date,
+                'check_out_date': check_out_date, **data}
+
+    def test_results_by_index(self):
+        existing = self.booking.check_in_date
+        response = self.client.post('/bookings/bulk/', [
+            self.item('2031-05-03', '2031-05-05'),
+            self.item('2031-05-01', '2031-05-04'),
+            self.item('2031-05-05', '2031-05-06'),
+            self.item(existing, existing + timedelta(days=1)),
+            self.item('2031-05-10', '2031-05-09'),
+            self.item('2031-05-02', '2031-05-03'),
+        ], format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        results = response.data['data']
+        self.assertEqual([result['index'] for result in results], list(range(6)))
+        # Из пересекающихся бронирований пачки принимается то, у которого заезд раньше
+        self.assertEqual([result['status'] for result in results],
+                         ['rejected', 'created', 'created', 'rejected', 'rejected', 'rejected'])
+        for result in results:
+            self.assertEqual(set(result), {'index', 'status', 'data' if result['status'] == 'created' else 'errors'})
+        self.assertEqual(results[1]['data']['check_in_date'], '2031-05-01')
+        self.assertIn('non_field_errors', results[3]['errors'])
+        created = Booking.objects.filter(room_id=self.room, check_in_date__gte='2031-05-01')
+        self.assertEqual(sorted(booking.pk for booking in created),
+                         [results[1]['data']['booking_id'], results[2]['data']['booking_id']])
+        self.assertEqual(RoomNight.objects.filter(booking_id__in=created).count(), 4)
+
+    def test_all_rejected(self):
+        response = self.client.post('/bookings/bulk/', [
+            self.item(self.booking.check_in_date, self.booking.check_out_date),
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['data'][0]['status'], 'rejected')
+
+    @override_settings(BOOKING_BULK_MAX_ITEMS=2)
+    def test_batch_size_limit(self):
+        items = [self.item(f'2031-06-0{day}', f'2031-06-0{day + 1}') for day in range(1, 4)]
+        for data in (items, [], items[0]):
+            with self.subTest(data=data):
+                self.assertEqual(self.client.post('/bookings/bulk/', data, format='json').status_code, 400)
+        self.assertFalse(Booking.objects.filter(check_in_date__gte='2031-06-01').exists())
+        self.assertEqual(self.client.post('/bookings/bulk/', items[:2], format='json').status_code, 201)
+
+
+# Бронирования одного номера выполняются по очереди под блокировкой номера, а уникальный индекс занятых ночей
+# отклоняет бронирование, если проверка доступности все же пропустила занятую ночь.
+class BookingLockTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+        self.booking = Booking.objects.order_by('pk').first()
+
+    # Проверка доступности считает номер свободным, как если бы пересекающееся бронирование зафиксировала
+    # параллельная транзакция уже после проверки.
+    @mock.patch.object(RoomNight.objects, 'is_free', return_value=True)
+    def test_unique_night_rejects_booking(self, is_free):
+        other = Booking.objects.exclude(room_id=self.booking.room_id).order_by('pk').first()
+        data = {'user_id': self.booking.user_id_id, 'room_id': self.booking.room_id_id,
+                'check_in_date': self.booking.check_in_date, 'check_out_date': self.booking.check_out_date}
+        for method, url in (('post', '/bookings/'), ('put', f'/bookings/{other.pk}/')):
+            with self.subTest(method=method):
+                response = getattr(self.client, method)(url, data, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, [BOOKING_OCCUPIED_ERROR])
+        self.assertTrue(is_free.called)
+        self.assertEqual(Booking.objects.filter(room_id=self.booking.room_id).count(), 1)
+        other.refresh_from_db()
+        self.assertEqual(RoomNight.objects.filter(booking_id=other).count(),
+                         (other.check_out_date - other.check_in_date).days)
+
+    # На SQLite номера блокируются записью в RoomLock: строка номера создается при первой блокировке и обновляется
+    # при следующих.
+    @skipIfDBFeature('has_select_for_update')
+    def test_room_lock_upsert(self):
+        first, second = Room.objects.order_by('pk')[:2]
+        with transaction.atomic():
+            lock_rooms([second.pk, first.pk, first.pk])
+        self.assertEqual(set(RoomLock.objects.values_list('room_id', flat=True)), {first.pk, second.pk})
+
+        locked_at = timezone.now() - timedelta(days=1)
+        RoomLock.objects.update(locked_at=locked_at)
+        with transaction.atomic():
+            lock_rooms([first.pk])
+        self.assertEqual(RoomLock.objects.count(), 2)
+        self.assertGreater(RoomLock.objects.get(room_id=first).locked_at, locked_at)
+        self.assertEqual(RoomLock.objects.get(room_id=second).locked_at, locked_at)
+
+        self.client.post('/bookings/', {'user_id': self.booking.user_id_id, 'room_id': second.pk,
+                                        'check_in_date': '2031-07-01', 'check_out_date': '2031-07-02'}, format='json')
+        self.assertGreater(RoomLock.objects.get(room_id=second).locked_at, locked_at)
+
+
+# Параллельные пересекающиеся бронирования одного номера из нескольких потоков, каждый со своим соединением с
+# базой данных: блокировка номера (lock_rooms) пропускает их по очереди, поэтому принимается ровно одно, остальные
+# получают 400, и ни одна ночь не занята дважды. Данные должны быть зафиксированы, чтобы их видели потоки.
+# Производные фотографий тестовых объектов ставятся в очередь задач, чтобы фоновые потоки не писали в базу данных
+# параллельно с тестом.
+@override_settings(PHOTO_DERIVATIVE_JOBS=True)
+class ConcurrentBookingTest(TransactionTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        hotel = Hotel.objects.create(name='Concurrent', location='Oslo', description='Test', photos='hotel.jpg',
+                                     rating=3)
+        self.room = Room.objects.create(hotel_id=hotel, room_type='economy', photos='room.jpg', price_per_night=100)
+        self.user = User.objects.create(username='guest', email='guest@mail.com', password='secret')
+        self.auth_user = AuthUser.objects.create(username='api_user')
+
+    def post_booking(self, barrier, index, results):
+        client = APIClient()
+        client.force_authenticate(self.auth_user)
+        check_in_date = date(2031, 5, 1) + timedelta(days=index % 3)
+        data = {'user_id': self.user.pk, 'room_id': self.room.pk, 'check_in_date': check_in_date,
+                'check_out_date': check_in_date + timedelta(days=3)}
+        try:
+            barrier.wait()
+            results[index] = client.post('/bookings/', data, format='json').status_code
+        except Exception as exc:
+            results[index] = exc
+        finally:
+            connection.close()
+
+    def test_one_of_overlapping_bookings_succeeds(self):
+        barrier = threading.Barrier(self.THREADS)
+        results = [None] * self.THREADS
+        threads = [threading.Thread(target=self.post_booking, args=(barrier, index, results))
+                   for index in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results, key=str), [201] + [400] * (self.THREADS - 1))
+        booking = Booking.objects.get(room_id=self.room)
+        nights = list(RoomNight.objects.filter(room_id=self.room).values_list('night', flat=True))
+        self.assertEqual(len(nights), len(set(nights)))
+        self.assertEqual(len(nights), (booking.check_out_date - booking.check_in_date).days)
+
+
+# Удержание номера не дает другим бронировать и удерживать его на эти даты, не мешает бронированию со своим
+# токеном и перестает действовать по истечении срока; просроченные удержания удаляет sweep_holds.
+class RoomHoldTest(BookingDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.populate(SMALL_DATASET)
+        self.room = Room.objects.order_by('pk').first()
+        self.user = User.objects.order_by('pk').first()
+        self.dates = {'check_in_date': '2031-03-01', 'check_out_date': '2031-03-04'}
+
+    def book(self, **data):
+        return self.client.post('/bookings/', {'user_id': self.user.pk, 'room_id': self.room.pk, **self.dates, **data},
+                                format='json')
+
+    def test_hold(self):
+        response = self.client.post(f'/rooms/{self.room.pk}/hold/', {**self.dates, 'minutes': 5}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        token = response.data['data']['token']
+
+        self.assertEqual(self.client.post(f'/rooms/{self.room.pk}/hold/', {'check_in_date': '2031-03-03',
+                                                                            'check_out_date': '2031-03-05'},
+                                          format='json').status_code, 400)
+        self.assertEqual(self.book().status_code, 400)
+        free = self.client.get('/hotels/free_rooms/', {'check_in': '2031-03-02', 'check_out': '2031-03-03'}).data
+        self.assertNotIn(self.room.pk, [room['room_id'] for room in free['results']])
+        calendar = self.client.get(f'/rooms/{self.room.pk}/calendar/?from=2031-03-01&to=2031-03-05&encoding=rle')
+        self.assertEqual(calendar.data['busy'], [0, 3, 1])
+
+        self.assertEqual(self.book(hold_token=token).status_code, 201)
+        self.assertFalse(RoomHold.objects.exists())
+
+    def test_expired_hold(self):
+        self.client.post(f'/rooms/{self.room.pk}/hold/', self.dates, format='json')
+        RoomHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.book().status_code, 201)
+
+        call_command('sweep_holds', stdout=io.StringIO())
+        self.assertFalse(RoomHold.objects.exists())
+
+    # В пачке удержание не учитывается только бронированием со своим токеном и своим номером, и только такое
+    # бронирование его снимает.
+    def test_bulk_hold_tokens(self):
+        other_room = Room.objects.order_by('pk')[1]
+        token = self.client.post(f'/rooms/{self.room.pk}/hold/', self.dates, format='json').data['data']['token']
+        item = {'user_id': self.user.pk, 'room_id': self.room.pk}
+
+        response = self.client.post('/bookings/bulk/', [
+            {**item, 'room_id': other_room.pk, 'check_in_date': '2031-03-10', 'check_out_date': '2031-03-12',
+             'hold_token': token},
+            {**item, 'check_in_date': '2031-03-02', 'check_out_date': '2031-03-04'},
+        ], format='json')
+        self.assertEqual([result['status'] for result in response.data['data']], ['created', 'rejected'])
+        self.assertTrue(RoomHold.objects.filter(token=token).exists())
+
+        response = self.client.post('/bookings/bulk/', [
+            {**item, 'check_in_date': '2031-03-01', 'check_out_date': '2031-03-02', 'hold_token': token},
+            {**item, 'check_in_date': '2031-03-02', 'check_out_date': '2031-03-04'},
+        ], format='json')
+        self.assertEqual([result['status'] for result in response.data['data']], ['created', 'rejected'])
+        self.assertFalse(RoomHold.objects.exists())
+
+    @override_settings(ROOM_HOLD_MAX_NIGHTS=3)
+    def test_hold_nights_limit(self):
+        url = f'/rooms/{self.room.pk}/hold/'
+        self.assertEqual(self.client.post(url, self.dates, format='json').status_code, 201)
+        response = self.client.post(url, {'check_in_date': '2031-04-01', 'check_out_date': '2031-04-05'},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RoomHold.objects.filter(check_in_date='2031-04-01').exists())
+
+
+# Обработчики очереди работают в своих потоках со своими соединениями с базой данных, поэтому данные теста должны
+# быть зафиксированы.
+class JobQueueTest(TransactionTestCase):
+
+    def setUp(self):
+        self.calls = []
+        TASKS['test_task'] = self.record
+        self.addCleanup(TASKS.pop, 'test_task')
+
+    def record(self, value, fail=False):
+        self.calls.append(value)
+        if fail:
+            raise ValueError(value)
+
+    def test_priority_and_claim(self):
+        low = Job.objects.enqueue('test_task', 'low')
+        high = Job.objects.enqueue('test_task', 'high', priority=5)
+        Job.objects.enqueue('test_task', 'later', delay=60)
+
+        claimed = Job.objects.claim('worker-1')
+        self.assertEqual([job.pk for job in claimed], [high.pk])
+        self.assertEqual([job.pk for job in Job.objects.claim('worker-2', limit=5)], [low.pk])
+        self.assertEqual(Job.objects.claim('worker-3'), [])
+
+        self.assertEqual(run_jobs(claimed), (1, 0))
+        self.assertEqual(self.calls, ['high'])
+        self.assertFalse(Job.objects.filter(pk=high.pk).exists())
+
+        # Задача забранного обработчика, срок которой истек, возвращается в очередь
+        Job.objects.filter(pk=low.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(Job.objects.requeue_stale(), 1)
+        self.assertEqual([job.pk for job in Job.objects.claim('worker-3')], [low.pk])
+
+    @override_settings(JOB_RETRY_DELAY=10)
+    def test_retry_with_backoff(self):
+        job = Job.objects.enqueue('test_task', 'broken', fail=True, max_attempts=2)
+        with self.assertLogs('booking_app.jobs', 'ERROR'):
+            self.assertEqual(run_jobs(Job.objects.claim('worker')), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('ValueError: broken', job.last_error)
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=4))
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('booking_app.jobs', 'ERROR'):
+            self.assertEqual(run_jobs(Job.objects.claim('worker')), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(self.calls, ['broken', 'broken'])
+
+    def test_runworker(self):
+        for value in range(5):
+            Job.objects.enqueue('test_task', value)
+        Job.objects.enqueue('missing_task')
+        output = io.StringIO()
+        call_command('runworker', '--burst', '--threads', '1', '--batch-size', '4', stdout=output)
+        self.assertEqual(sorted(self.calls), list(range(5)))
+        self.assertIn('Jobs done: 5, failed: 1', output.getvalue())
+        self.assertEqual(list(Job.objects.values_list('task', 'status')), [('missing_task', Job.FAILED)])
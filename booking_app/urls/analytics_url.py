@@ -0,0 +1,7 @@
+from django.urls import path
+from booking_app.views.analytics_view import OccupancyAnalyticsView
+
+urlpatterns = [
+    path('occupancy/', OccupancyAnalyticsView.as_view()),  # Отчет о занятости и выручке отелей по дням, неделям или
+    # месяцам (например, /analytics/occupancy/?date_from=2024-01-01&date_to=2024-04-01&period=month&hotel_id=1).
+]
@@ -0,0 +1,15 @@
+from django.urls import path
+from booking_app.views.async_view import (AsyncHotelListView,
+                                          AsyncHotelDetailView,
+                                          AsyncRoomListView,
+                                          AsyncRoomDetailView,
+                                          AsyncFreeRoomListView)
+
+urlpatterns = [
+    path('hotels/', AsyncHotelListView.as_view()),  # Асинхронный список отелей, тот же ответ, что и /hotels/.
+    path('hotels/<int:hotel_id>/', AsyncHotelDetailView.as_view()),  # Асинхронная карточка отеля.
+    path('hotels/free_rooms/', AsyncFreeRoomListView.as_view()),  # Асинхронный поиск свободных номеров, те же
+    # параметры, что и у /hotels/free_rooms/.
+    path('rooms/', AsyncRoomListView.as_view()),  # Асинхронный список номеров, в том числе с параметром hotel_id.
+    path('rooms/<int:room_id>/', AsyncRoomDetailView.as_view()),  # Асинхронная карточка номера.
+]
@@ -1,5 +1,8 @@
 from django.urls import path
-from booking_app.views.booking_view import BookingListGenericView, RetrieveBookingGenericView
+from booking_app.views.booking_view import (BookingListGenericView,
+                                            RetrieveBookingGenericView,
+                                            BookingBulkGenericView)
+from booking_app.views.export_view import BookingExportView
 
 urlpatterns = [path("", BookingListGenericView.as_view()),
                # Маршрут для списка всех бронирований. Пустая строка в URL означает, что это базовый URL для списка
@@ -10,4 +13,9 @@ urlpatterns = [path("", BookingListGenericView.as_view()),
                # качестве идентификатора бронирования. Этот идентификатор будет передан в представление для получения,
                # обновления или удаления соответствующего бронирования. Представление RetrieveBookingGenericView также
                # определено как классовое представление.
+               path("bulk/", BookingBulkGenericView.as_view()),
+               # Маршрут для массового создания бронирований: в теле запроса передается список бронирований.
+               path("export/", BookingExportView.as_view()),
+               # Маршрут для потоковой выгрузки всех бронирований в формате NDJSON или CSV
+               # (например, /bookings/export/?format=csv&since=2024-05-01T00:00:00Z).
                ]
@@ -1,5 +1,6 @@
 from django.urls import path
-from booking_app.views.hotel_view import HotelListGenericView, RetrieveHotelGenericView
+from booking_app.views.hotel_view import HotelListGenericView, RetrieveHotelGenericView, LocationSuggestView
+from booking_app.views.review_view import ReviewByHotelListAPIView
 from booking_app.views.room_view import HotelFreeRoomListAPIView
 
 urlpatterns = [path("", HotelListGenericView.as_view()),
@@ -12,4 +13,9 @@ urlpatterns = [path("", HotelListGenericView.as_view()),
                # обновления или удаления соответствующего отеля. Представление RetrieveHotelGenericView также
                # определено как классовое представление.
                path("free_rooms/", HotelFreeRoomListAPIView.as_view()),
+               path("locations/suggest/", LocationSuggestView.as_view()),
+               # Маршрут подсказок расположения отелей по началу названия (параметры prefix и limit). Подсказки
+               # отдаются из индекса в памяти, без запросов к базе данных.
+               path("<int:hotel_id>/reviews/", ReviewByHotelListAPIView.as_view()),
+               # Маршрут для отзывов конкретного отеля. Отзывы отдаются постранично, от новых к старым.
                ]
@@ -1,4 +1,5 @@
 from django.urls import path
+from booking_app.views.export_view import ReviewExportView
 from booking_app.views.review_view import ReviewListGenericView, RetrieveReviewGenericView
 
 urlpatterns = [
@@ -7,4 +8,6 @@ urlpatterns = [
     path('<int:review_id>/', RetrieveReviewGenericView.as_view()),  # Этот маршрут URL привязывает представление
     # RetrieveReviewGenericView к URL-адресу, содержащему идентификатор отзыва в качестве переменной. Таким образом,
     # при обращении к URL вида /<идентификатор_отзыва>/ будет отображена информация о конкретном отзыве.
+    path('export/', ReviewExportView.as_view()),  # Этот маршрут URL отдает потоковую выгрузку всех отзывов в
+    # формате NDJSON или CSV (параметры format и since).
 ]
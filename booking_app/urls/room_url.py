@@ -1,5 +1,7 @@
 from django.urls import path
-from booking_app.views.room_view import RoomsListGenericView, RoomDetailGenericView
+from booking_app.views.export_view import RoomExportView
+from booking_app.views.room_view import (RoomsListGenericView, RoomDetailGenericView, RoomCalendarView,
+                                         RoomBatchCalendarView, RoomHoldView)
 
 urlpatterns = [
     path('', RoomsListGenericView.as_view()),  # Этот маршрут URL привязывает представление RoomsListGenericView к
@@ -7,4 +9,12 @@ urlpatterns = [
     path('<int:room_id>/', RoomDetailGenericView.as_view()),  # Этот маршрут URL привязывает представление
     # RoomDetailGenericView к URL-адресу, содержащему идентификатор номера в качестве переменной. Таким образом,
     # при обращении к URL вида /<идентификатор_номера>/ будет отображена информация о конкретном номере.
+    path('export/', RoomExportView.as_view()),  # Этот маршрут URL отдает потоковую выгрузку всех номеров в
+    # формате NDJSON или CSV (параметры format и since).
+    path('<int:room_id>/calendar/', RoomCalendarView.as_view()),  # Этот маршрут URL отдает календарь занятости
+    # номера на интервал дат (параметры from, to и encoding) в виде набора бит.
+    path('<int:room_id>/hold/', RoomHoldView.as_view()),  # Этот маршрут URL временно удерживает номер на даты на
+    # время оформления бронирования (POST) и снимает удержание по токену (DELETE).
+    path('calendar/', RoomBatchCalendarView.as_view()),  # Этот маршрут URL отдает календари занятости нескольких
+    # номеров (параметр room_id можно повторять) или всех номеров отеля (hotel_id) одним ответом.
 ]
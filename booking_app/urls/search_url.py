@@ -0,0 +1,7 @@
+from django.urls import path
+from booking_app.views.search_view import SearchView
+
+urlpatterns = [
+    path('', SearchView.as_view()),  # Этот маршрут URL отдает результаты полнотекстового поиска по отелям и
+    # отзывам (параметры q и limit), от более релевантных к менее.
+]
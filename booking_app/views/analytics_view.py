@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.occupancy_model import HotelDailyOccupancy
+from booking_app.models.room_model import Room
+from booking_app.serializers.analytics_serializer import OccupancyParamsSerializer, OccupancyPeriodSerializer
+
+
+# Доля занятых номеро-ночей среди доступных.
+def occupancy_rate(rooms_booked, room_nights):
+    return round(rooms_booked / room_nights, 4) if room_nights else 0.0
+
+
+# Отчет о занятости и выручке отеля (параметр hotel_id) или всех отелей вместе по дням, неделям или месяцам.
+# Отчет строится по сводной таблице HotelDailyOccupancy, а не по бронированиям: три запроса (отель, количество его
+# номеров и суммы по периодам) независимо от количества бронирований. Доступные номеро-ночи считаются по текущему
+# количеству номеров. Отчет содержит выручку, поэтому доступен только персоналу (is_staff).
+class OccupancyAnalyticsView(APIView):
+    permission_classes = [
+        IsAdminUser,
+    ]
+
+    def get(self, request: Request, *args, **kwargs):
+        params = OccupancyParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        hotel_id = params.validated_data.get('hotel_id')
+
+        rooms = Room.objects.all()
+        if hotel_id is not None:
+            rooms = rooms.filter(hotel_id=get_object_or_404(Hotel, pk=hotel_id))
+        rooms = rooms.count()
+
+        periods = HotelDailyOccupancy.objects.series(params.validated_data['date_from'],
+                                                     params.validated_data['date_to'],
+                                                     params.validated_data['period'],
+                                                     hotel_id)
+        for period in periods:
+            period['room_nights'] = rooms * (period['end'] - period['start']).days
+            period['occupancy'] = occupancy_rate(period['rooms_booked'], period['room_nights'])
+        total = {
+            'start': params.validated_data['date_from'],
+            'end': params.validated_data['date_to'],
+            'rooms_booked': sum(period['rooms_booked'] for period in periods),
+            'room_nights': sum(period['room_nights'] for period in periods),
+            'revenue': sum((period['revenue'] for period in periods), Decimal(0)),
+        }
+        total['occupancy'] = occupancy_rate(total['rooms_booked'], total['room_nights'])
+        return Response(
+            status=status.HTTP_200_OK,
+            data={
+                'hotel_id': hotel_id,
+                'period': params.validated_data['period'],
+                'rooms': rooms,
+                'total': OccupancyPeriodSerializer(total).data,
+                'results': OccupancyPeriodSerializer(periods, many=True).data,
+            }
+        )
@@ -0,0 +1,155 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from booking_app.fast_serialization import values_serializer
+from booking_app.models.hotel_model import Hotel
+from booking_app.models.room_model import Room
+from booking_app.pagination import HotelCursorPagination, RoomCursorPagination
+from booking_app.renderers import FastJSONRenderer
+from booking_app.serializers.hotel_serializer import HotelSerializer
+from booking_app.serializers.room_serializer import (RoomInfoSerializer,
+                                                     AllRoomsSerializer,
+                                                     FreeRoomSearchSerializer,
+                                                     RoomFilterSerializer)
+from booking_app.views.room_view import free_rooms_queryset, room_facets_data, room_facets_query, rooms_queryset
+
+
+# Асинхронные варианты самых частых запросов чтения: список и карточка отеля, список и карточка номера, поиск
+# свободных номеров. Представления объявлены через async def и читают базу данных асинхронным ORM (aget, async for),
+# поэтому под ASGI ожидающий базу данных запрос не занимает поток обработчика на все время своей обработки.
+# Ответы совпадают с ответами синхронных представлений DRF байт в байт. Кэш ответов и условные GET (ETag) здесь не
+# используются: они синхронные, а асинхронные маршруты нужны именно для запросов, которые доходят до базы данных.
+
+# Ответ JSON в том же виде, что и Response DRF с FastJSONRenderer.
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(FastJSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+# Базовое асинхронное представление только для чтения. Пользователь определяется теми же аутентификаторами, что и
+# в синхронных представлениях (DEFAULT_AUTHENTICATION_CLASSES DRF: сессия и HTTP Basic), и проверяется так же, как
+# IsAuthenticated: неаутентифицированный запрос и запрос с неверными учетными данными получают тот же статус и то же
+# сообщение, что и от DRF. Аутентификаторы DRF синхронные и обращаются к базе данных, поэтому выполняются в потоке
+# через sync_to_async. Представления, синхронный вариант которых открыт всем, отключают проверку
+# (authentication_required = False).
+class AsyncReadView(View):
+    authentication_required = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        authenticators = [authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        drf_request = Request(request, authenticators=authenticators)
+        try:
+            user = await sync_to_async(lambda: drf_request.user)()
+            if self.authentication_required and not user.is_authenticated:
+                raise NotAuthenticated()
+        except (NotAuthenticated, AuthenticationFailed) as exc:
+            return self.authentication_error(request, authenticators, exc)
+        return await super().dispatch(request, *args, **kwargs)
+
+    # Ответ на ошибку аутентификации как в APIView.handle_exception: 401 с заголовком WWW-Authenticate первого
+    # аутентификатора, если он его задает, иначе 403.
+    @staticmethod
+    def authentication_error(request, authenticators, exc):
+        header = authenticators[0].authenticate_header(request) if authenticators else None
+        response = json_response({'detail': exc.detail},
+                                 status.HTTP_401_UNAUTHORIZED if header else status.HTTP_403_FORBIDDEN)
+        if header:
+            response['WWW-Authenticate'] = header
+        return response
+
+
+# Асинхронный список с курсорной пагинацией. Страница читается одним запросом через values() и сериализуется
+# ValuesSerializer, как в ValuesListMixin. request нужен только для абсолютных ссылок на файлы.
+class AsyncListView(AsyncReadView):
+    serializer_class = None
+    pagination_class = None
+
+    async def serialize_page(self, queryset, request=None):
+        serializer = values_serializer(self.serializer_class)
+        self.paginator = self.pagination_class()
+        page = await self.paginator.apaginate_queryset(serializer.project(queryset), Request(self.request), self)
+        return serializer.serialize(page, request)
+
+    def get_paginated_response(self, data):
+        return json_response(self.paginator.get_paginated_response(data).data)
+
+
+# Асинхронная карточка объекта. Отсутствующий объект возвращает 404 с тем же сообщением, что и get_object_or_404.
+class AsyncDetailView(AsyncReadView):
+    model = None
+    serializer_class = None
+    lookup_url_kwarg = None
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            instance = await self.model.objects.aget(pk=self.kwargs[self.lookup_url_kwarg])
+        except self.model.DoesNotExist:
+            return json_response({'detail': f'No {self.model._meta.object_name} matches the given query.'},
+                                 status.HTTP_404_NOT_FOUND)
+        return json_response(self.serializer_class(instance).data)
+
+
+# Асинхронный вариант HotelListGenericView.get.
+class AsyncHotelListView(AsyncListView):
+    serializer_class = HotelSerializer
+    pagination_class = HotelCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        hotels = await self.serialize_page(Hotel.objects.all())
+        if hotels:
+            return self.get_paginated_response(hotels)
+        return json_response([], status.HTTP_204_NO_CONTENT)
+
+
+# Асинхронный вариант RetrieveHotelGenericView.get.
+class AsyncHotelDetailView(AsyncDetailView):
+    model = Hotel
+    serializer_class = HotelSerializer
+    lookup_url_kwarg = 'hotel_id'
+
+
+# Асинхронный вариант RoomsListGenericView.get: те же фильтры, сортировка и фасеты (RoomFilterSerializer).
+class AsyncRoomListView(AsyncListView):
+    serializer_class = AllRoomsSerializer
+    pagination_class = RoomCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        search = RoomFilterSerializer(data=request.GET)
+        if not search.is_valid():
+            return json_response(search.errors, status.HTTP_400_BAD_REQUEST)
+        filters = search.validated_data
+        rooms = await self.serialize_page(rooms_queryset(filters))
+        if filters.get('facets'):
+            queryset, aggregates = room_facets_query(filters)
+            data = self.paginator.get_paginated_response(rooms).data
+            data['facets'] = room_facets_data(await queryset.aaggregate(**aggregates))
+            return json_response(data)
+        if rooms:
+            return self.get_paginated_response(rooms)
+        return json_response([], status.HTTP_204_NO_CONTENT)
+
+
+# Асинхронный вариант RoomDetailGenericView.get. Как и синхронный, доступен без аутентификации.
+class AsyncRoomDetailView(AsyncDetailView):
+    model = Room
+    serializer_class = RoomInfoSerializer
+    lookup_url_kwarg = 'room_id'
+    authentication_required = False
+
+
+# Асинхронный вариант HotelFreeRoomListAPIView: те же параметры поиска и тот же запрос (free_rooms_queryset).
+# Ошибки в параметрах возвращают 400 с ошибками сериализатора, пустой результат - страницу без номеров.
+class AsyncFreeRoomListView(AsyncListView):
+    serializer_class = AllRoomsSerializer
+    pagination_class = RoomCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        search = FreeRoomSearchSerializer(data=request.GET)
+        if not search.is_valid():
+            return json_response(search.errors, status.HTTP_400_BAD_REQUEST)
+        rooms = await self.serialize_page(free_rooms_queryset(search.validated_data), request)
+        return self.get_paginated_response(rooms)
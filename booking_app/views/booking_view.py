@@ -1,19 +1,41 @@
-from rest_framework.generics import (ListAPIView,
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework.generics import (GenericAPIView,
+                                     ListAPIView,
                                      RetrieveUpdateDestroyAPIView,
                                      get_object_or_404)
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
+from booking_app.error_messages import (BOOKING_OCCUPIED_ERROR,
+                                        BOOKING_BULK_FORMAT_ERROR,
+                                        BOOKING_BULK_CONFLICT_ERROR)
+from booking_app.conditional import conditional_get
+from booking_app.fast_serialization import ValuesListMixin
 from booking_app.models.booking_model import Booking
-from booking_app.serializers.booking_serializer import BookingSerializer
+from booking_app.models.room_hold_model import RoomHold
+from booking_app.models.room_lock_model import lock_rooms
+from booking_app.models.room_night_model import RoomNight
+from booking_app.pagination import BookingCursorPagination
+from booking_app.serializers.booking_serializer import (BookingSerializer,
+                                                        BookingBulkItemSerializer,
+                                                        hold_conflicts,
+                                                        sweep_conflicts,
+                                                        create_bookings)
 from booking_app.success_messages import (BOOKING_DELETED_MESSAGE,
                                           BOOKING_UPDATED_MESSAGE,
-                                          BOOKING_CREATED_MESSAGE)
+                                          BOOKING_CREATED_MESSAGE,
+                                          BOOKINGS_BULK_CREATED_MESSAGE)
 
 
-class BookingListGenericView(ListAPIView):
+class BookingListGenericView(ValuesListMixin, ListAPIView):
     # Здесь определяются права доступа, требуемые для доступа к этому представлению.
     # В данном случае, используется IsAuthenticated, что означает,
     # что пользователь должен быть аутентифицирован для доступа к этим операциям.
@@ -23,16 +45,16 @@ class BookingListGenericView(ListAPIView):
     serializer_class = BookingSerializer
     # Это запрос к базе данных для получения всех объектов модели Booking
     queryset = Booking.objects.all()
+    # Курсорная пагинация по первичному ключу, без OFFSET
+    pagination_class = BookingCursorPagination
 
-    # Метод для обработки GET-запросов, которые возвращают список всех бронирований.
+    # Метод для обработки GET-запросов, которые возвращают список всех бронирований. Список отдается постранично,
+    # ссылки на соседние страницы содержат курсор.
+    @conditional_get
     def get(self, request: Request, *args, **kwargs):
-        bookings = self.get_queryset()
+        bookings = self.serialize_page(self.get_queryset())
         if bookings:
-            serializer = self.serializer_class(bookings, many=True)
-            return Response(
-                status=status.HTTP_200_OK,
-                data=serializer.data
-            )
+            return self.get_paginated_response(bookings)
         else:
             return Response(
                 status=status.HTTP_204_NO_CONTENT,
@@ -65,14 +87,19 @@ class RetrieveBookingGenericView(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = BookingSerializer
 
+    # Условный GET для конкретного бронирования: ETag и Last-Modified вычисляются по одной строке.
+    def get_conditional_queryset(self):
+        return Booking.objects.filter(pk=self.kwargs.get("booking_id"))
+
     # Метод для получения конкретного бронирования по его идентификатору. Он использует get_object_or_404 для получения
     # объекта из базы данных или генерации ошибки 404 Not Found, если объект не найден.
     def get_object(self):
         booking_id = self.kwargs.get("booking_id")
-        booking = get_object_or_404(Booking, id=booking_id)
+        booking = get_object_or_404(Booking, pk=booking_id)
         return booking
 
     # Метод для обработки GET-запросов на получение конкретного бронирования.
+    @conditional_get
     def get(self, request: Request, *args, **kwargs):
         booking = self.get_object()
         serializer = self.serializer_class(booking)
@@ -103,12 +130,96 @@ class RetrieveBookingGenericView(RetrieveUpdateDestroyAPIView):
                 data=serializer.errors
             )
 
-    # Метод для обработки DELETE-запросов на удаление конкретного бронирования.
+    # Метод для обработки DELETE-запросов на удаление конкретного бронирования. Бронирование удаляется мягко, а
+    # занятые им ночи освобождаются сигналом post_save, поэтому номер сразу снова доступен для бронирования.
     # При успешном удалении бронирования возвращается код состояния 200 OK и сообщение о успешном удалении.
     def delete(self, request, *args, **kwargs):
         booking = self.get_object()
-        booking.delete()
+        booking.soft_delete()
         return Response(
             status=status.HTTP_200_OK,
             data=BOOKING_DELETED_MESSAGE
         )
+
+
+# Добавляем класс BookingBulkGenericView, который создает сразу много бронирований одним запросом. Тело запроса -
+# список бронирований в том же формате, что и для BookingListGenericView. В ответе для каждого элемента
+# возвращается результат: созданное бронирование или ошибки, из-за которых оно было отклонено.
+class BookingBulkGenericView(GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = BookingBulkItemSerializer
+
+    # Метод для обработки POST-запросов. Сначала каждый элемент проверяется сериализатором, затем в одной транзакции
+    # номера пачки блокируются, все бронирования проверяются на пересечения друг с другом и с уже существующими
+    # бронированиями одним запросом к индексу занятости, и принятые бронирования сохраняются.
+    def post(self, request: Request, *args, **kwargs):
+        items = request.data
+        max_items = settings.BOOKING_BULK_MAX_ITEMS
+        if not isinstance(items, list) or not items or len(items) > max_items:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=BOOKING_BULK_FORMAT_ERROR.format(max_items=max_items)
+            )
+
+        # Один экземпляр сериализатора проверяет все элементы, как это делает ListSerializer, чтобы не строить поля
+        # сериализатора заново для каждого бронирования.
+        serializer = self.serializer_class()
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, serializer.run_validation(item)))
+            except ValidationError as exc:
+                results[index] = {"index": index, "status": "rejected", "errors": exc.detail}
+
+        # Токены удержаний не являются полями бронирования: удержание не мешает только бронированию со своим токеном
+        # и своим номером и снимается вместе с его созданием.
+        hold_tokens = {index: data.pop('hold_token', None) for index, data in valid}
+        with_room = [(index, data['room_id'].pk, data['check_in_date'], data['check_out_date'])
+                     for index, data in valid if data.get('room_id') is not None]
+        try:
+            with transaction.atomic():
+                # Номера пачки блокируются до конца транзакции, поэтому прочитанная занятость не может измениться
+                # параллельным запросом до вставки.
+                lock_rooms(booking[1] for booking in with_room)
+                occupied, held = {}, {}
+                if with_room:
+                    room_ids = {booking[1] for booking in with_room}
+                    date_from = min(booking[2] for booking in with_room)
+                    date_to = max(booking[3] for booking in with_room)
+                    occupied = RoomNight.objects.occupied_nights(room_ids, date_from, date_to)
+                    held = RoomHold.objects.held_nights(room_ids, date_from, date_to)
+                rejected = hold_conflicts(with_room, held, hold_tokens)
+                rejected |= sweep_conflicts([booking for booking in with_room if booking[0] not in rejected],
+                                            occupied)
+
+                accepted = []
+                for index, data in valid:
+                    if index in rejected:
+                        results[index] = {"index": index, "status": "rejected",
+                                          "errors": {"non_field_errors": [BOOKING_OCCUPIED_ERROR]}}
+                    else:
+                        accepted.append((index, Booking(**data)))
+
+                bookings = create_bookings([booking for _, booking in accepted])
+                used_holds = [Q(token=hold_tokens[index], room_id=booking.room_id_id) for index, booking in accepted
+                              if hold_tokens[index] and booking.room_id_id is not None]
+                if used_holds:
+                    RoomHold.objects.filter(reduce(or_, used_holds)).delete()
+        except IntegrityError:
+            return Response(
+                status=status.HTTP_409_CONFLICT,
+                data=BOOKING_BULK_CONFLICT_ERROR
+            )
+
+        created = BookingSerializer(bookings, many=True).data
+        for (index, _), data in zip(accepted, created):
+            results[index] = {"index": index, "status": "created", "data": data}
+
+        return Response(
+            status=status.HTTP_201_CREATED if bookings else status.HTTP_400_BAD_REQUEST,
+            data={
+                "message": BOOKINGS_BULK_CREATED_MESSAGE.format(created=len(bookings), total=len(items)),
+                "data": results
+            }
+        )
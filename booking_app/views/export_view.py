@@ -0,0 +1,98 @@
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.views import APIView
+
+from booking_app.fast_serialization import values_serializer
+from booking_app.models.booking_model import Booking
+from booking_app.models.review_model import Review
+from booking_app.models.room_model import Room
+from booking_app.renderers import NDJSONRenderer, CSVRenderer
+from booking_app.serializers.booking_serializer import BookingSerializer
+from booking_app.serializers.export_serializer import ExportParamsSerializer
+from booking_app.serializers.review_serializer import AllReviewsSerializer
+from booking_app.serializers.room_serializer import AllRoomsSerializer
+
+
+# Объединяет строки выгрузки в блоки по size штук, чтобы сервер отправлял данные крупными порциями, а не по одной
+# строке.
+def batched_lines(lines, size):
+    lines = iter(lines)
+    while True:
+        batch = ''.join(islice(lines, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Базовое представление для потоковой выгрузки таблицы. Формат выбирается параметром format=ndjson|csv (по
+# умолчанию ndjson). Строки читаются из базы данных порциями по chunk_size через QuerySet.iterator() и сразу
+# отправляются клиенту, поэтому потребление памяти не зависит от размера таблицы. При FAST_SERIALIZATION_ENABLED
+# строки читаются через values() и преобразуются ValuesSerializer без создания объектов моделей. В выгрузку
+# попадают и мягко удаленные строки (поля deleted и deleted_at), чтобы получатель выгрузки изменений (since) узнавал
+# об удалениях.
+class ExportAPIView(APIView):
+    # Здесь определяются права доступа, требуемые для доступа к этому представлению.
+    # В данном случае, используется IsAuthenticated, что означает,
+    # что пользователь должен быть аутентифицирован для доступа к этим операциям.
+    permission_classes = [
+        IsAuthenticated,
+    ]
+    renderer_classes = [
+        NDJSONRenderer,
+        CSVRenderer,
+    ]
+    queryset = None
+    serializer_class = None
+    filename = None
+    chunk_size = 2000
+    batch_size = 200
+
+    # Метод для обработки GET-запросов на выгрузку. Выгрузка упорядочена по первичному ключу, чтобы повторные
+    # выгрузки с одинаковыми параметрами давали одинаковый результат.
+    def get(self, request: Request, *args, **kwargs):
+        params = ExportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        queryset = self.queryset.order_by('pk')
+        since = params.validated_data.get('since')
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+
+        if settings.FAST_SERIALIZATION_ENABLED:
+            serializer = values_serializer(self.serializer_class)
+            fields = serializer.names
+            rows = serializer.iterate(serializer.project(queryset).iterator(chunk_size=self.chunk_size))
+        else:
+            serializer = self.serializer_class()
+            fields = list(serializer.fields)
+            rows = (serializer.to_representation(obj) for obj in queryset.iterator(chunk_size=self.chunk_size))
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            batched_lines(renderer.render_rows(rows, fields), self.batch_size),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{renderer.format}"'
+        return response
+
+
+class BookingExportView(ExportAPIView):
+    queryset = Booking.all_objects.all()
+    serializer_class = BookingSerializer
+    filename = 'bookings'
+
+
+class RoomExportView(ExportAPIView):
+    queryset = Room.all_objects.all()
+    serializer_class = AllRoomsSerializer
+    filename = 'rooms'
+
+
+class ReviewExportView(ExportAPIView):
+    queryset = Review.all_objects.all()
+    serializer_class = AllReviewsSerializer
+    filename = 'reviews'
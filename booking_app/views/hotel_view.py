@@ -1,16 +1,23 @@
+from django.conf import settings
 from rest_framework.generics import (ListAPIView,
                                      RetrieveUpdateDestroyAPIView,
                                      get_object_or_404)
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.views import APIView
+from booking_app.cache import cache_response
+from booking_app.conditional import conditional_get
+from booking_app.fast_serialization import ValuesListMixin
+from booking_app.locations import suggest_locations
 from booking_app.models.hotel_model import Hotel
-from booking_app.serializers.hotel_serializer import HotelSerializer
+from booking_app.pagination import HotelCursorPagination
+from booking_app.serializers.hotel_serializer import HotelSerializer, LocationSuggestSerializer
 from booking_app.success_messages import HOTEL_CREATED_MESSAGE, HOTEL_UPDATED_MESSAGE, HOTEL_DELETED_MESSAGE
 
 
-class HotelListGenericView(ListAPIView):
+class HotelListGenericView(ValuesListMixin, ListAPIView):
     # Здесь определяются права доступа, требуемые для доступа к этому представлению.
     # В данном случае, используется IsAuthenticated, что означает,
     # что пользователь должен быть аутентифицирован для доступа к этим операциям.
@@ -20,16 +27,21 @@ class HotelListGenericView(ListAPIView):
     serializer_class = HotelSerializer
     # Это запрос к базе данных для получения всех объектов модели Hotel
     queryset = Hotel.objects.all()
+    # Курсорная пагинация по первичному ключу, без OFFSET
+    pagination_class = HotelCursorPagination
 
-    # Метод для обработки GET-запросов, которые возвращают список всех отелей.
+    # Ответ списка отелей кэшируется и становится недействительным при изменении любого отеля.
+    def get_cache_scopes(self):
+        return ['hotels']
+
+    # Метод для обработки GET-запросов, которые возвращают список всех отелей. Список отдается постранично,
+    # ссылки на соседние страницы содержат курсор.
+    @conditional_get
+    @cache_response
     def get(self, request: Request, *args, **kwargs):
-        hotels = self.get_queryset()
+        hotels = self.serialize_page(self.get_queryset())
         if hotels:
-            serializer = self.serializer_class(hotels, many=True)
-            return Response(
-                status=status.HTTP_200_OK,
-                data=serializer.data
-            )
+            return self.get_paginated_response(hotels)
         else:
             return Response(
                 status=status.HTTP_204_NO_CONTENT,
@@ -61,14 +73,24 @@ class RetrieveHotelGenericView(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = HotelSerializer
 
+    # Условный GET для конкретного отеля: ETag и Last-Modified вычисляются по одной строке.
+    def get_conditional_queryset(self):
+        return Hotel.objects.filter(pk=self.kwargs.get("hotel_id"))
+
     # Метод для получения конкретного отеля по его идентификатору. Он использует get_object_or_404 для получения
     # объекта из базы данных или генерации ошибки 404 Not Found, если объект не найден.
     def get_object(self):
         hotel_id = self.kwargs.get("hotel_id")
-        hotel = get_object_or_404(Hotel, id=hotel_id)
+        hotel = get_object_or_404(Hotel, pk=hotel_id)
         return hotel
 
+    # Ответ с данными отеля кэшируется и становится недействительным при изменении этого отеля.
+    def get_cache_scopes(self):
+        return [f'hotel:{self.kwargs.get("hotel_id")}']
+
     # Метод для обработки GET-запросов на получение конкретного отеля.
+    @conditional_get
+    @cache_response
     def get(self, request: Request, *args, **kwargs):
         hotel = self.get_object()
         serializer = self.serializer_class(hotel)
@@ -99,13 +121,37 @@ class RetrieveHotelGenericView(RetrieveUpdateDestroyAPIView):
                 data=serializer.errors
             )
 
-    # Метод для обработки DELETE-запросов на удаление конкретного отеля.
+    # Метод для обработки DELETE-запросов на удаление конкретного отеля. Отель удаляется мягко (помечается
+    # удаленным), вместе с ним помечаются удаленными и его номера (см. booking_app/signals.py).
     # При успешном удалении отеля возвращается код состояния 200 OK и сообщение о успешном удалении.
     def delete(self, request, *args, **kwargs):
         hotel = self.get_object()
-        hotel.delete()
+        hotel.soft_delete()
         return Response(
             status=status.HTTP_200_OK,
             data=HOTEL_DELETED_MESSAGE
         )
 
+
+# Подсказки расположения отелей для строки поиска (booking_app/locations.py): расположения, которые начинаются с
+# prefix, от большего количества отелей к меньшему. Запрос приходит на каждое нажатие клавиши и обслуживается из
+# индекса в памяти процесса без обращения к базе данных. Поэтому у представления нет аутентификации: проверка
+# сессии и пользователя сама читала бы базу данных, а расположения отелей не являются закрытыми данными.
+class LocationSuggestView(APIView):
+    authentication_classes = []
+    permission_classes = [
+        AllowAny,
+    ]
+
+    def get(self, request: Request, *args, **kwargs):
+        params = LocationSuggestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        prefix = params.validated_data['prefix']
+        limit = params.validated_data.get('limit', settings.LOCATION_SUGGEST_DEFAULT_LIMIT)
+        return Response(
+            status=status.HTTP_200_OK,
+            data={
+                'prefix': prefix,
+                'results': suggest_locations(prefix, limit),
+            }
+        )
@@ -6,12 +6,15 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
+from booking_app.conditional import conditional_get
+from booking_app.fast_serialization import ValuesListMixin
 from booking_app.models.review_model import Review
-from booking_app.serializers.review_serializer import ReviewSerializer, AllReviewsSerializer
+from booking_app.pagination import ReviewCursorPagination, HotelReviewCursorPagination
+from booking_app.serializers.review_serializer import ReviewSerializer, HotelReviewSerializer
 from booking_app.success_messages import REVIEW_CREATED_MESSAGE, REVIEW_UPDATED_MESSAGE, REVIEW_DELETED_MESSAGE
 
 
-class ReviewListGenericView(ListAPIView):
+class ReviewListGenericView(ValuesListMixin, ListAPIView):
     # Здесь определяются права доступа, требуемые для доступа к этому представлению.
     # В данном случае, используется IsAuthenticated, что означает,
     # что пользователь должен быть аутентифицирован для доступа к этим операциям.
@@ -21,16 +24,16 @@ class ReviewListGenericView(ListAPIView):
     serializer_class = ReviewSerializer
     # Это запрос к базе данных для получения всех объектов модели Review
     queryset = Review.objects.all()
+    # Курсорная пагинация по первичному ключу, без OFFSET
+    pagination_class = ReviewCursorPagination
 
-    # Метод для обработки GET-запросов, которые возвращают список всех отзывов.
+    # Метод для обработки GET-запросов, которые возвращают список всех отзывов. Список отдается постранично,
+    # ссылки на соседние страницы содержат курсор.
+    @conditional_get
     def get(self, request: Request, *args, **kwargs):
-        reviews = self.get_queryset()
+        reviews = self.serialize_page(self.get_queryset())
         if reviews:
-            serializer = self.serializer_class(reviews, many=True)
-            return Response(
-                status=status.HTTP_200_OK,
-                data=serializer.data
-            )
+            return self.get_paginated_response(reviews)
         else:
             return Response(
                 status=status.HTTP_204_NO_CONTENT,
@@ -62,14 +65,19 @@ class RetrieveReviewGenericView(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReviewSerializer
 
+    # Условный GET для конкретного отзыва: ETag и Last-Modified вычисляются по одной строке.
+    def get_conditional_queryset(self):
+        return Review.objects.filter(pk=self.kwargs.get("review_id"))
+
     # Метод для получения конкретного отзыва по его идентификатору. Он использует get_object_or_404 для получения
     # объекта из базы данных или генерации ошибки 404 Not Found, если объект не найден.
     def get_object(self):
         review_id = self.kwargs.get("review_id")
-        review = get_object_or_404(Review, id=review_id)
+        review = get_object_or_404(Review, pk=review_id)
         return review
 
     # Метод для обработки GET-запросов на получение конкретного отзыва.
+    @conditional_get
     def get(self, request: Request, *args, **kwargs):
         review = self.get_object()
         serializer = self.serializer_class(review)
@@ -100,32 +108,37 @@ class RetrieveReviewGenericView(RetrieveUpdateDestroyAPIView):
                 data=serializer.errors
             )
 
-    # Метод для обработки DELETE-запросов на удаление конкретного отзыва.
+    # Метод для обработки DELETE-запросов на удаление конкретного отзыва. Отзыв удаляется мягко и перестает
+    # учитываться в статистике отеля.
     # При успешном удалении отзыва возвращается код состояния 200 OK и сообщение о успешном удалении.
     def delete(self, request, *args, **kwargs):
         review = self.get_object()
-        review.delete()
+        review.soft_delete()
         return Response(
             status=status.HTTP_200_OK,
             data=REVIEW_DELETED_MESSAGE
         )
 
 
-class ReviewByHotelListAPIView(ListAPIView):
+class ReviewByHotelListAPIView(ValuesListMixin, ListAPIView):
     # Наследуюсь от ListAPIView потому как мне нужна операция только для чтения списка объектов
-    serializer_class = AllReviewsSerializer
+    serializer_class = HotelReviewSerializer
     # Здесь определяются права доступа, требуемые для доступа к этому представлению.
     # В данном случае, используется IsAuthenticated, что означает,
     # что пользователь должен быть аутентифицирован для доступа к этим операциям.
     permission_classes = [
         IsAuthenticated,
     ]
+    # Отзывы отдаются страницами от новых к старым с курсором по created_at.
+    pagination_class = HotelReviewCursorPagination
 
+    # Получаем отзывы одного отеля одним запросом по индексу (hotel_id, created_at). Пользователи присоединяются
+    # через select_related, поэтому время ответа не зависит от общего количества отзывов в системе.
     def get_queryset(self):
-        # Получаем список отзывов для каждого отеля
-        hotel_reviews = []
-        reviews = Review.objects.all()
-        for review in reviews:
-            by_hotel_reviews = Review.objects.filter(hotel_id=review.hotel_id)
-            hotel_reviews.extend(by_hotel_reviews)
-        return hotel_reviews
+        hotel_id = self.kwargs.get("hotel_id")
+        return Review.objects.filter(hotel_id=hotel_id).select_related('user_id')
+
+    # Список отзывов отеля отдается с ETag и Last-Modified, повторный запрос без изменений получает 304.
+    @conditional_get
+    def get(self, request: Request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
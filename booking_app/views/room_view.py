@@ -1,4 +1,5 @@
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Q
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
@@ -6,15 +7,125 @@ from rest_framework.generics import (get_object_or_404,
                                      ListCreateAPIView,
                                      RetrieveUpdateDestroyAPIView,
                                      ListAPIView, )
+from rest_framework.views import APIView
 from rest_framework import status
-from booking_app.models.hotel_model import Hotel
-from booking_app.models.room_model import Room
-from booking_app.serializers.room_serializer import RoomInfoSerializer, AllRoomsSerializer
-from booking_app.success_messages import ROOM_CREATED_MESSAGE, ROOM_UPDATED_MESSAGE, ROOM_DELETED_MESSAGE
+from booking_app.availability import room_calendars
+from booking_app.cache import cache_response
+from booking_app.conditional import conditional_get
+from booking_app.fast_serialization import ValuesListMixin
+from booking_app.models.room_hold_model import RoomHold
+from booking_app.models.room_model import Room, RoomType
+from booking_app.models.room_night_model import RoomNight
+from booking_app.pagination import RoomCursorPagination
+from booking_app.serializers.room_serializer import (RoomInfoSerializer,
+                                                     AllRoomsSerializer,
+                                                     FreeRoomSearchSerializer,
+                                                     RoomFilterSerializer,
+                                                     RoomCalendarSerializer,
+                                                     RoomBatchCalendarSerializer)
+from booking_app.serializers.room_hold_serializer import RoomHoldSerializer
+from booking_app.error_messages import ROOM_HOLD_NOT_FOUND_ERROR
+from booking_app.success_messages import (ROOM_CREATED_MESSAGE, ROOM_UPDATED_MESSAGE, ROOM_DELETED_MESSAGE,
+                                          ROOM_HOLD_CREATED_MESSAGE, ROOM_HOLD_RELEASED_MESSAGE)
 
 
-class HotelFreeRoomListAPIView(ListAPIView):  # Наследуюсь от ListAPIView потому как мне нужна операция только для
-    # чтения списка объектов
+# Поиск свободных номеров строится одним SQL-запросом. Параметры check_in и check_out задают полуинтервал дат,
+# guests - минимальную вместимость номера, location, min_price и max_price - фильтры по отелю и цене.
+# Номера, у которых есть хотя бы одна занятая ночь или действующее удержание (RoomHold) в интервале, отсекаются
+# анти-джойнами (NOT EXISTS) по индексам занятых ночей и удержаний, поэтому количество запросов не зависит ни от
+# числа отелей, ни от числа номеров.
+def free_rooms_queryset(params):
+    queryset = Room.objects.filter(Q(available=True) & Q(hotel_id__isnull=False))
+    if 'check_in' in params:
+        occupied_nights = RoomNight.objects.filter(
+            room_id=OuterRef('pk'),
+            night__gte=params['check_in'],
+            night__lt=params['check_out'],
+        )
+        holds = RoomHold.objects.live().filter(
+            room_id=OuterRef('pk'),
+            check_in_date__lt=params['check_out'],
+            check_out_date__gt=params['check_in'],
+        )
+        queryset = queryset.filter(~Exists(occupied_nights), ~Exists(holds))
+    if 'guests' in params:
+        queryset = queryset.filter(capacity__gte=params['guests'])
+    if 'location' in params:
+        queryset = queryset.filter(hotel_id__location__iexact=params['location'])
+    if 'min_price' in params:
+        queryset = queryset.filter(price_per_night__gte=params['min_price'])
+    if 'max_price' in params:
+        queryset = queryset.filter(price_per_night__lte=params['max_price'])
+    return queryset
+
+
+# Фильтры списка номеров (параметры проверяет RoomFilterSerializer): hotel_id - номера одного отеля, room_type -
+# номера перечисленных типов, min_price и max_price - диапазон цены включительно. Фильтры и сортировка по цене
+# (RoomCursorPagination) обслуживаются составными индексами Room по типу, отелю и цене.
+def room_type_condition(params):
+    if params.get('room_type'):
+        return Q(room_type__in=sorted(params['room_type']))
+    return Q()
+
+
+def price_condition(params):
+    condition = Q()
+    if 'min_price' in params:
+        condition &= Q(price_per_night__gte=params['min_price'])
+    if 'max_price' in params:
+        condition &= Q(price_per_night__lte=params['max_price'])
+    return condition
+
+
+def hotel_rooms_queryset(params):
+    queryset = Room.objects.all()
+    if 'hotel_id' in params:
+        queryset = queryset.filter(hotel_id=params['hotel_id'])
+    return queryset
+
+
+def rooms_queryset(params):
+    return hotel_rooms_queryset(params).filter(room_type_condition(params), price_condition(params))
+
+
+# Ценовые диапазоны фасета цены по границам ROOM_PRICE_FACETS: (нижняя граница включительно, верхняя не включая).
+# У последнего диапазона верхней границы нет.
+def price_ranges():
+    bounds = [0, *settings.ROOM_PRICE_FACETS, None]
+    return list(zip(bounds, bounds[1:]))
+
+
+# Фасеты списка номеров: количество номеров каждого типа и каждого ценового диапазона. Счетчики типов учитывают все
+# фильтры, кроме фильтра по типу, а счетчики цены - все, кроме фильтра по цене, чтобы клиент видел, сколько номеров
+# даст выбор другого значения. Все счетчики считаются одним агрегатным запросом с условными COUNT (FILTER или
+# CASE WHEN, в зависимости от базы данных); возвращаются queryset и агрегаты для aggregate() или aaggregate().
+def room_facets_query(params):
+    aggregates = {}
+    for value in RoomType.values:
+        aggregates[f'room_type_{value}'] = Count('pk', filter=price_condition(params) & Q(room_type=value))
+    for index, (low, high) in enumerate(price_ranges()):
+        bucket = Q(price_per_night__gte=low)
+        if high is not None:
+            bucket &= Q(price_per_night__lt=high)
+        aggregates[f'price_{index}'] = Count('pk', filter=room_type_condition(params) & bucket)
+    return hotel_rooms_queryset(params), aggregates
+
+
+def room_facets_data(counts):
+    return {
+        'room_type': {value: counts[f'room_type_{value}'] for value in RoomType.values},
+        'price': [{'min': low, 'max': high, 'count': counts[f'price_{index}']}
+                  for index, (low, high) in enumerate(price_ranges())],
+    }
+
+
+def room_facets(params):
+    queryset, aggregates = room_facets_query(params)
+    return room_facets_data(queryset.aggregate(**aggregates))
+
+
+class HotelFreeRoomListAPIView(ValuesListMixin, ListAPIView):  # Наследуюсь от ListAPIView потому как мне нужна
+    # операция только для чтения списка объектов
     serializer_class = AllRoomsSerializer
     # Здесь определяются права доступа, требуемые для доступа к этому представлению.
     # В данном случае, используется IsAuthenticated, что означает,
@@ -22,19 +133,18 @@ class HotelFreeRoomListAPIView(ListAPIView):  # Наследуюсь от ListAP
     permission_classes = [
         IsAuthenticated,
     ]
+    # Результаты отдаются страницами с курсором, чтобы не собирать весь список номеров в памяти.
+    pagination_class = RoomCursorPagination
 
+    # Параметры поиска проверяются сериализатором FreeRoomSearchSerializer, сам запрос строит free_rooms_queryset.
     def get_queryset(self):
-        # Получаем список свободных номеров для каждого отеля
-        hotel_rooms = []
-        hotels = Hotel.objects.all()
-        for hotel in hotels:
-            free_rooms = Room.objects.filter(Q(hotel_id=hotel.hotel_id) & Q(available=True))
-            hotel_rooms.extend(free_rooms)
-        return hotel_rooms
+        search = FreeRoomSearchSerializer(data=self.request.query_params)
+        search.is_valid(raise_exception=True)
+        return free_rooms_queryset(search.validated_data)
 
 
-class RoomsListGenericView(ListCreateAPIView):  # Наследуюсь от ListCreateAPIView потому как мне нужна операция не
-    # только для чтения, но и для создания объекта
+class RoomsListGenericView(ValuesListMixin, ListCreateAPIView):  # Наследуюсь от ListCreateAPIView потому как мне
+    # нужна операция не только для чтения, но и для создания объекта
 
     # Здесь определяются права доступа, требуемые для доступа к этому представлению.
     # В данном случае, используется IsAuthenticated, что означает,
@@ -45,32 +155,53 @@ class RoomsListGenericView(ListCreateAPIView):  # Наследуюсь от List
     # Этот атрибут определяет, какой сериализатор будет использоваться для преобразования объектов модели Room в
     # формат JSON и наоборот. В данном случае, используется AllRoomsSerializer, который содержит все поля модели.
     serializer_class = AllRoomsSerializer
+    # Курсорная пагинация по первичному ключу, без OFFSET
+    pagination_class = RoomCursorPagination
+
+    # Параметры списка номеров проверяются сериализатором RoomFilterSerializer: неверные значения возвращают 400.
+    def get_filters(self):
+        search = RoomFilterSerializer(data=self.request.query_params)
+        search.is_valid(raise_exception=True)
+        return search.validated_data
 
     # Этот метод определяет запрос к базе данных для получения списка номеров. Он также выполняет фильтрацию по отелю,
-    # если такой фильтр указан в параметрах запроса. Например, если в URL-адресе указан параметр hotel_id,
-    # метод фильтрует номера по этому отелю.
+    # типу номера и цене, если такие фильтры указаны в параметрах запроса. Например, если в URL-адресе указан
+    # параметр hotel_id, метод фильтрует номера по этому отелю.
     def get_queryset(self):
-        queryset = Room.objects.select_related('hotel_id')
+        return rooms_queryset(self.get_filters()).select_related('hotel_id')
+
+    # Фасеты зависят и от номеров, не прошедших фильтры по типу и цене, поэтому ETag такого ответа вычисляется по
+    # всем номерам отеля (или всем номерам).
+    def get_conditional_queryset(self):
+        filters = self.get_filters()
+        if filters.get('facets'):
+            return hotel_rooms_queryset(filters)
+        return rooms_queryset(filters)
+
+    # Ответ списка номеров кэшируется. Список номеров одного отеля зависит от поколения номеров этого отеля, полный
+    # список - от поколения всех номеров.
+    def get_cache_scopes(self):
         hotel_id = self.request.query_params.get("hotel_id")
         if hotel_id:
-            queryset = queryset.filter(hotel_id=hotel_id)
-        return queryset
+            return [f'hotel:{hotel_id}:rooms']
+        return ['rooms']
 
     # Этот метод обрабатывает GET-запросы на получение списка номеров. Он вызывает метод get_queryset для получения
-    # списка номеров и проверяет, существуют ли номера в результате запроса. Если номера найдены, то они сериализуются
-    # с помощью AllRoomsSerializer и возвращаются в формате JSON с кодом состояния 200 (OK). Если номера не найдены,
-    # возвращается код состояния 204 (No Content).
+    # списка номеров и выбирает из него одну страницу по курсору. Если номера найдены, то они сериализуются
+    # с помощью AllRoomsSerializer и возвращаются в формате JSON вместе со ссылками на соседние страницы с кодом
+    # состояния 200 (OK). С параметром facets=true в ответ добавляются фасеты (room_facets), в том числе для пустой
+    # страницы. Если номера не найдены и фасеты не запрошены, возвращается код состояния 204 (No Content).
+    @conditional_get
+    @cache_response
     def get(self, request: Request, *args, **kwargs):
-        filtered_data = self.get_queryset()
-        if filtered_data.exists():
-            serializer = self.serializer_class(
-                instance=filtered_data,
-                many=True
-            )
-            return Response(
-                status=status.HTTP_200_OK,
-                data=serializer.data
-            )
+        filters = self.get_filters()
+        filtered_data = self.serialize_page(self.get_queryset())
+        if filters.get('facets'):
+            response = self.get_paginated_response(filtered_data)
+            response.data['facets'] = room_facets(filters)
+            return response
+        if filtered_data:
+            return self.get_paginated_response(filtered_data)
         return Response(
             status=status.HTTP_204_NO_CONTENT,
             data=[]
@@ -99,15 +230,25 @@ class RoomsListGenericView(ListCreateAPIView):  # Наследуюсь от List
 class RoomDetailGenericView(RetrieveUpdateDestroyAPIView):
     serializer_class = RoomInfoSerializer
 
+    # Условный GET для конкретного номера: ETag и Last-Modified вычисляются по одной строке.
+    def get_conditional_queryset(self):
+        return Room.objects.filter(pk=self.kwargs.get("room_id"))
+
     # Метод для получения конкретного номера по его идентификатору. Идентификатор номера получается из параметров
     # запроса. Если номер с таким идентификатором не найден, возвращается ошибка 404.
     def get_object(self):
         room_id = self.kwargs.get("room_id")
-        room = get_object_or_404(Room, id=room_id)
+        room = get_object_or_404(Room, pk=room_id)
         return room
 
+    # Ответ с данными номера кэшируется и становится недействительным при изменении этого номера.
+    def get_cache_scopes(self):
+        return [f'room:{self.kwargs.get("room_id")}']
+
     # Метод для обработки GET-запросов на получение информации о конкретном номере. Получает номер с помощью метода
     # get_object, сериализует его и возвращает в формате JSON с кодом состояния 200 (OK).
+    @conditional_get
+    @cache_response
     def get(self, request: Request, *args, **kwargs):
         room = self.get_object()
         serializer = self.serializer_class(room)
@@ -139,12 +280,106 @@ class RoomDetailGenericView(RetrieveUpdateDestroyAPIView):
             )
 
     # Метод для обработки DELETE-запросов на удаление конкретного номера. Получает номер с помощью метода get_object,
-    # затем удаляет его из базы данных. В ответ на успешное удаление возвращается сообщение об успешном удалении и код
+    # затем помечает его удаленным (мягкое удаление): строка остается в базе данных, но больше не попадает в списки и
+    # поиск свободных номеров. В ответ на успешное удаление возвращается сообщение об успешном удалении и код
     # состояния 200 (OK).
     def delete(self, request, *args, **kwargs):
         room = self.get_object()
-        room.delete()
+        room.soft_delete()
         return Response(
             status=status.HTTP_200_OK,
             data=ROOM_DELETED_MESSAGE
         )
+
+
+# Календарь занятости одного номера (booking_app/availability.py): по биту на ночь интервала [from, to) вместо
+# проверки каждой даты отдельным запросом. Два запроса: номер и бронирования номера в интервале.
+class RoomCalendarView(APIView):
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    def get(self, request: Request, *args, **kwargs):
+        params = RoomCalendarSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        room = get_object_or_404(Room, pk=self.kwargs.get("room_id"))
+        date_from, date_to = params.validated_data['date_from'], params.validated_data['date_to']
+        encoding = params.validated_data['encoding']
+        calendars = room_calendars([room.pk], date_from, date_to, encoding)
+        return Response(
+            status=status.HTTP_200_OK,
+            data={
+                'room_id': room.pk,
+                'from': date_from,
+                'to': date_to,
+                'encoding': encoding,
+                'busy': calendars[room.pk],
+            }
+        )
+
+
+# Календари занятости нескольких номеров (параметры room_id) или всех номеров отеля (hotel_id) одним ответом. Два
+# запроса независимо от количества номеров: номера и их бронирования в интервале. Несуществующие номера в ответ не
+# попадают.
+class RoomBatchCalendarView(APIView):
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    def get(self, request: Request, *args, **kwargs):
+        params = RoomBatchCalendarSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        rooms = Room.objects.all()
+        if params.validated_data.get('room_id'):
+            rooms = rooms.filter(pk__in=params.validated_data['room_id'])
+        if 'hotel_id' in params.validated_data:
+            rooms = rooms.filter(hotel_id=params.validated_data['hotel_id'])
+        room_ids = list(rooms.order_by('pk').values_list('pk', flat=True))
+        date_from, date_to = params.validated_data['date_from'], params.validated_data['date_to']
+        encoding = params.validated_data['encoding']
+        calendars = room_calendars(room_ids, date_from, date_to, encoding) if room_ids else {}
+        return Response(
+            status=status.HTTP_200_OK,
+            data={
+                'from': date_from,
+                'to': date_to,
+                'encoding': encoding,
+                'rooms': [{'room_id': room_id, 'busy': calendars[room_id]} for room_id in room_ids],
+            }
+        )
+
+
+# Временное удержание номера на время оформления бронирования. POST удерживает номер на даты check_in_date и
+# check_out_date на minutes минут, если номер на эти даты не забронирован и не удержан, и возвращает токен
+# удержания: бронирование с этим токеном (hold_token) удержание не учитывает. DELETE с токеном (token) снимает
+# удержание досрочно, например, если пользователь отказался от оформления.
+class RoomHoldView(APIView):
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    def post(self, request: Request, *args, **kwargs):
+        room = get_object_or_404(Room, pk=self.kwargs.get("room_id"))
+        serializer = RoomHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(room_id=room)
+        return Response(
+            status=status.HTTP_201_CREATED,
+            data={
+                "message": ROOM_HOLD_CREATED_MESSAGE,
+                "data": serializer.data
+            }
+        )
+
+    def delete(self, request: Request, *args, **kwargs):
+        deleted, _ = RoomHold.objects.live().filter(room_id=self.kwargs.get("room_id"),
+                                                    token=request.data.get("token") or '').delete()
+        if not deleted:
+            return Response(
+                status=status.HTTP_404_NOT_FOUND,
+                data=ROOM_HOLD_NOT_FOUND_ERROR
+            )
+        return Response(
+            status=status.HTTP_200_OK,
+            data=ROOM_HOLD_RELEASED_MESSAGE
+        )
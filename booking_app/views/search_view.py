@@ -0,0 +1,31 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from booking_app.search import search
+from booking_app.serializers.search_serializer import SearchParamsSerializer, SearchResultSerializer
+
+
+# Полнотекстовый поиск по названию, расположению и описанию отелей и комментариям отзывов (booking_app/search.py).
+# Результаты отсортированы по релевантности; запрос к базе данных один, по индексам FTS5 на SQLite или FULLTEXT на
+# MySQL, без сканирования таблиц отелей и отзывов.
+class SearchView(APIView):
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    def get(self, request: Request, *args, **kwargs):
+        params = SearchParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data['q']
+        results = search(query, params.validated_data.get('limit', settings.SEARCH_DEFAULT_LIMIT))
+        return Response(
+            status=status.HTTP_200_OK,
+            data={
+                'query': query,
+                'results': SearchResultSerializer(results, many=True).data,
+            }
+        )
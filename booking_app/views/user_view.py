@@ -7,12 +7,15 @@ from rest_framework.generics import (get_object_or_404,
                                      RetrieveUpdateDestroyAPIView,
                                      ListAPIView, )
 from rest_framework import status
+from booking_app.conditional import conditional_get
+from booking_app.fast_serialization import ValuesListMixin
 from booking_app.models.user_model import User
+from booking_app.pagination import UserCursorPagination
 from booking_app.serializers.user_serializer import UserInfoSerializer, AllUsersSerializer
 from booking_app.success_messages import USER_CREATED_MESSAGE, USER_UPDATED_MESSAGE, USER_DELETED_MESSAGE
 
 
-class UsersListGenericView(ListCreateAPIView):
+class UsersListGenericView(ValuesListMixin, ListCreateAPIView):
     # Здесь определяются права доступа, требуемые для доступа к этому представлению.
     # В данном случае, используется IsAuthenticated, что означает,
     # что пользователь должен быть аутентифицирован для доступа к этим операциям.
@@ -22,6 +25,8 @@ class UsersListGenericView(ListCreateAPIView):
     # Этот атрибут определяет, какой сериализатор будет использоваться для преобразования объектов модели User в
     # формат JSON и наоборот. В данном случае, используется AllRoomsSerializer, который содержит все поля модели.
     serializer_class = AllUsersSerializer
+    # Курсорная пагинация по первичному ключу, без OFFSET
+    pagination_class = UserCursorPagination
 
     # Этот метод определяет запрос к базе данных для получения списка пользователей. Он также выполняет фильтрацию по
     # username, если такой фильтр указан в параметрах запроса. Например, если в URL-адресе указан параметр username,
@@ -34,20 +39,14 @@ class UsersListGenericView(ListCreateAPIView):
         return queryset
 
     # Этот метод обрабатывает GET-запросы на получение списка пользователей. Он вызывает метод get_queryset для
-    # получения списка пользователей и проверяет, существуют ли пользователи в результате запроса. Если пользователи
-    # найдены, то они сериализуются с помощью AllUsersSerializer и возвращаются в формате JSON с кодом состояния 200
-    # (OK). Если пользователи не найдены, возвращается код состояния 204 (No Content).
+    # получения списка пользователей и выбирает из него одну страницу по курсору. Если пользователи найдены, то они
+    # сериализуются с помощью AllUsersSerializer и возвращаются в формате JSON вместе со ссылками на соседние страницы
+    # с кодом состояния 200 (OK). Если пользователи не найдены, возвращается код состояния 204 (No Content).
+    @conditional_get
     def get(self, request: Request, *args, **kwargs):
-        filtered_data = self.get_queryset()
-        if filtered_data.exists():
-            serializer = self.serializer_class(
-                instance=filtered_data,
-                many=True
-            )
-            return Response(
-                status=status.HTTP_200_OK,
-                data=serializer.data
-            )
+        filtered_data = self.serialize_page(self.get_queryset())
+        if filtered_data:
+            return self.get_paginated_response(filtered_data)
         return Response(
             status=status.HTTP_204_NO_CONTENT,
             data=[]
@@ -76,15 +75,20 @@ class UsersListGenericView(ListCreateAPIView):
 class UserDetailGenericView(RetrieveUpdateDestroyAPIView):
     serializer_class = UserInfoSerializer
 
+    # Условный GET для конкретного пользователя: ETag и Last-Modified вычисляются по одной строке.
+    def get_conditional_queryset(self):
+        return User.objects.filter(pk=self.kwargs.get("user_id"))
+
     # Метод для получения конкретного пользователя по его идентификатору. Идентификатор пользователя получается из
     # параметров запроса. Если пользователь с таким идентификатором не найден, возвращается ошибка 404.
     def get_object(self):
         user_id = self.kwargs.get("user_id")
-        room = get_object_or_404(User, id=user_id)
+        room = get_object_or_404(User, pk=user_id)
         return room
 
     # Метод для обработки GET-запросов на получение информации о конкретном пользователe. Получает пользователя с
     # помощью метода get_object, сериализует его и возвращает в формате JSON с кодом состояния 200 (OK).
+    @conditional_get
     def get(self, request: Request, *args, **kwargs):
         user = self.get_object()
         serializer = self.serializer_class(user)
@@ -56,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'booking_app.middleware.QueryStatsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -93,15 +94,41 @@ if env("MYSQL"):
             'PORT': env('DB_PORT'),
         }
     }
+    # MySQL не поддерживает частичные индексы и создает индексы с условием deleted=False полными (см.
+    # booking_app/models/soft_delete_model.py), об этом и предупреждает проверка models.W037
+    SILENCED_SYSTEM_CHECKS = ['models.W037']
 else:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Сколько секунд ждать освобождения блокировки базы при параллельной записи из нескольких процессов
+            "OPTIONS": {"timeout": env.int('SQLITE_TIMEOUT', default=20)},
+            # Тестовая база данных - файл, а не база в памяти: в общей базе в памяти (shared cache) параллельные
+            # записи из разных соединений сразу завершаются ошибкой "database table is locked", а не ждут
+            # освобождения блокировки, и тесты параллельных бронирований не могут проверить блокировку номеров
+            "TEST": {"NAME": env('SQLITE_TEST_NAME', default=str(BASE_DIR / 'test_db.sqlite3'))},
         }
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# По умолчанию используется кэш в памяти процесса. Для общего кэша нескольких процессов можно указать файловый
+# бэкенд: CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache и CACHE_LOCATION=/var/tmp/booking_cache
+
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('CACHE_LOCATION', default='booking_app'),
+    }
+}
+
+# Кэширование ответов GET-запросов для отелей и номеров (booking_app/cache.py)
+RESPONSE_CACHE_ENABLED = env.bool('RESPONSE_CACHE_ENABLED', default=True)
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=300)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -138,7 +165,121 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Хранилища файлов. Фотографии отелей и номеров и их производные изображения сохраняются по хэшу содержимого
+# (booking_app.storage.ContentAddressedStorage) в каталоге photos/ внутри MEDIA_ROOT
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'photos': {'BACKEND': 'booking_app.storage.ContentAddressedStorage', 'OPTIONS': {'prefix': 'photos'}},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Размер страницы по умолчанию для курсорной пагинации списков (booking_app/pagination.py) и максимальный размер
+# страницы, который клиент может запросить параметром page_size
+PAGE_SIZE = env.int('PAGE_SIZE', default=50)
+MAX_PAGE_SIZE = env.int('MAX_PAGE_SIZE', default=500)
+
+# Максимальное количество бронирований в одном запросе POST /bookings/bulk/
+BOOKING_BULK_MAX_ITEMS = env.int('BOOKING_BULK_MAX_ITEMS', default=1000)
+
+# Границы ценовых диапазонов фасета цены в списке номеров (GET /rooms/?facets=true): [0, 100), [100, 200), [200, 500)
+# и от 500
+ROOM_PRICE_FACETS = [100, 200, 500]
+
+# Максимальная длина интервала дат отчета о занятости /analytics/occupancy/ в днях
+ANALYTICS_MAX_DAYS = env.int('ANALYTICS_MAX_DAYS', default=1096)
+
+# Календарь занятости номеров /rooms/<room_id>/calendar/ и /rooms/calendar/: длина интервала по умолчанию и
+# максимальная в днях, а также максимальное количество номеров (параметров room_id) в одном запросе
+ROOM_CALENDAR_DEFAULT_DAYS = 365
+ROOM_CALENDAR_MAX_DAYS = env.int('ROOM_CALENDAR_MAX_DAYS', default=731)
+ROOM_CALENDAR_MAX_ROOMS = env.int('ROOM_CALENDAR_MAX_ROOMS', default=500)
+
+# Полнотекстовый поиск /search/ (booking_app/search.py): количество результатов по умолчанию и максимальное,
+# максимальное количество слов запроса, длина фрагмента текста в словах (SQLite) и в символах (MySQL)
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = env.int('SEARCH_MAX_LIMIT', default=100)
+SEARCH_MAX_WORDS = 10
+SEARCH_SNIPPET_WORDS = 12
+SEARCH_SNIPPET_CHARS = 200
+# Среди скольких самых новых совпадающих отзывов ранжируются результаты на SQLite (см. booking_app/search.py)
+SEARCH_MAX_CANDIDATES = env.int('SEARCH_MAX_CANDIDATES', default=10000)
+
+# Подсказки расположений /hotels/locations/suggest/ (booking_app/locations.py): сколько самых частых расположений
+# хранится в индексе в памяти, количество подсказок по умолчанию и максимальное
+LOCATION_SUGGEST_MAX_LOCATIONS = env.int('LOCATION_SUGGEST_MAX_LOCATIONS', default=20000)
+# Сколько секунд список расположений живет в кэше. С кэшем в памяти процесса изменения отелей из других процессов
+# становятся видны не позже, чем через это время
+LOCATION_SUGGEST_TIMEOUT = env.int('LOCATION_SUGGEST_TIMEOUT', default=300)
+LOCATION_SUGGEST_DEFAULT_LIMIT = 10
+LOCATION_SUGGEST_MAX_LIMIT = 50
+
+# Временные удержания номеров POST /rooms/<room_id>/hold/: срок удержания по умолчанию и максимальный в минутах
+ROOM_HOLD_MINUTES = env.int('ROOM_HOLD_MINUTES', default=10)
+ROOM_HOLD_MAX_MINUTES = env.int('ROOM_HOLD_MAX_MINUTES', default=30)
+# Сколько ночей можно удержать одним удержанием: удержание не оплачено и не должно закрывать номер на месяцы
+ROOM_HOLD_MAX_NIGHTS = env.int('ROOM_HOLD_MAX_NIGHTS', default=30)
+
+# Сериализация страниц списков через values() без создания объектов моделей (booking_app/fast_serialization.py) и
+# рендеринг JSON через orjson, если он установлен (booking_app.renderers.FastJSONRenderer). Вывод в обоих случаях
+# совпадает с обычными сериализаторами и JSONRenderer DRF
+FAST_SERIALIZATION_ENABLED = env.bool('FAST_SERIALIZATION_ENABLED', default=True)
+FAST_JSON_RENDERER = env.bool('FAST_JSON_RENDERER', default=True)
+
+# Производные изображения фотографий отелей и номеров (booking_app/images.py): ширина каждого размера в пикселях,
+# форматы и качество сжатия. Изображения только уменьшаются, пропорции сохраняются
+PHOTO_DERIVATIVE_SIZES = {'thumbnail': 320, 'card': 800, 'full': 1920}
+PHOTO_DERIVATIVE_FORMATS = ['webp', 'jpeg']
+PHOTO_DERIVATIVE_QUALITY = env.int('PHOTO_DERIVATIVE_QUALITY', default=80)
+# Количество фоновых потоков, которые строят производные изображения загруженных фотографий. При 0 производные
+# строятся сразу после фиксации транзакции в потоке запроса
+PHOTO_DERIVATIVE_WORKERS = env.int('PHOTO_DERIVATIVE_WORKERS', default=2)
+# Ставить построение производных в очередь фоновых задач (команда runworker) вместо пула потоков процесса
+PHOTO_DERIVATIVE_JOBS = env.bool('PHOTO_DERIVATIVE_JOBS', default=False)
+
+# Очередь фоновых задач (booking_app/jobs.py, команда runworker): количество попыток задачи, задержка перед первым
+# повтором и максимальная в секундах (задержка удваивается после каждой попытки), срок, на который обработчик
+# забирает задачу, в секундах, количество потоков обработчика и задач, которые поток забирает за раз, по умолчанию и
+# пауза между опросами пустой очереди в секундах
+JOB_MAX_ATTEMPTS = env.int('JOB_MAX_ATTEMPTS', default=5)
+JOB_RETRY_DELAY = env.int('JOB_RETRY_DELAY', default=10)
+JOB_RETRY_MAX_DELAY = env.int('JOB_RETRY_MAX_DELAY', default=3600)
+JOB_LEASE_SECONDS = env.int('JOB_LEASE_SECONDS', default=600)
+JOB_WORKER_THREADS = env.int('JOB_WORKER_THREADS', default=4)
+JOB_CLAIM_BATCH = env.int('JOB_CLAIM_BATCH', default=1)
+JOB_POLL_INTERVAL = env.float('JOB_POLL_INTERVAL', default=1.0)
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'booking_app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Доля запросов (от 0 до 1), для которых booking_app.middleware.QueryStatsMiddleware считает SQL-запросы и время
+# работы с базой данных
+QUERY_STATS_SAMPLE_RATE = env.float('QUERY_STATS_SAMPLE_RATE', default=0.01)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'booking_app.queries': {
+            'handlers': ['console'],
+            'level': env('QUERY_STATS_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+        'booking_app.jobs': {
+            'handlers': ['console'],
+            'level': env('JOB_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
@@ -30,4 +30,10 @@ urlpatterns = [
     # URL-адресам из приложения booking_app.urls.review_url.)
     path('bookings/', include('booking_app.urls.booking_url')),  # Маршрут, который добавляет префикс /bookings/ ко всем
     # URL-адресам из приложения booking_app.urls.booking_url.)
+    path('analytics/', include('booking_app.urls.analytics_url')),  # Маршрут, который добавляет префикс /analytics/
+    # ко всем URL-адресам отчетов из приложения booking_app.urls.analytics_url.
+    path('search/', include('booking_app.urls.search_url')),  # Маршрут полнотекстового поиска по отелям и отзывам
+    # (booking_app.urls.search_url).
+    path('async/', include('booking_app.urls.async_url')),  # Асинхронные варианты запросов чтения отелей и
+    # номеров (booking_app.urls.async_url) для развертывания под ASGI.
 ]